@@ -39,6 +39,9 @@ export function LiveTranscript({
   const [isCallActive, setIsCallActive] = useState(false)
   const scrollAreaRef = useRef<HTMLDivElement>(null)
   const intervalRef = useRef<NodeJS.Timeout | null>(null)
+  const inactivityRef = useRef<NodeJS.Timeout | null>(null)
+  // While subscribed, transcript events address messages by their server index
+  const streamingRef = useRef(false)
   
   const db = new DatabaseService()
 
@@ -86,8 +89,10 @@ export function LiveTranscript({
       
       if (result.success) {
         const rawTranscript = result.data as TranscriptData
-        // Apply client-side deduplication
-        const deduplicatedMessages = deduplicateMessages(rawTranscript.transcript)
+        // Apply client-side deduplication - not while streaming, where it would shift the server indices
+        const deduplicatedMessages = streamingRef.current
+          ? rawTranscript.transcript
+          : deduplicateMessages(rawTranscript.transcript)
         const newTranscript = {
           ...rawTranscript,
           transcript: deduplicatedMessages,
@@ -123,22 +128,80 @@ export function LiveTranscript({
     }
   }
 
-  // Set up auto-refresh
+  const scrollToBottom = () => {
+    setTimeout(() => {
+      if (scrollAreaRef.current) {
+        const scrollElement = scrollAreaRef.current.querySelector('[data-radix-scroll-area-viewport]')
+        if (scrollElement) {
+          scrollElement.scrollTop = scrollElement.scrollHeight
+        }
+      }
+    }, 100)
+  }
+
+  // Mark the call live on every pushed change, and ended after 10 seconds of silence
+  const markActivity = () => {
+    setIsCallActive(true)
+    if (inactivityRef.current) clearTimeout(inactivityRef.current)
+    inactivityRef.current = setTimeout(() => setIsCallActive(false), 10000)
+  }
+
+  // Set up live updates - pushed over SSE when available, polled otherwise
   useEffect(() => {
     if (!callId || !autoRefresh) return
 
-    // Initial fetch
-    fetchTranscript()
+    if (typeof EventSource === 'undefined') {
+      // Initial fetch
+      fetchTranscript()
 
-    // Set up interval
-    intervalRef.current = setInterval(() => {
-      fetchTranscript(false) // Don't show loading spinner for background refreshes
-    }, refreshInterval)
+      // Set up interval
+      intervalRef.current = setInterval(() => {
+        fetchTranscript(false) // Don't show loading spinner for background refreshes
+      }, refreshInterval)
 
-    return () => {
-      if (intervalRef.current) {
-        clearInterval(intervalRef.current)
+      return () => {
+        if (intervalRef.current) {
+          clearInterval(intervalRef.current)
+        }
+      }
+    }
+
+    setIsLoading(true)
+    streamingRef.current = true
+    const unsubscribe = db.subscribeToLiveTranscript(callId, {
+      onSnapshot: (data) => {
+        // Kept as sent: later transcript events replace messages[event.index]
+        const messages = data.transcript
+        setTranscript({ call_id: callId, message_count: messages.length, transcript: messages })
+        setLastMessageCount(messages.length)
+        setIsCallActive(data.status === 'active')
+        setIsLoading(false)
+        setError(null)
+        if (messages.length > 0) scrollToBottom()
+      },
+      onTranscript: (event) => {
+        setTranscript(prev => {
+          const messages = [...(prev?.transcript ?? [])]
+          messages[event.index] = { role: event.role, message: event.message }
+          return { call_id: callId, message_count: messages.length, transcript: messages }
+        })
+        markActivity()
+        if (event.op === 'append') scrollToBottom()
+      },
+      onCallStatus: (event) => {
+        if (inactivityRef.current) clearTimeout(inactivityRef.current)
+        setIsCallActive(event.status === 'active')
+      },
+      onError: () => {
+        // EventSource retries by itself; only surface the error if nothing has loaded yet
+        setIsLoading(false)
       }
+    })
+
+    return () => {
+      unsubscribe()
+      streamingRef.current = false
+      if (inactivityRef.current) clearTimeout(inactivityRef.current)
     }
   }, [callId, autoRefresh, refreshInterval])
 
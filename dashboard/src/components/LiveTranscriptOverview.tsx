@@ -45,14 +45,52 @@ export function LiveTranscriptOverview() {
   }
 
   useEffect(() => {
-    fetchAllTranscripts()
-    
-    // Auto-refresh every 2 seconds for faster updates
-    const interval = setInterval(() => {
-      fetchAllTranscripts(false)
-    }, 2000)
-    
-    return () => clearInterval(interval)
+    if (typeof EventSource === 'undefined') {
+      fetchAllTranscripts()
+      
+      // Auto-refresh every 2 seconds for faster updates
+      const interval = setInterval(() => {
+        fetchAllTranscripts(false)
+      }, 2000)
+      
+      return () => clearInterval(interval)
+    }
+
+    // Live updates pushed by the voice server
+    setIsLoading(true)
+    const withCalls = (calls: TranscriptOverview[]): AllTranscriptsData => ({ total_calls: calls.length, calls })
+
+    return db.subscribeToAllTranscripts({
+      onSnapshot: (data) => {
+        setTranscripts(withCalls(data.calls))
+        setIsLoading(false)
+        setError(null)
+      },
+      onTranscript: (event) => {
+        setTranscripts(prev => {
+          const calls = prev?.calls ?? []
+          const messageCount = event.index + 1
+          // Only call-status 'active' adds calls - a late event for a completed call must not bring it back
+          if (!calls.some(call => call.call_id === event.call_id)) return prev
+          return withCalls(calls.map(call =>
+            call.call_id === event.call_id
+              ? { ...call, message_count: Math.max(call.message_count, messageCount) }
+              : call
+          ))
+        })
+      },
+      onCallStatus: (event) => {
+        setTranscripts(prev => {
+          const calls = prev?.calls ?? []
+          if (event.status === 'completed') {
+            return withCalls(calls.filter(call => call.call_id !== event.call_id))
+          }
+          if (calls.some(call => call.call_id === event.call_id)) return prev
+          return withCalls([...calls, { call_id: event.call_id, message_count: 0 }])
+        })
+      },
+      onError: () => setIsLoading(false)
+    })
   }, [])
 
   return (
@@ -6,7 +6,8 @@ import {
   CallFilters, 
   ApiResponse,
   PaginatedResponse,
-  DashboardMetrics 
+  DashboardMetrics,
+  TranscriptStreamHandlers
 } from '@/types'
 
 export class DatabaseService {
@@ -297,6 +298,33 @@ export class DatabaseService {
     }
   }
 
+  // Server-Sent Events streams pushed by the voice server as transcripts change.
+  // EventSource reconnects on its own and resumes from the last event ID it saw.
+  subscribeToLiveTranscript(callId: string, handlers: TranscriptStreamHandlers): () => void {
+    return this.openTranscriptStream(`http://localhost:5001/transcript/${callId}/stream`, handlers)
+  }
+
+  subscribeToAllTranscripts(handlers: TranscriptStreamHandlers): () => void {
+    return this.openTranscriptStream('http://localhost:5001/transcripts/stream', handlers)
+  }
+
+  private openTranscriptStream(url: string, handlers: TranscriptStreamHandlers): () => void {
+    const source = new EventSource(url)
+
+    source.addEventListener('snapshot', (event) => {
+      handlers.onSnapshot?.(JSON.parse((event as MessageEvent).data))
+    })
+    source.addEventListener('transcript', (event) => {
+      handlers.onTranscript?.(JSON.parse((event as MessageEvent).data))
+    })
+    source.addEventListener('call-status', (event) => {
+      handlers.onCallStatus?.(JSON.parse((event as MessageEvent).data))
+    })
+    source.onerror = () => handlers.onError?.()
+
+    return () => source.close()
+  }
+
   // ===== ANALYTICS METHODS =====
 
   async getDashboardMetrics(timeRange: '7d' | '30d' | '90d' | 'all' = '30d'): Promise<ApiResponse<DashboardMetrics>> {
@@ -166,6 +166,26 @@ export interface ApiResponse<T = any> {
   message?: string
 }
 
+export interface TranscriptStreamEvent {
+  call_id: string
+  index: number
+  op: 'append' | 'update'
+  role: 'bot' | 'user'
+  message: string
+}
+
+export interface CallStatusStreamEvent {
+  call_id: string
+  status: 'active' | 'completed'
+}
+
+export interface TranscriptStreamHandlers {
+  onSnapshot?: (data: any) => void
+  onTranscript?: (event: TranscriptStreamEvent) => void
+  onCallStatus?: (event: CallStatusStreamEvent) => void
+  onError?: () => void
+}
+
 export interface PaginatedResponse<T = any> extends ApiResponse<T[]> {
   count?: number
   total?: number
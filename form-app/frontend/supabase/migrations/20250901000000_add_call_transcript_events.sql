@@ -0,0 +1,41 @@
+-- Append-only transcript events for VAPI calls
+-- Migration: 20250901000000_add_call_transcript_events.sql
+--
+-- One row per message of a call's VAPI history (artifact.messages), written as the call
+-- progresses. Rows are only ever inserted, so a webhook costs the same at message 500 as
+-- at message 5, instead of rewriting call_logs.full_transcript on every event.
+-- call_logs.full_transcript is still written once, when the call is finalized.
+
+CREATE TABLE IF NOT EXISTS public.call_transcript_events (
+  -- VAPI call ID (call_logs.vapi_call_id). No foreign key: events can arrive before the
+  -- call log row is created by another worker
+  vapi_call_id TEXT NOT NULL,
+
+  -- Position of the message in the call's VAPI message history, from 0
+  seq INTEGER NOT NULL,
+
+  role TEXT,
+  message TEXT,
+  payload JSONB, -- The message as VAPI sent it (time, secondsFromStart, tool calls, ...)
+
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+  -- Redelivered webhooks and concurrent workers insert the same (vapi_call_id, seq) again;
+  -- the voice server skips those with ON CONFLICT DO NOTHING
+  PRIMARY KEY (vapi_call_id, seq)
+);
+
+-- The primary key index covers both hot queries: a call's transcript in order
+-- (WHERE vapi_call_id = ? ORDER BY seq) and its last stored position (ORDER BY seq DESC LIMIT 1),
+-- the latter as an index-only scan. Message text is deliberately not INCLUDEd: long utterances
+-- would exceed the btree row size limit. No other indexes, so inserts stay cheap.
+
+ALTER TABLE public.call_transcript_events ENABLE ROW LEVEL SECURITY;
+
+-- Same access as call_logs
+CREATE POLICY "Enable all operations for call_transcript_events" ON public.call_transcript_events
+    FOR ALL USING (true);
+
+COMMENT ON TABLE public.call_transcript_events IS 'Append-only VAPI call transcript, one row per message';
+COMMENT ON COLUMN public.call_transcript_events.seq IS 'Index of the message in the VAPI artifact.messages history';
+COMMENT ON COLUMN public.call_transcript_events.payload IS 'Original VAPI message object';
@@ -0,0 +1,43 @@
+-- Call analytics aggregated in the database
+-- Migration: 20250902000000_add_call_analytics_function.sql
+--
+-- CallLogger.get_call_analytics used to fetch up to 1000 whole call_logs rows (transcripts and
+-- the application join included) and add them up in Python. This function returns the same
+-- totals for every call in the time range as a single row.
+
+CREATE OR REPLACE FUNCTION public.call_analytics(from_date TIMESTAMPTZ DEFAULT NULL)
+RETURNS TABLE (
+  total_calls BIGINT,
+  completed_calls BIGINT,
+  success_rate NUMERIC,               -- Percent of calls that completed
+  total_duration_minutes NUMERIC,
+  average_duration_minutes NUMERIC,   -- Per completed call
+  total_cost NUMERIC,
+  average_cost_per_call NUMERIC
+)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT
+    totals.total_calls,
+    totals.completed_calls,
+    COALESCE(totals.completed_calls * 100.0 / NULLIF(totals.total_calls, 0), 0),
+    totals.total_duration / 60.0,
+    COALESCE(totals.total_duration / 60.0 / NULLIF(totals.completed_calls, 0), 0),
+    totals.total_cost,
+    COALESCE(totals.total_cost / NULLIF(totals.total_calls, 0), 0)
+  FROM (
+    SELECT
+      COUNT(*) AS total_calls,
+      COUNT(*) FILTER (WHERE status IN ('completed', 'ended')) AS completed_calls,
+      COALESCE(SUM(duration_seconds), 0) AS total_duration,
+      COALESCE(SUM(cost_total), 0) AS total_cost
+    FROM public.call_logs
+    -- idx_call_logs_created_at limits the scan to the range; NULL means all calls
+    WHERE from_date IS NULL OR created_at >= from_date
+  ) AS totals;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.call_analytics(TIMESTAMPTZ) TO anon, authenticated;
+
+COMMENT ON FUNCTION public.call_analytics(TIMESTAMPTZ) IS 'Call totals, averages and success rate for calls created since from_date (all calls if NULL)';
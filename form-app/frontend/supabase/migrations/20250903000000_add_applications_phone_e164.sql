@@ -0,0 +1,58 @@
+-- Normalized phone numbers for matching calls to applications
+-- Migration: 20250903000000_add_applications_phone_e164.sql
+--
+-- The voice server links a call to the latest application for VAPI's customer.number, which is
+-- E.164 (+14167009468). applications.phone holds whatever the form sent, e.g. (416) 700-9468 for
+-- applications from before the form formatted it, so exact matches missed, and phone had no index.
+-- phone_e164 is the normalized number, kept up to date by a trigger and indexed for that lookup.
+
+-- Same rules as format_phone_to_e164() in voice_server/phone_lookup.py and the form's formatPhoneToE164
+CREATE OR REPLACE FUNCTION public.normalize_phone_e164(phone TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT CASE
+    WHEN digits = '' THEN NULL
+    -- 11 digits starting with 1: US/Canada with the country code
+    WHEN length(digits) = 11 AND left(digits, 1) = '1' THEN '+' || digits
+    -- 10 digits: US/Canada without it
+    WHEN length(digits) = 10 THEN '+1' || digits
+    -- Already has a country code
+    WHEN btrim(phone) LIKE '+%' THEN '+' || digits
+    ELSE '+1' || digits
+  END
+  FROM (SELECT regexp_replace(COALESCE(phone, ''), '\D', '', 'g') AS digits) AS normalized;
+$$;
+
+ALTER TABLE public.applications ADD COLUMN IF NOT EXISTS phone_e164 TEXT;
+
+CREATE OR REPLACE FUNCTION public.set_applications_phone_e164()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.phone_e164 = public.normalize_phone_e164(NEW.phone);
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS set_applications_phone_e164 ON public.applications;
+CREATE TRIGGER set_applications_phone_e164
+  BEFORE INSERT OR UPDATE OF phone ON public.applications
+  FOR EACH ROW EXECUTE FUNCTION public.set_applications_phone_e164();
+
+-- Backfill existing applications in one set-based statement, before the index exists,
+-- so the index is built once instead of updated row by row
+UPDATE public.applications
+SET phone_e164 = public.normalize_phone_e164(phone)
+WHERE phone IS NOT NULL
+  AND phone_e164 IS DISTINCT FROM public.normalize_phone_e164(phone);
+
+-- Latest application for a number: WHERE phone_e164 = ? ORDER BY created_at DESC LIMIT 1
+-- reads one index entry
+CREATE INDEX IF NOT EXISTS idx_applications_phone_e164
+  ON public.applications (phone_e164, created_at DESC);
+
+COMMENT ON COLUMN public.applications.phone_e164 IS 'phone in E.164 form, set by trigger - used to match calls to applications';
+COMMENT ON FUNCTION public.normalize_phone_e164(TEXT) IS 'E.164 form of a phone number (US/Canada when there is no country code), NULL without digits';
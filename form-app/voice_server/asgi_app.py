@@ -0,0 +1,616 @@
+#!/usr/bin/env python3
+"""
+ASGI Webhook Server for the Voice Server
+
+FastAPI version of vapi_webhook.VapiWebHookServer. Supabase, OpenAI and
+VAPI requests are awaited on one pooled httpx.AsyncClient instead of
+blocking a thread each, so a single process can keep hundreds of calls in
+flight. Webhook handling (signature check, deduplication, write-ahead log,
+per-call ordered workers, transcript cache and SSE streams) is the same as
+in the Flask server.
+
+    python asgi_app.py
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5001
+"""
+
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Optional
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+import fill_application
+from async_call_logger import AsyncCallLogger
+from call_logger import transcript_history
+from async_db import AsyncDatabaseManager, create_http_client
+from call_state import CallState
+from sharded_cache import AtomicCounter
+from transcript_store import CallTranscript
+from transcript_stream import format_sse, format_heartbeat
+from vapi_client import AsyncVapiClient
+from webhook_dedupe import WebhookDeduplicator, webhook_key
+from webhook_envelope import WebhookEnvelope, verify_signature
+from webhook_logging import get_logger, log_fields, dumps_enabled, StageTimer
+import webhook_metrics
+import tracing
+from webhook_queue import AsyncWebhookWorkerPool
+from webhook_wal import WebhookWAL
+
+
+load_dotenv()
+
+logger = get_logger('webhook')
+
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+# SSE streams check the event bus this often instead of holding a thread in a blocking wait
+SSE_POLL_SECONDS = float(os.getenv('SSE_POLL_SECONDS', '0.25'))
+# Workers are tasks, so many more of them can wait on I/O than with threads
+ASYNC_WEBHOOK_WORKERS = int(os.getenv('VAPI_ASYNC_WEBHOOK_WORKERS', '256'))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header lists etag (or *)"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix('W/').strip('"') for tag in if_none_match.split(',')]
+    return etag in tags or '*' in tags
+
+
+class AsyncVapiWebhookServer:
+    """VAPI webhook server on asyncio - outbound I/O shares one connection pool"""
+
+    def __init__(self, call_state: Optional[CallState] = None, deduplicator=None, wal_dir=None):
+        self.call_state = call_state if call_state is not None else CallState.from_env()
+        self.webhook_counter = AtomicCounter()
+        self.start_time = time.time()
+        self.last_webhook_time = None
+        self._deduplicator = deduplicator
+        self._wal_dir = wal_dir
+
+        # Created in lifespan(), inside the event loop
+        self.http = None
+        self.db = None
+        self.call_logger = None
+        self.vapi = None
+        self.openai = None
+        self.worker_pool = None
+        self.deduplicator = None
+        self.wal = None
+
+        self.app = FastAPI(title="VAPI Webhook Server", lifespan=self.lifespan)
+        webhook_metrics.registry.add_gauge_callback(self.metric_gauges)
+        self.setup_middleware()
+        self.setup_routes()
+
+    @asynccontextmanager
+    async def lifespan(self, app: FastAPI):
+        """Open the connection pool, dedupe store and write-ahead log; replay unprocessed webhooks"""
+        self.http = create_http_client()
+        self.db = AsyncDatabaseManager(self.http)
+        self.call_logger = AsyncCallLogger(self.db)
+        self.vapi = AsyncVapiClient(self.http)
+        self.worker_pool = AsyncWebhookWorkerPool(self.process_event, num_workers=ASYNC_WEBHOOK_WORKERS)
+        self.deduplicator = self._deduplicator if self._deduplicator is not None else WebhookDeduplicator()
+
+        wal_dir = os.getenv('VAPI_WAL_DIR', 'webhook_wal') if self._wal_dir is None else self._wal_dir
+        self.wal = WebhookWAL(wal_dir) if wal_dir else None
+        pending = self.wal.recover() if self.wal else []
+
+        self.worker_pool.start()
+        await self.replay_pending_webhooks(pending)
+        try:
+            yield
+        finally:
+            await self.worker_pool.stop()
+            await self.call_logger.writes.stop()
+            self.deduplicator.close()
+            if self.wal:
+                self.wal.close()
+            await self.http.aclose()
+
+    def openai_client(self):
+        """AsyncOpenAI on the shared pool - created on first use, so the server starts without OPENAI_API_KEY"""
+        if self.openai is None:
+            from openai import AsyncOpenAI
+            self.openai = AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'), http_client=self.http)
+        return self.openai
+
+    def setup_middleware(self):
+        @self.app.middleware('http')
+        async def cors_headers(request: Request, call_next):
+            if request.method == 'OPTIONS':
+                response = Response(status_code=200)
+            else:
+                response = await call_next(request)
+
+            # Allow requests from localhost during development
+            origin = request.headers.get('Origin')
+            if origin and ('localhost' in origin or '127.0.0.1' in origin):
+                response.headers['Access-Control-Allow-Origin'] = origin
+            else:
+                response.headers['Access-Control-Allow-Origin'] = '*'
+
+            response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS, DELETE'
+            response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, x-vapi-signature'
+            response.headers['Access-Control-Allow-Credentials'] = 'true'
+            return response
+
+    def setup_routes(self):
+        """Same routes as the Flask server"""
+        app = self.app
+
+        @app.api_route('/vapi/webhook', methods=['GET', 'POST'])
+        @tracing.traced('handle_webhook')
+        async def handle_webhook(request: Request):
+            try:
+                if request.method == 'GET':
+                    return JSONResponse({
+                        'status': 'webhook endpoint ready',
+                        'message': 'This endpoint expects POST requests for VAPI webhooks',
+                        'method_received': 'GET',
+                        'expected_method': 'POST'
+                    })
+
+                webhook_number = self.webhook_counter.increment()
+                self.last_webhook_time = datetime.now().isoformat()
+                timer = StageTimer()
+
+                raw_body = await request.body()
+
+                signature = request.headers.get('x-vapi-signature', '')
+                if signature:
+                    with timer.stage('signature'):
+                        verified = verify_signature(raw_body, signature)
+                    if not verified:
+                        webhook_metrics.count_error('signature')
+                        tracing.record_error('invalid signature')
+                        logger.warning("signature verification failed", extra=log_fields(webhook=webhook_number))
+                        return JSONResponse({'error': 'Invalid signature'}, status_code=401)
+
+                try:
+                    with timer.stage('parse'):
+                        envelope = WebhookEnvelope.from_bytes(raw_body)
+                except ValueError:
+                    webhook_metrics.count_error('parse')
+                    tracing.record_error('invalid JSON body')
+                    return JSONResponse({'error': 'No JSON data'}, status_code=400)
+
+                call_id, call_id_source = envelope.resolve_call_id(request.headers, request.cookies)
+                tracing.set_attribute('call_id', call_id)
+                tracing.set_attribute('type', envelope.type)
+
+                # A redelivery has the same body as the original - acknowledge it without side effects
+                # The check is a SQLite insert and commit, so it runs on a thread like the WAL append
+                dedupe_key = webhook_key(call_id, envelope.type, raw_body)
+                if not await asyncio.to_thread(self.deduplicator.check_and_add, dedupe_key):
+                    webhook_metrics.registry.increment('vapi_webhook_duplicates_total', type=envelope.type)
+                    tracing.set_attribute('duplicate', True)
+                    logger.info("duplicate webhook acknowledged", extra=log_fields(
+                        webhook=webhook_number,
+                        call_id=call_id,
+                        type=envelope.type
+                    ))
+                    return JSONResponse({'status': 'duplicate', 'webhook_number': webhook_number})
+
+                wal_seq = None
+                try:
+                    # fsync runs on a thread; concurrent requests share it through the WAL's group commit
+                    if self.wal:
+                        with timer.stage('wal_append'):
+                            wal_seq = await asyncio.to_thread(self.wal.append, raw_body)
+
+                    # The worker's spans join this request's trace
+                    accepted = self.worker_pool.submit(call_id, envelope, call_id, webhook_number, timer, wal_seq,
+                                                       trace_parent=tracing.current_context())
+                except Exception:
+                    # Not accepted (e.g. the WAL write failed), so VAPI's retry must not be acknowledged as a duplicate
+                    await asyncio.to_thread(self.deduplicator.discard, dedupe_key)
+                    if wal_seq is not None:
+                        self.wal.ack(wal_seq)
+                    raise
+
+                if not accepted:
+                    # Not processed, so the retry must not be treated as a duplicate or replayed
+                    await asyncio.to_thread(self.deduplicator.discard, dedupe_key)
+                    if wal_seq is not None:
+                        self.wal.ack(wal_seq)
+                    webhook_metrics.registry.increment('vapi_webhook_rejected_total', type=envelope.type)
+                    tracing.record_error('worker queue full')
+                    logger.warning("worker queue full, webhook rejected", extra=log_fields(
+                        webhook=webhook_number,
+                        call_id=call_id,
+                        type=envelope.type
+                    ))
+                    return JSONResponse({'error': 'Webhook queue full'}, status_code=503)
+
+                return JSONResponse({'status': 'success', 'webhook_number': webhook_number})
+
+            except Exception as e:
+                tracing.record_error(e)
+                logger.exception("webhook error", extra=log_fields(error=str(e)))
+                return JSONResponse({'error': str(e)}, status_code=500)
+
+        @app.get('/health')
+        async def health_check():
+            return {
+                'status': 'healthy',
+                'webhooks_received': self.webhook_counter.value,
+                'timestamp': datetime.now().isoformat()
+            }
+
+        @app.get('/stats')
+        async def stats():
+            return {
+                'webhooks_received': self.webhook_counter.value,
+                'server_uptime': time.time() - self.start_time,
+                'process_id': os.getpid(),
+                'last_webhook': self.last_webhook_time or 'Never',
+                'worker_pool': self.worker_pool.stats(),
+                **self.call_state.stats(),
+                'deduplication': self.deduplicator.stats(),
+                'wal': self.wal.stats() if self.wal else None,
+                'status': 'running'
+            }
+
+        @app.get('/metrics')
+        async def metrics():
+            """Prometheus metrics: per-stage latency histograms, error counters, queue depths and cache sizes"""
+            return Response(webhook_metrics.render(), media_type=webhook_metrics.CONTENT_TYPE)
+
+        @app.get('/transcript/{call_id}')
+        async def get_transcript(call_id: str, request: Request, since: Optional[int] = None):
+            """
+            Get cached transcript for a specific call ID
+            ?since=<version> returns only messages added or updated after that version,
+            and If-None-Match with the current ETag returns 304
+            """
+            transcript = self.call_state.transcript(call_id)
+            if transcript is None or not transcript['messages']:
+                # Evicted (or never cached here) - fall back to the persisted call log
+                messages = await self.get_persisted_transcript(call_id)
+                if not messages:
+                    return JSONResponse({'error': f'No transcript found for call {call_id}'}, status_code=404)
+                return {
+                    'call_id': call_id,
+                    'message_count': len(messages),
+                    'transcript': messages,
+                    'source': 'call_logs'
+                }
+
+            version = transcript['version']
+            etag = f'{call_id}-{version}'
+            if etag_matches(request.headers.get('If-None-Match'), etag):
+                return Response(status_code=304, headers={'ETag': f'"{etag}"'})
+
+            delta = self.call_state.transcript_changes(call_id, since) if since is not None and since <= version else None
+            if delta is not None:
+                body = {
+                    'call_id': call_id,
+                    'version': delta['version'],
+                    'message_count': delta['message_count'],
+                    'changes': delta['changes'],
+                    'source': 'cache'
+                }
+                etag = f"{call_id}-{delta['version']}"
+            else:
+                body = {
+                    'call_id': call_id,
+                    'version': version,
+                    'message_count': len(transcript['messages']),
+                    'transcript': transcript['messages'],
+                    'source': 'cache'
+                }
+
+            return JSONResponse(body, headers={'ETag': f'"{etag}"'})
+
+        @app.get('/transcripts')
+        async def list_transcripts():
+            """List all cached transcripts - ONLY ACTIVE CALLS"""
+            active_calls = self.call_state.active_calls()
+            if not active_calls:
+                return {'message': 'No active calls', 'calls': []}
+            return {'total_calls': len(active_calls), 'calls': active_calls}
+
+        @app.get('/transcript/{call_id}/stream')
+        async def stream_transcript(call_id: str, request: Request):
+            """Server-Sent Events stream of appended/updated messages for one call"""
+            return self.sse_response(request, call_id)
+
+        @app.get('/transcripts/stream')
+        async def stream_all_transcripts(request: Request):
+            """Server-Sent Events stream of transcript and status changes for all active calls"""
+            return self.sse_response(request, None)
+
+        @app.get('/completed-calls')
+        async def list_completed_calls(limit: Optional[int] = None):
+            """List completed calls, most recently ended first (?limit=N to cap the list)"""
+            completed_calls = self.call_state.completed_calls(limit=limit)
+            if not completed_calls:
+                return {'message': 'No completed calls cached', 'calls': []}
+            return {'total_calls': len(completed_calls), 'calls': completed_calls}
+
+        @app.delete('/transcript/{call_id}/clear')
+        async def clear_transcript(call_id: str):
+            """Clear transcript cache for a specific call ID"""
+            if self.call_state.clear(call_id):
+                return {'message': f'Transcript cache cleared for call {call_id}'}
+            return JSONResponse({'error': f'No transcript found for call {call_id}'}, status_code=404)
+
+        @app.post('/api/trigger-call')
+        async def trigger_application_call(request: Request):
+            """Trigger a call for a new application"""
+            try:
+                try:
+                    data = await request.json()
+                except ValueError:
+                    data = None
+                if not data:
+                    return JSONResponse({'success': False, 'message': 'No data provided'}, status_code=400)
+
+                application_id = data.get('application_id')
+                first_name = data.get('first_name', '')
+                last_name = data.get('last_name', '')
+                phone = data.get('phone', '')
+                email = data.get('email', '')
+
+                if not all([application_id, first_name, last_name, phone]):
+                    return JSONResponse({
+                        'success': False,
+                        'message': 'Missing required fields: application_id, first_name, last_name, phone'
+                    }, status_code=400)
+
+                print(f"📞 CALL TRIGGER REQUEST - application {application_id} ({first_name} {last_name}, {phone})")
+                # The web form just saved this application itself - a cached lookup may point at an older one
+                self.db.phone_applications.invalidate_phone(phone)
+                call_id = await self.vapi.make_call(
+                    application_id=application_id,
+                    mortgage_agent_name="Sarah Johnson",
+                    first_name=first_name,
+                    last_name=last_name,
+                    email=email,
+                    phone_number=phone,
+                    interest="Mortgage application follow-up",
+                    brokerage_name="Premier Mortgage Group"
+                )
+
+                if call_id:
+                    return {'success': True, 'call_id': call_id, 'message': 'Call initiated successfully'}
+                return JSONResponse({'success': False, 'message': 'Failed to initiate call'}, status_code=500)
+
+            except Exception as e:
+                print(f"❌ Error triggering call: {e}")
+                return JSONResponse({'success': False, 'message': f'Internal server error: {str(e)}'}, status_code=500)
+
+    async def process_event(self, envelope: WebhookEnvelope, call_id: str, webhook_number: int,
+                            timer: StageTimer = None, wal_seq: int = None, trace_parent: tracing.SpanContext = None):
+        """
+        Worker pool handler - processes the event, then marks it done in the write-ahead log
+        An end-of-call-report is marked done by finish_end_of_call, after its deferred extraction
+        """
+        deferred = False
+        try:
+            with tracing.span('process_webhook_event', parent=trace_parent, call_id=call_id, type=envelope.type):
+                await self.process_webhook_event(envelope, call_id, webhook_number, timer)
+                if envelope.type == 'end-of-call-report':
+                    self.worker_pool.defer(self.finish_end_of_call, envelope, call_id, webhook_number, wal_seq,
+                                           tracing.current_context())
+                    deferred = True
+        finally:
+            if wal_seq is not None and not deferred:
+                self.wal.ack(wal_seq)
+
+    async def finish_end_of_call(self, envelope: WebhookEnvelope, call_id: str, webhook_number: int,
+                                 wal_seq: int = None, trace_parent: tracing.SpanContext = None):
+        """
+        Extract the application fields from an end-of-call-report and save them
+        Deferred until the event's ordered stages are done - the OpenAI request takes seconds,
+        and would hold up the events of other calls on the same worker
+        """
+        try:
+            with tracing.span('process_end_of_call', parent=trace_parent, call_id=call_id):
+                webhook_metrics.set_webhook_type(envelope.type)
+                with webhook_metrics.timed('end_call'):
+                    await fill_application.handle_end_call_async(envelope, self.db, self.openai_client())
+        except Exception as e:
+            logger.exception("error in fill_application.handle_end_call_async", extra=log_fields(
+                error=str(e), webhook=webhook_number, call_id=call_id, type=envelope.type
+            ))
+        finally:
+            if wal_seq is not None:
+                self.wal.ack(wal_seq)
+
+    async def process_webhook_event(self, envelope: WebhookEnvelope, call_id: str, webhook_number: int,
+                                    timer: StageTimer = None):
+        """Async counterpart of vapi_webhook.process_webhook_event"""
+        timer = timer or StageTimer()
+        timer.mark('received_to_worker')
+        webhook_data = envelope.data
+        webhook_type = envelope.type
+        fields = {'webhook': webhook_number, 'call_id': call_id, 'type': webhook_type}
+        # Stage metrics recorded further down (call log, extraction, ...) are labelled with this type
+        webhook_metrics.set_webhook_type(webhook_type)
+
+        if dumps_enabled():
+            print(f"\n📋 COMPLETE WEBHOOK BODY FROM VAPI (#{webhook_number}):")
+            print(json.dumps(webhook_data, indent=2))
+
+        try:
+            with timer.stage('call_logging'):
+                logging_result = await self.call_logger.handle_vapi_webhook(envelope)
+            if not logging_result.get('success'):
+                logger.warning("call logging issue", extra=log_fields(error=logging_result.get('error'), **fields))
+        except Exception as e:
+            logger.exception("error in call logging", extra=log_fields(error=str(e), **fields))
+
+        messages = envelope.messages
+        if call_id and call_id != 'unknown':
+            with timer.stage('transcript_merge'):
+                added_count, updated_count, message_count, created = self.call_state.record_webhook(
+                    call_id, messages, completed=webhook_type == 'end-of-call-report'
+                )
+            if created:
+                logger.debug("created transcript cache entry", extra=log_fields(call_id=call_id))
+            if messages:
+                fields.update(added=added_count, updated=updated_count, cached=message_count)
+
+        webhook_metrics.observe_timer(webhook_type, timer)
+        logger.info("webhook processed", extra=log_fields(
+            total_ms=timer.total_ms(),
+            stages=timer.stages,
+            **fields
+        ))
+
+    async def replay_pending_webhooks(self, pending: list):
+        """Re-queue webhooks that were acknowledged to VAPI but not processed before the last shutdown"""
+        if not pending:
+            return
+
+        print(f"♻️  Replaying {len(pending)} unprocessed webhook(s) from the write-ahead log")
+        for wal_seq, raw_body in pending:
+            try:
+                envelope = WebhookEnvelope.from_bytes(raw_body)
+            except ValueError:
+                self.wal.ack(wal_seq)
+                continue
+
+            call_id, _ = envelope.resolve_call_id()
+            webhook_number = self.webhook_counter.increment()
+            # Replays must not be dropped, so wait for queue space instead of rejecting
+            while not self.worker_pool.submit(call_id, envelope, call_id, webhook_number, None, wal_seq):
+                await asyncio.sleep(0.05)
+
+    def metric_gauges(self) -> list:
+        """(name, labels, value) for the /metrics gauges"""
+        if self.worker_pool is None:
+            return []
+        gauges = [
+            ('vapi_webhook_queue_depth', {'process': webhook_metrics.process_label, 'worker': index}, depth)
+            for index, depth in enumerate(self.worker_pool.queue_depths())
+        ]
+        state = self.call_state.stats()
+        gauges.append(('vapi_cache_entries', {'cache': 'transcripts'}, state['transcript_cache']['size']))
+        gauges.append(('vapi_cache_entries', {'cache': 'call_registry'}, state['call_registry']['size']))
+        gauges.append(('vapi_cache_entries', {'cache': 'dedupe'}, self.deduplicator.stats()['size']))
+        gauges.append(('vapi_cache_entries', {'cache': 'call_logs', 'process': webhook_metrics.process_label}, self.call_logger.calls.stats()['size']))
+        gauges.append(('vapi_call_log_pending_writes', {'process': webhook_metrics.process_label}, self.call_logger.writes.stats()['pending']))
+        return gauges
+
+    async def get_persisted_transcript(self, call_id: str) -> list:
+        """
+        Load a call's transcript from its transcript events, in the same format as the cache
+        Calls logged before call_transcript_events existed fall back to call_logs.full_transcript
+        """
+        events = await self.db.get_transcript_events(call_id)
+        history = transcript_history(events['data']) if events.get('success') else []
+        if not history:
+            result = await self.db.get_call_log_by_vapi_id(call_id)
+            if not result.get('success'):
+                return []
+            history = result['data'].get('full_transcript') or []
+
+        transcript = CallTranscript()
+        transcript.merge(history)
+        return transcript.messages
+
+    def sse_response(self, request: Request, call_id: Optional[str]) -> StreamingResponse:
+        """Build a streaming SSE response, resuming from Last-Event-ID if the client sent one"""
+        last_event_id = request.headers.get('Last-Event-ID') or request.query_params.get('lastEventId')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+
+        return StreamingResponse(
+            self.stream_transcript_events(request, call_id, last_event_id),
+            media_type='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+
+    async def stream_transcript_events(self, request: Request, call_id: Optional[str] = None,
+                                       last_event_id: Optional[int] = None):
+        """Async counterpart of vapi_webhook.stream_transcript_events"""
+        call_state = self.call_state
+
+        async def snapshot(event_id):
+            if call_id:
+                transcript = call_state.transcript(call_id)
+                messages = transcript['messages'] if transcript else []
+                # Completed or evicted calls are no longer cached - the dashboard relies on the persisted transcript
+                data = {
+                    'call_id': call_id,
+                    'status': call_state.call_status(call_id),
+                    'transcript': messages or await self.get_persisted_transcript(call_id)
+                }
+            else:
+                data = {'calls': call_state.active_calls()}
+            return format_sse(data, 'snapshot', event_id)
+
+        # Take the cursor before the snapshot so nothing published in between is lost
+        cursor = call_state.last_event_id()
+        if last_event_id is None or last_event_id > cursor:
+            yield await snapshot(cursor)
+        else:
+            events, complete, cursor = call_state.events_since(last_event_id, call_id)
+            if not complete:
+                yield await snapshot(cursor)
+            else:
+                for event_id, _, event_name, data in events:
+                    yield format_sse(data, event_name, event_id)
+
+        while not await request.is_disconnected():
+            if not await self.wait_for_events(cursor, SSE_HEARTBEAT_SECONDS):
+                yield format_heartbeat()
+                continue
+
+            events, complete, newest_id = call_state.events_since(cursor, call_id)
+            if not complete:
+                # This client fell behind the event buffer - resend the full state
+                yield await snapshot(newest_id)
+            else:
+                for event_id, _, event_name, data in events:
+                    yield format_sse(data, event_name, event_id)
+            cursor = newest_id
+
+    async def wait_for_events(self, last_id: int, timeout: float) -> bool:
+        """Wait until an event newer than last_id is published. Returns False on timeout"""
+        deadline = time.monotonic() + timeout
+        while self.call_state.last_event_id() <= last_id:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(SSE_POLL_SECONDS, remaining))
+        return True
+
+
+server = AsyncVapiWebhookServer()
+app = server.app
+
+
+def main():
+    """Run the ASGI server with uvicorn"""
+    import uvicorn
+
+    host = os.getenv('VAPI_SERVER_HOST', '0.0.0.0')
+    port = int(os.getenv('VAPI_SERVER_PORT', '5001'))
+    print(f"🚀 Starting async VAPI Webhook Server on {host}:{port}")
+    print(f"📡 Webhook URL: http://localhost:{port}/vapi/webhook")
+    print(f"👷 Webhook workers: {ASYNC_WEBHOOK_WORKERS} tasks")
+    print("=" * 80)
+    uvicorn.run(app, host=host, port=port)
+
+
+if __name__ == "__main__":
+    main()
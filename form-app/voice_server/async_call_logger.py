@@ -0,0 +1,192 @@
+"""
+Async Call Logger for VAPI Integration
+Non-blocking counterpart of call_logger for the ASGI server
+"""
+
+from typing import Dict, Any, Optional
+
+from async_db import AsyncDatabaseManager
+from call_log_buffer import AsyncCallLogWriteBuffer
+from call_logger import (
+    TERMINAL_CALL_STATUSES,
+    CallLogCache,
+    build_call_start_data,
+    build_finalize_data,
+    build_status_update_data,
+    build_transcript_events,
+    extract_call_data,
+    extract_phone_number,
+    webhook_call_status,
+    webhook_history
+)
+from webhook_envelope import WebhookEnvelope
+from webhook_logging import get_logger, log_fields
+from webhook_metrics import instrumented_async, timed
+from tracing import set_attribute, traced
+
+
+logger = get_logger('call_logger')
+
+
+class AsyncCallLogger:
+    """Same call_logs bookkeeping as CallLogger, awaiting an AsyncDatabaseManager"""
+
+    def __init__(self, db: AsyncDatabaseManager, cache: Optional[CallLogCache] = None,
+                 writes: Optional[AsyncCallLogWriteBuffer] = None):
+        self.db = db
+        self.calls = cache or CallLogCache.from_env()
+        self.writes = writes or AsyncCallLogWriteBuffer.from_env(self._write_status, on_write=self._status_written)
+
+    @traced()
+    async def log_call_start(self, envelope: WebhookEnvelope) -> Optional[str]:
+        """
+        Log the first event of a call this process has not seen (see CallLogger.log_call_start)
+        Returns call_log_id if a log was created
+        """
+        webhook_data = envelope.data
+        try:
+            call_data = extract_call_data(webhook_data)
+            call_id = call_data.get('id', 'unknown')
+            phone_number = extract_phone_number(call_data)
+            set_attribute('call_id', call_id)
+
+            # Calls placed by /api/trigger-call name their application - otherwise link by phone number
+            application_id = envelope.variable_values.get('application_id')
+            if not application_id and phone_number:
+                application_id = await instrumented_async('application_lookup', self.db.find_application_by_phone, phone_number)
+            set_attribute('application_id', application_id)
+
+            _, _, status = webhook_call_status(webhook_data)
+            call_log_data = build_call_start_data(call_data, application_id, status)
+            result = await instrumented_async('call_log_write', self.db.create_call_log, call_log_data, skip_existing=True)
+            if result.get('success') and result.get('data') is None:
+                # Another worker or an earlier run created the log: update it instead
+                self.calls.remember(call_id, application_id)
+                if application_id:
+                    await self.writes.update(call_id, {'application_id': application_id})
+                await self.update_call_status(call_id, call_log_data['status'], webhook_data)
+                return None
+            elif result.get('success'):
+                self.calls.remember(call_id, application_id, call_log_data['status'])
+                logger.info("started call log", extra=log_fields(call_id=call_id, application_id=application_id))
+                return result['data']['id'] if result['data'] else None
+
+            logger.error("failed to create call log", extra=log_fields(call_id=call_id, error=result.get('error')))
+            return None
+
+        except Exception as e:
+            logger.exception("error logging call start", extra=log_fields(error=str(e)))
+            return None
+
+    @traced()
+    async def update_call_transcript(self, call_id: str, transcript_messages: list, final: bool = False) -> int:
+        """Store the history messages not stored yet as call_transcript_events (see CallLogger.update_call_transcript)"""
+        try:
+            position = self.calls.transcript_position(call_id)
+            if position is None:
+                with timed('transcript_lookup'):
+                    stored = await self.db.get_transcript_position(call_id)
+                position = stored['data'] if stored.get('success') else 0
+
+            events, position = build_transcript_events(call_id, transcript_messages, position, final)
+            if events:
+                result = await instrumented_async('transcript_write', self.db.append_transcript_events, call_id, events)
+                if not result.get('success'):
+                    logger.error("failed to store transcript events", extra=log_fields(call_id=call_id, error=result.get('error')))
+                    return 0
+                logger.debug("stored transcript events", extra=log_fields(call_id=call_id, events=len(events), position=position))
+
+            self.calls.set_transcript_position(call_id, position)
+            return len(events)
+
+        except Exception as e:
+            logger.exception("error updating call transcript", extra=log_fields(call_id=call_id, error=str(e)))
+            return 0
+
+    @traced()
+    async def update_call_status(self, call_id: str, status: str, webhook_data: Dict[str, Any]):
+        """Update call status from status-update webhook - buffered unless the status is terminal"""
+        try:
+            update_data = build_status_update_data(status, webhook_data)
+            self.calls.remember(call_id, status=status)
+            if status in TERMINAL_CALL_STATUSES:
+                self._status_written(call_id, await self.writes.flush(call_id, update_data))
+            else:
+                await self.writes.update(call_id, update_data)
+            logger.debug("updated call status", extra=log_fields(call_id=call_id, status=status, cost=update_data.get('cost_total', 0)))
+
+        except Exception as e:
+            logger.exception("error updating call status", extra=log_fields(call_id=call_id, error=str(e)))
+
+    async def _write_status(self, call_id: str, update_data: Dict[str, Any]) -> Dict[str, Any]:
+        # open_only: see CallLogger._write_status
+        return await instrumented_async('call_log_write', self.db.update_call_log, call_id, update_data, open_only=True)
+
+    async def _write_final(self, call_id: str, update_data: Dict[str, Any]) -> Dict[str, Any]:
+        return await instrumented_async('call_log_write', self.db.upsert_call_log, {'vapi_call_id': call_id, **update_data})
+
+    def _status_written(self, call_id: str, result: Dict[str, Any]):
+        """After the call's buffered status updates were written (see CallLogger._status_written)"""
+        if result.get('success') and result.get('data') is None:
+            self.calls.forget(call_id)
+            logger.warning("no open call log to update", extra=log_fields(call_id=call_id))
+        elif not result.get('success'):
+            logger.error("failed to update call status", extra=log_fields(call_id=call_id, error=result.get('error')))
+
+    @traced()
+    async def finalize_call(self, call_id: str, end_call_data: Dict[str, Any]) -> bool:
+        """Finalize call with end-of-call data including costs and analysis"""
+        try:
+            update_data = build_finalize_data(end_call_data)
+
+            history = webhook_history(end_call_data)
+            if history:
+                await self.update_call_transcript(call_id, history, final=True)
+            self.calls.forget(call_id)
+            # One write: the status updates still buffered, overridden by the final data
+            result = await self.writes.flush(call_id, update_data, write=self._write_final)
+            if result.get('success'):
+                logger.info("finalized call log", extra=log_fields(
+                    call_id=call_id,
+                    duration_seconds=update_data.get('duration_seconds', 0),
+                    cost=update_data.get('cost_total', 0)
+                ))
+                return True
+
+            logger.error("failed to finalize call log", extra=log_fields(call_id=call_id, error=result.get('error')))
+            return False
+
+        except Exception as e:
+            logger.exception("error finalizing call log", extra=log_fields(call_id=call_id, error=str(e)))
+            return False
+
+    @traced()
+    async def handle_vapi_webhook(self, envelope: WebhookEnvelope) -> Dict[str, Any]:
+        """Async counterpart of call_logger.handle_vapi_webhook"""
+        webhook_data = envelope.data
+        try:
+            message_type, call_id, call_status = webhook_call_status(webhook_data)
+            set_attribute('call_id', call_id)
+            logger.debug("call logging", extra=log_fields(type=message_type, call_id=call_id, status=call_status))
+
+            if message_type in ['call-start', 'status-update']:
+                if self.calls.get(call_id) is None:
+                    await self.log_call_start(envelope)
+                else:
+                    await self.update_call_status(call_id, call_status, webhook_data)
+
+            elif message_type == 'end-of-call-report':
+                # Extraction and the application update run once, in fill_application.handle_end_call_async
+                await self.finalize_call(call_id, webhook_data)
+
+            # 'transcript' webhooks are covered by the history of the next conversation-update
+            if message_type in ('status-update', 'conversation-update'):
+                history = webhook_history(webhook_data)
+                if history:
+                    await self.update_call_transcript(call_id, history)
+
+            return {"success": True, "message": f"Processed {message_type}"}
+
+        except Exception as e:
+            logger.exception("error in call logging webhook handler", extra=log_fields(error=str(e)))
+            return {"success": False, "error": str(e)}
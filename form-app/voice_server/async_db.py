@@ -0,0 +1,266 @@
+"""
+Async Database Manager for the Voice Server
+Non-blocking call_logs/applications access over pooled httpx connections
+"""
+
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import json
+import os
+
+import httpx
+
+from phone_lookup import PhoneApplicationCache, format_phone_to_e164
+from db import stale_end_call_claim
+from storage import SUPABASE_URL, SUPABASE_PUBLIC_KEY
+from tracing import traced
+
+
+class AsyncDatabaseManager:
+    """
+    Async counterpart of db.DatabaseManager for the webhook pipeline.
+
+    Talks to Supabase's PostgREST endpoint (/rest/v1) directly through a
+    shared httpx.AsyncClient, so a request in flight only holds a pooled
+    connection, not a thread. Method names and {"success": ...} results
+    match DatabaseManager, so callers can switch by adding await.
+    """
+
+    def __init__(self, http_client: httpx.AsyncClient, url: Optional[str] = None, key: Optional[str] = None,
+                 phone_cache: Optional[PhoneApplicationCache] = None):
+        self.http = http_client
+        self.phone_applications = phone_cache or PhoneApplicationCache.from_env()
+        self.rest_url = f"{(url or SUPABASE_URL).rstrip('/')}/rest/v1"
+        key = key or SUPABASE_PUBLIC_KEY
+        self.headers = {
+            'apikey': key,
+            'Authorization': f'Bearer {key}',
+            'Content-Type': 'application/json',
+            'Prefer': 'return=representation'
+        }
+
+    async def _request(self, method: str, table: str, params: Dict[str, str],
+                       body: Optional[Any] = None, prefer: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Run one PostgREST request and return the affected/selected rows"""
+        response = await self.http.request(
+            method,
+            f"{self.rest_url}/{table}",
+            params=params,
+            content=json.dumps(body, default=str) if body is not None else None,
+            headers=dict(self.headers, Prefer=f"{prefer},return=representation") if prefer else self.headers
+        )
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {table} failed ({response.status_code}): {response.text}")
+        return response.json() if response.content else []
+
+    # Applications
+    @traced()
+    async def get_application_by_id(self, application_id: str) -> Dict[str, Any]:
+        try:
+            rows = await self._request('GET', 'applications', {'select': '*', 'id': f'eq.{application_id}'})
+            if rows:
+                return {"success": True, "data": rows[0]}
+            return {"success": False, "error": "Application not found"}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @traced()
+    async def update_application(self, application_id: str, update_data: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            if 'other_income_sources' in update_data and isinstance(update_data['other_income_sources'], str):
+                try:
+                    update_data['other_income_sources'] = json.loads(update_data['other_income_sources'])
+                except json.JSONDecodeError:
+                    update_data['other_income_sources'] = []
+
+            update_data['updated_at'] = datetime.utcnow().isoformat()
+
+            rows = await self._request('PATCH', 'applications', {'id': f'eq.{application_id}'}, update_data)
+            if 'phone' in update_data:
+                self.phone_applications.invalidate_application(application_id)
+                self.phone_applications.invalidate_phone(update_data['phone'])
+            if rows:
+                return {"success": True, "data": rows[0]}
+            return {"success": False, "error": "Application not found or no changes made"}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @traced()
+    async def find_application_id_by_call_id(self, call_id: str) -> Optional[str]:
+        """Application ID already linked to a call log, if any"""
+        try:
+            rows = await self._request('GET', 'call_logs', {'select': 'application_id', 'vapi_call_id': f'eq.{call_id}'})
+            if rows and rows[0]['application_id']:
+                return rows[0]['application_id']
+            print(f"⚠️  Could not find application for call ID: {call_id}")
+            return None
+        except Exception as e:
+            print(f"Error finding application by call ID: {e}")
+            return None
+
+    @traced()
+    async def find_application_by_phone(self, phone_number: str) -> Optional[str]:
+        """ID of the most recent application with this phone number (matched on phone_e164), or None"""
+        try:
+            phone_e164 = format_phone_to_e164(phone_number)
+            if not phone_e164:
+                return None
+            application_id = self.phone_applications.get(phone_e164)
+            if application_id:
+                return application_id
+
+            generation = self.phone_applications.generation
+            rows = await self._request('GET', 'applications', {
+                'select': 'id',
+                'phone_e164': f'eq.{phone_e164}',
+                'order': 'created_at.desc',
+                'limit': '1'
+            })
+            if rows:
+                self.phone_applications.remember(phone_e164, rows[0]['id'], generation)
+                return rows[0]['id']
+
+            print(f"⚠️  No application found with phone number: {phone_number}")
+            return None
+        except Exception as e:
+            print(f"Error finding application by phone: {e}")
+            return None
+
+    # Call Logs Management
+    @traced()
+    async def create_call_log(self, call_data: Dict[str, Any], skip_existing: bool = False) -> Dict[str, Any]:
+        """Create a new call log entry (skip_existing: see DatabaseManager.create_call_log)"""
+        try:
+            if skip_existing:
+                rows = await self._request('POST', 'call_logs', {'on_conflict': 'vapi_call_id'}, call_data,
+                                           prefer='resolution=ignore-duplicates')
+            else:
+                rows = await self._request('POST', 'call_logs', {}, call_data)
+            return {"success": True, "data": rows[0] if rows else None}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @traced()
+    async def upsert_call_log(self, call_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create or update the call log in one request (see DatabaseManager.upsert_call_log)"""
+        try:
+            rows = await self._request('POST', 'call_logs', {'on_conflict': 'vapi_call_id'}, call_data,
+                                       prefer='resolution=merge-duplicates')
+            return {"success": True, "data": rows[0] if rows else None}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @traced()
+    async def update_call_log(self, vapi_call_id: str, update_data: Dict[str, Any], open_only: bool = False) -> Dict[str, Any]:
+        """Update a call log entry by VAPI call ID (open_only: see DatabaseManager.update_call_log)"""
+        try:
+            params = {'vapi_call_id': f'eq.{vapi_call_id}'}
+            if open_only:
+                params['ended_at'] = 'is.null'
+            rows = await self._request('PATCH', 'call_logs', params, update_data)
+            return {"success": True, "data": rows[0] if rows else None}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @traced(record_failures=False)
+    async def get_call_log_by_vapi_id(self, vapi_call_id: str) -> Dict[str, Any]:
+        """Get call log by VAPI call ID"""
+        try:
+            rows = await self._request('GET', 'call_logs', {'select': '*', 'vapi_call_id': f'eq.{vapi_call_id}'})
+            if rows:
+                return {"success": True, "data": rows[0]}
+            return {"success": False, "error": "Call log not found"}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    # Transcript events
+    @traced()
+    async def append_transcript_events(self, vapi_call_id: str, events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Insert a batch of transcript events (see DatabaseManager.append_transcript_events)"""
+        try:
+            rows = await self._request('POST', 'call_transcript_events', {'on_conflict': 'vapi_call_id,seq'},
+                                       events, prefer='resolution=ignore-duplicates')
+            return {"success": True, "data": rows}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @traced()
+    async def get_transcript_events(self, vapi_call_id: str) -> Dict[str, Any]:
+        """A call's transcript events in order"""
+        try:
+            rows = await self._request('GET', 'call_transcript_events', {
+                'select': 'seq,role,message,payload', 'vapi_call_id': f'eq.{vapi_call_id}', 'order': 'seq.asc'
+            })
+            return {"success": True, "data": rows}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @traced()
+    async def get_transcript_position(self, vapi_call_id: str) -> Dict[str, Any]:
+        """Number of history messages already stored for a call (see DatabaseManager.get_transcript_position)"""
+        try:
+            rows = await self._request('GET', 'call_transcript_events', {
+                'select': 'seq', 'vapi_call_id': f'eq.{vapi_call_id}', 'order': 'seq.desc', 'limit': '1'
+            })
+            return {"success": True, "data": rows[0]['seq'] + 1 if rows else 0}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @traced()
+    async def claim_end_of_call(self, vapi_call_id: str) -> Dict[str, Any]:
+        """
+        Atomically claim a call's end-of-call processing, taking over stale claims (see DatabaseManager.claim_end_of_call)
+        Returns {"success": True, "claimed": bool}
+        """
+        marker = {'status': 'processing', 'claimed_at': datetime.utcnow().isoformat()}
+        try:
+            rows = await self._request('PATCH', 'call_logs', {
+                'vapi_call_id': f'eq.{vapi_call_id}',
+                'extracted_data': 'is.null'
+            }, {'extracted_data': marker})
+            if rows:
+                return {"success": True, "claimed": True}
+
+            existing = await self._request('GET', 'call_logs', {'select': 'extracted_data', 'vapi_call_id': f'eq.{vapi_call_id}'})
+            if existing:
+                stale_claimed_at = stale_end_call_claim(existing[0].get('extracted_data'))
+                if stale_claimed_at:
+                    # Only the caller that still sees the stale marker replaces it
+                    rows = await self._request('PATCH', 'call_logs', {
+                        'vapi_call_id': f'eq.{vapi_call_id}',
+                        'extracted_data->>claimed_at': f'eq.{stale_claimed_at}'
+                    }, {'extracted_data': marker})
+                    if rows:
+                        print(f"♻️  Took over end-of-call claim for {vapi_call_id} from {stale_claimed_at}")
+                        return {"success": True, "claimed": True}
+                # Already claimed or already processed
+                return {"success": True, "claimed": False}
+
+            # No call log yet - vapi_call_id is unique, so only one insert is stored
+            rows = await self._request('POST', 'call_logs', {'on_conflict': 'vapi_call_id'}, {
+                'vapi_call_id': vapi_call_id,
+                'status': 'completed',
+                'extracted_data': marker
+            }, prefer='resolution=ignore-duplicates')
+            return {"success": True, "claimed": bool(rows)}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @traced()
+    async def save_extracted_data(self, vapi_call_id: str, extracted_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Store the AI-extracted data for a call, or pass None to release an unfinished claim"""
+        return await self.update_call_log(vapi_call_id, {'extracted_data': extracted_data})
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Pooled client shared by the database, OpenAI and VAPI calls of one server process
+    ASYNC_HTTP_MAX_CONNECTIONS bounds the in-flight requests, ASYNC_HTTP_TIMEOUT_SECONDS each request
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=int(os.getenv('ASYNC_HTTP_MAX_CONNECTIONS', '200')),
+            max_keepalive_connections=int(os.getenv('ASYNC_HTTP_KEEPALIVE_CONNECTIONS', '50'))
+        ),
+        timeout=httpx.Timeout(float(os.getenv('ASYNC_HTTP_TIMEOUT_SECONDS', '30')))
+    )
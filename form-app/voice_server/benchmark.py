@@ -0,0 +1,823 @@
+#!/usr/bin/env python3
+"""
+Webhook Benchmark for the Voice Server
+Replays synthetic VAPI call streams against a local server backed by in-memory Supabase/OpenAI stand-ins
+
+Nothing leaves the machine: the server under test is started as a subprocess
+with SUPABASE_URL and OPENAI_BASE_URL pointing at a stand-in HTTP server in
+this process. The stand-in keeps applications and call_logs in memory and
+answers chat completions with a canned extraction, with configurable latency.
+
+    python benchmark.py                              # every scenario against vapi_webhook.py
+    python benchmark.py steady burst --server serve  # pre-forked server (serve.py)
+    python benchmark.py --server asgi                # async server (needs uvicorn)
+    python benchmark.py smoke --calls 20 --turns 40  # override a scenario's shape
+    python benchmark.py --storage sqlite             # DatabaseManager on a local SQLite file - no network at all
+    python benchmark.py --save-baseline              # record results as the new baseline
+
+Results are compared with benchmark_baselines.json. A p95/p99 latency or
+memory increase, or a throughput drop, beyond --tolerance is reported as a
+regression and the script exits with status 1.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import argparse
+import json
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import requests
+
+from phone_lookup import format_phone_to_e164
+
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(SERVER_DIR, 'benchmark_baselines.json')
+
+# calls: concurrent calls, turns: conversation-updates per call (each carries the whole history so far),
+# db_latency_ms / openai_latency_ms: simulated round trip of every stand-in request
+SCENARIOS = {
+    'smoke': {'calls': 5, 'turns': 8, 'db_latency_ms': 0, 'openai_latency_ms': 0},
+    'steady': {'calls': 50, 'turns': 30, 'db_latency_ms': 10, 'openai_latency_ms': 500},
+    'burst': {'calls': 200, 'turns': 10, 'db_latency_ms': 10, 'openai_latency_ms': 500},
+    'long-calls': {'calls': 20, 'turns': 150, 'db_latency_ms': 10, 'openai_latency_ms': 1500},
+}
+
+# Metric -> True if higher is better, used for baseline comparisons
+COMPARED_METRICS = {
+    'ack_p95_ms': False,
+    'ack_p99_ms': False,
+    'processing_p95_ms': False,
+    'processing_p99_ms': False,
+    'end_of_call_p95_ms': False,
+    'throughput_rps': True,
+    'processed_rps': True,
+    'peak_rss_mb': False,
+}
+
+ASSISTANT_LINES = [
+    "Hi, this is Morgan calling about your mortgage application. Is now a good time?",
+    "Great. Could you confirm your date of birth for me?",
+    "Thanks. What loan amount are you looking for?",
+    "And what's the address of the property?",
+    "Roughly what do you think the property is worth today?",
+    "Is there an existing mortgage balance on it?",
+    "Will this be your primary residence or an investment property?",
+    "Are you employed, self-employed or retired?",
+    "What's your approximate annual household income?",
+]
+
+USER_LINES = [
+    "Yes, I have a few minutes.",
+    "Sure, it's April first, nineteen eighty-five.",
+    "About two hundred and fifty thousand.",
+    "It's 42 Maple Street in Toronto.",
+    "I'd say around eight hundred thousand.",
+    "About three hundred thousand left on it.",
+    "It's where I live, so primary residence.",
+    "I'm employed full time.",
+    "Around one hundred and ten thousand a year.",
+]
+
+EXTRACTION = {
+    "date_of_birth": "04/01/1985",
+    "loan_amount": "250000",
+    "property_address": "42 Maple Street, Toronto",
+    "property_value": "800000",
+    "mortgage_balance": "300000",
+    "property_usage": "primary residence",
+    "employment_type": "employed",
+    "annual_income": "110000",
+    "what_looking_to_do": "refinance"
+}
+
+
+class InMemorySupabase:
+    """The subset of PostgREST the voice server uses: eq/neq/is/in filters, order, limit, unique vapi_call_id"""
+
+    UNIQUE_KEYS = {'call_logs': ('vapi_call_id',), 'call_transcript_events': ('vapi_call_id', 'seq')}
+    # Columns the migrations' triggers maintain: table -> (column, source column, function)
+    DERIVED = {'applications': ('phone_e164', 'phone', format_phone_to_e164)}
+    RESERVED_PARAMS = ('select', 'order', 'limit', 'offset', 'on_conflict', 'columns')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tables: Dict[str, List[Dict[str, Any]]] = {'applications': [], 'call_logs': [], 'call_transcript_events': []}
+
+    def seed_applications(self, applications: List[Dict[str, Any]]):
+        with self._lock:
+            for application in applications:
+                self.tables['applications'].append(self._new_row('applications', application))
+
+    def _new_row(self, table: str, values: Dict[str, Any]) -> Dict[str, Any]:
+        row = {'id': str(uuid.uuid4()), 'created_at': datetime.utcnow().isoformat()}
+        row.update(values)
+        return self._derive(table, row, row)
+
+    def _derive(self, table: str, row: Dict[str, Any], written: Dict[str, Any]) -> Dict[str, Any]:
+        if table in self.DERIVED:
+            column, source, derive = self.DERIVED[table]
+            if source in written:
+                row[column] = derive(row.get(source))
+        return row
+
+    @staticmethod
+    def _matches(row: Dict[str, Any], filters: List[Tuple[str, str]]) -> bool:
+        for column, condition in filters:
+            operator, _, operand = condition.partition('.')
+            # 'extracted_data->>claimed_at' is a field of a JSON column
+            column, _, field = column.partition('->>')
+            value = row.get(column)
+            if field:
+                value = value.get(field) if isinstance(value, dict) else None
+            if operator == 'eq' and str(value) != operand:
+                return False
+            if operator == 'neq' and str(value) == operand:
+                return False
+            if operator == 'is' and operand == 'null' and value is not None:
+                return False
+            if operator == 'in' and str(value) not in operand.strip('()').split(','):
+                return False
+        return True
+
+    def _filters(self, params: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        return [(key, value) for key, value in params if key not in self.RESERVED_PARAMS]
+
+    def select(self, table: str, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        options = dict(params)
+        filters = self._filters(params)
+        with self._lock:
+            rows = [dict(row) for row in self.tables.setdefault(table, []) if self._matches(row, filters)]
+        if options.get('order'):
+            column, _, direction = options['order'].partition('.')
+            rows.sort(key=lambda row: str(row.get(column) or ''), reverse=direction.startswith('desc'))
+        offset = int(options.get('offset', 0))
+        rows = rows[offset:offset + int(options['limit'])] if options.get('limit') else rows[offset:]
+        columns = options.get('select', '*')
+        if columns != '*' and '(' not in columns:
+            # Projected selects return less, as they do from PostgREST
+            names = [name.strip() for name in columns.split(',')]
+            rows = [{name: row.get(name) for name in names} for row in rows]
+        return rows
+
+    def insert(self, table: str, body: Any, resolution: Optional[str] = None) -> Tuple[int, Any]:
+        """
+        POST. Prefer: resolution=ignore-duplicates is ON CONFLICT DO NOTHING,
+        resolution=merge-duplicates ON CONFLICT DO UPDATE with the posted columns
+        """
+        unique = self.UNIQUE_KEYS.get(table)
+        with self._lock:
+            rows = self.tables.setdefault(table, [])
+            keys = {tuple(row.get(column) for column in unique): row for row in rows} if unique else {}
+            inserted = []
+            for values in body if isinstance(body, list) else [body]:
+                key = tuple(values.get(column) for column in unique) if unique else None
+                if key in keys and None not in key:
+                    if resolution == 'ignore-duplicates':
+                        continue
+                    if resolution == 'merge-duplicates':
+                        keys[key].update(values)
+                        self._derive(table, keys[key], values)
+                        inserted.append(dict(keys[key]))
+                        continue
+                    return 409, {'code': '23505', 'message': f'duplicate key value violates unique constraint "{table}_pkey"',
+                                 'details': None, 'hint': None}
+                row = self._new_row(table, values)
+                if unique:
+                    keys[key] = row
+                rows.append(row)
+                inserted.append(dict(row))
+        return 201, inserted
+
+    def update(self, table: str, params: List[Tuple[str, str]], body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        filters = self._filters(params)
+        with self._lock:
+            updated = []
+            for row in self.tables.setdefault(table, []):
+                if self._matches(row, filters):
+                    row.update(body)
+                    self._derive(table, row, body)
+                    updated.append(dict(row))
+        return updated
+
+    def delete(self, table: str, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        filters = self._filters(params)
+        with self._lock:
+            rows = self.tables.setdefault(table, [])
+            deleted = [row for row in rows if self._matches(row, filters)]
+            self.tables[table] = [row for row in rows if not self._matches(row, filters)]
+        return deleted
+
+
+class StandInServer:
+    """Local HTTP server standing in for Supabase (/rest/v1), OpenAI (/v1/chat/completions) and VAPI (/call)"""
+
+    def __init__(self, db_latency_ms: float = 0, openai_latency_ms: float = 0):
+        self.store = InMemorySupabase()
+        self.db_latency = db_latency_ms / 1000
+        self.openai_latency = openai_latency_ms / 1000
+        self.request_counts: Dict[str, int] = {'supabase': 0, 'openai': 0, 'vapi': 0}
+        self._counts_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, name='stand-in', daemon=True).start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _count(self, service: str):
+        with self._counts_lock:
+            self.request_counts[service] += 1
+
+    def _handler_class(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are separate writes - without this, keep-alive clients wait on delayed ACKs
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: Any):
+                payload = json.dumps(body, default=str).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _body(self) -> Any:
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length)) if length else None
+
+            def _handle(self):
+                url = urlsplit(self.path)
+                body = self._body()
+                try:
+                    if url.path.startswith('/rest/v1/'):
+                        stand_in._count('supabase')
+                        time.sleep(stand_in.db_latency)
+                        return self._postgrest(url.path[len('/rest/v1/'):], parse_qsl(url.query, keep_blank_values=True), body)
+                    if url.path.endswith('/chat/completions'):
+                        stand_in._count('openai')
+                        time.sleep(stand_in.openai_latency)
+                        return self._send(200, chat_completion(body))
+                    if url.path.startswith('/call'):
+                        stand_in._count('vapi')
+                        return self._send(201, {'id': str(uuid.uuid4()), 'status': 'queued'})
+                    return self._send(404, {'message': f'No stand-in for {url.path}'})
+                except Exception as e:
+                    return self._send(500, {'message': str(e)})
+
+            def _postgrest(self, table: str, params: List[Tuple[str, str]], body: Any):
+                store = stand_in.store
+                if self.command == 'GET':
+                    return self._send(200, store.select(table, params))
+                if self.command == 'POST':
+                    prefer = dict(part.strip().partition('=')[::2] for part in (self.headers.get('Prefer') or '').split(',') if part.strip())
+                    status, result = store.insert(table, body, prefer.get('resolution'))
+                    return self._send(status, result)
+                if self.command == 'PATCH':
+                    return self._send(200, store.update(table, params, body or {}))
+                if self.command == 'DELETE':
+                    return self._send(200, store.delete(table, params))
+                return self._send(405, {'message': f'{self.command} not supported'})
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _handle
+
+        return Handler
+
+
+def chat_completion(request_body: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """OpenAI chat.completion response carrying the canned extraction"""
+    return {
+        'id': f'chatcmpl-{uuid.uuid4().hex[:12]}',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': (request_body or {}).get('model', 'gpt-5'),
+        'choices': [{
+            'index': 0,
+            'finish_reason': 'stop',
+            'message': {'role': 'assistant', 'content': json.dumps(EXTRACTION)}
+        }],
+        'usage': {'prompt_tokens': 900, 'completion_tokens': 120, 'total_tokens': 1020}
+    }
+
+
+def bench_application(index: int) -> Dict[str, Any]:
+    """applications row the synthetic call with this index is linked to"""
+    return {
+        'id': f'bench-app-{index:05d}',
+        'first_name': 'Bench',
+        'last_name': f'Caller{index}',
+        'email': f'bench{index}@example.com',
+        'phone': f'+1555{index:07d}',
+    }
+
+
+def conversation_messages(turns: int, started: datetime) -> List[Dict[str, Any]]:
+    """A system prompt followed by `turns` alternating assistant/user messages, shaped like artifact.messages"""
+    messages = [{'role': 'system', 'message': 'You are Morgan, a mortgage intake assistant.', 'time': started.timestamp() * 1000,
+                 'secondsFromStart': 0}]
+    for turn in range(turns):
+        assistant = turn % 2 == 0
+        lines = ASSISTANT_LINES if assistant else USER_LINES
+        seconds = 2 + turn * 6
+        messages.append({
+            'role': 'bot' if assistant else 'user',
+            'message': f"{lines[(turn // 2) % len(lines)]} ({turn})",
+            'time': (started + timedelta(seconds=seconds)).timestamp() * 1000,
+            'endTime': (started + timedelta(seconds=seconds + 5)).timestamp() * 1000,
+            'secondsFromStart': seconds,
+            'duration': 5000
+        })
+    return messages
+
+
+def call_events(index: int, turns: int, run_id: str) -> List[Dict[str, Any]]:
+    """
+    Webhooks for one synthetic call, in the order VAPI sends them:
+    call-start, status-updates, conversation-updates with a growing history, end-of-call-report
+    """
+    started = datetime.utcnow()
+    application = bench_application(index)
+    call = {
+        'id': f'bench-{run_id}-{index:05d}',
+        'orgId': 'bench-org',
+        'type': 'outboundPhoneCall',
+        'createdAt': started.isoformat() + 'Z',
+        'phoneNumberId': 'bench-phone-number',
+        'customer': {'number': application['phone']},
+        'assistantOverrides': {'variableValues': {
+            'application_id': application['id'],
+            'first_name': application['first_name'],
+            'last_name': application['last_name'],
+            'email': application['email'],
+        }},
+    }
+    messages = conversation_messages(turns, started)
+
+    def event(event_type: str, call_status: str, history: List[Dict[str, Any]], **extra) -> Dict[str, Any]:
+        message = {
+            'timestamp': int(time.time() * 1000),
+            'type': event_type,
+            'call': dict(call, status=call_status),
+            'artifact': {'messages': history},
+        }
+        message.update(extra)
+        return {'message': message}
+
+    events = [
+        event('call-start', 'queued', []),
+        event('status-update', 'ringing', [], status='ringing'),
+        event('status-update', 'in-progress', messages[:1], status='in-progress'),
+    ]
+    for turn in range(1, turns + 1):
+        history = messages[:turn + 1]
+        events.append(event('conversation-update', 'in-progress', history, messages=history))
+    events.append(event('status-update', 'ended', messages, status='ended', endedReason='customer-ended-call'))
+
+    transcript = '\n'.join(f"{'AI' if m['role'] == 'bot' else 'User'}: {m['message']}" for m in messages[1:])
+    events.append(event(
+        'end-of-call-report', 'ended', messages,
+        endedReason='customer-ended-call',
+        summary='Caller confirmed their details and is looking to refinance.',
+        cost=0.42,
+        costBreakdown={'transport': 0.05, 'stt': 0.08, 'llm': 0.21, 'tts': 0.08, 'total': 0.42},
+        durationSeconds=turns * 6 + 10,
+        endedAt=(started + timedelta(seconds=turns * 6 + 10)).isoformat() + 'Z',
+        artifact={'messages': messages, 'transcript': transcript}
+    ))
+    return events
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(server: str, port: int, processes: int) -> List[str]:
+    if server == 'flask':
+        # VapiWebHookServer always binds 5001, so the port is set after construction
+        return [sys.executable, '-c', f"import vapi_webhook; server = vapi_webhook.VapiWebHookServer(); server.port = {port}; server.run()"]
+    if server == 'serve':
+        return [sys.executable, 'serve.py', '--workers', str(processes), '--host', '127.0.0.1', '--port', str(port)]
+    if server == 'asgi':
+        return [sys.executable, 'asgi_app.py']
+    raise ValueError(f"Unknown server: {server}")
+
+
+def process_tree_rss(pid: int) -> Optional[int]:
+    """Resident memory in bytes of pid and all its descendants (Linux /proc), or None if unavailable"""
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    total = 0
+    pending = [pid]
+    try:
+        while pending:
+            current = pending.pop()
+            with open(f'/proc/{current}/statm') as statm:
+                total += int(statm.read().split()[1]) * page_size
+            for task in os.listdir(f'/proc/{current}/task'):
+                try:
+                    with open(f'/proc/{current}/task/{task}/children') as children:
+                        pending.extend(int(child) for child in children.read().split())
+                except OSError:
+                    continue
+    except (OSError, ValueError):
+        return total or None
+    return total
+
+
+METRIC_LINE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'(\w+)="([^"]*)"')
+
+
+def parse_metrics(text: str) -> List[Tuple[str, Dict[str, str], float]]:
+    samples = []
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            samples.append((match.group(1), dict(LABEL.findall(match.group(2) or '')), float(match.group(3))))
+    return samples
+
+
+def histogram_quantile(samples, quantile: float, **labels) -> Optional[float]:
+    """Estimate a quantile in seconds from vapi_webhook_stage_seconds buckets, like PromQL histogram_quantile"""
+    buckets: Dict[float, float] = {}
+    for name, sample_labels, value in samples:
+        if name != 'vapi_webhook_stage_seconds_bucket':
+            continue
+        if any(sample_labels.get(key) != wanted for key, wanted in labels.items()):
+            continue
+        bound = float('inf') if sample_labels['le'] == '+Inf' else float(sample_labels['le'])
+        buckets[bound] = buckets.get(bound, 0) + value
+
+    if not buckets:
+        return None
+    bounds = sorted(buckets)
+    total = buckets[bounds[-1]]
+    if total == 0:
+        return None
+    rank = quantile * total
+    lower_bound, lower_count = 0.0, 0.0
+    for bound in bounds:
+        count = buckets[bound]
+        if count >= rank:
+            if bound == float('inf'):
+                return lower_bound
+            if count == lower_count:
+                return bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+        lower_bound, lower_count = bound, count
+    return bounds[-2] if len(bounds) > 1 else None
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def metric_total(samples, name: str, **labels) -> float:
+    return sum(
+        value for sample_name, sample_labels, value in samples
+        if sample_name == name and all(sample_labels.get(key) == wanted for key, wanted in labels.items())
+    )
+
+
+def stage_errors(samples) -> Dict[str, int]:
+    errors: Dict[str, int] = {}
+    for name, labels, value in samples:
+        if name == 'vapi_webhook_errors_total':
+            errors[labels.get('stage', 'unknown')] = errors.get(labels.get('stage', 'unknown'), 0) + int(value)
+    return errors
+
+
+class ScenarioRun:
+    """One scenario: fresh stand-in, fresh server subprocess, concurrent call streams, then the report"""
+
+    def __init__(self, name: str, shape: Dict[str, Any], server: str, processes: int, timeout: float,
+                 storage: str = 'supabase'):
+        self.name = name
+        self.shape = shape
+        self.server = server
+        self.storage = storage
+        self.processes = processes
+        self.timeout = timeout
+        self.port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.workdir = tempfile.mkdtemp(prefix=f'vapi-bench-{name}-')
+        self.stand_in = StandInServer(shape['db_latency_ms'], shape['openai_latency_ms'])
+        self.process: Optional[subprocess.Popen] = None
+        self.peak_rss = 0
+        self._sampling = threading.Event()
+
+    def server_env(self) -> Dict[str, str]:
+        env = dict(os.environ)
+        env.update({
+            'SUPABASE_URL': self.stand_in.url,
+            'OPENAI_BASE_URL': f'{self.stand_in.url}/v1',
+            'OPENAI_API_KEY': 'benchmark',
+            'VAPI_API_PRIVATE_KEY': 'benchmark',
+            'VAPI_WAL_DIR': os.path.join(self.workdir, 'wal'),
+            'WEBHOOK_DEDUPE_DB': os.path.join(self.workdir, 'webhook_seen.db'),
+            'VAPI_SERVER_HOST': '127.0.0.1',
+            'VAPI_SERVER_PORT': str(self.port),
+            'VAPI_LOG_LEVEL': env.get('VAPI_LOG_LEVEL', 'WARNING'),
+            'VAPI_METRICS_FLUSH_SECONDS': '0.5',
+            'PYTHONUNBUFFERED': '1',
+            'VAPI_STORAGE_BACKEND': self.storage,
+            'VAPI_SQLITE_PATH': self.sqlite_path(),
+        })
+        env.pop('VAPI_WEBHOOK_SECRET', None)
+        return env
+
+    def sqlite_path(self) -> str:
+        return os.path.join(self.workdir, 'voice_server.db')
+
+    def seed_applications(self, applications: List[Dict[str, Any]]):
+        if self.storage == 'sqlite':
+            from storage import SQLiteStorage
+            sqlite = SQLiteStorage(self.sqlite_path())
+            for application in applications:
+                sqlite.insert('applications', application)
+        else:
+            self.stand_in.store.seed_applications(applications)
+
+    def stored_rows(self, table: str) -> List[Dict[str, Any]]:
+        if self.storage == 'sqlite':
+            from storage import SQLiteStorage
+            return SQLiteStorage(self.sqlite_path()).select(table)
+        return self.stand_in.store.tables[table]
+
+    def start_server(self):
+        log = open(os.path.join(self.workdir, 'server.log'), 'w')
+        self.process = subprocess.Popen(server_command(self.server, self.port, self.processes), cwd=SERVER_DIR,
+                                        env=self.server_env(), stdout=log, stderr=subprocess.STDOUT)
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                response = requests.get(f"{self.base_url}/health", timeout=1)
+                # Wait for the service warm-up too, so the first events don't measure client creation
+                if response.status_code == 200 and response.json().get('ready', True):
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"Server did not start - see {self.server_log_tail()}")
+
+    def server_log_tail(self) -> str:
+        with open(os.path.join(self.workdir, 'server.log')) as log:
+            return ''.join(log.readlines()[-15:])
+
+    def stop_server(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+    def _sample_memory(self):
+        while not self._sampling.wait(0.2):
+            rss = process_tree_rss(self.process.pid)
+            if rss:
+                self.peak_rss = max(self.peak_rss, rss)
+
+    def _run_call(self, events: List[bytes], latencies: List[float], failures: List[int]):
+        session = requests.Session()
+        headers = {'Content-Type': 'application/json'}
+        for body in events:
+            start = time.perf_counter()
+            try:
+                response = session.post(f"{self.base_url}/vapi/webhook", data=body, headers=headers, timeout=30)
+                status = response.status_code
+            except requests.RequestException:
+                status = 0
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status != 200:
+                failures.append(status)
+        session.close()
+
+    def scrape_metrics(self):
+        return parse_metrics(requests.get(f"{self.base_url}/metrics", timeout=10).text)
+
+    def wait_until_processed(self, expected: int, end_calls: int = 0) -> float:
+        """
+        Seconds until the server reports every accepted webhook as processed, and the
+        end-of-call extractions (deferred past that) of end_calls calls as finished
+        """
+        deadline = time.time() + self.timeout
+        while time.time() < deadline:
+            samples = self.scrape_metrics()
+            if (metric_total(samples, 'vapi_webhooks_total') >= expected and
+                    metric_total(samples, 'vapi_webhook_stage_seconds_count', stage='end_call') >= end_calls):
+                return time.time()
+            time.sleep(0.1)
+        raise RuntimeError(f"Timed out after {self.timeout}s waiting for {expected} webhooks to be processed")
+
+    def run(self) -> Dict[str, Any]:
+        calls, turns = self.shape['calls'], self.shape['turns']
+        run_id = uuid.uuid4().hex[:8]
+        self.seed_applications([bench_application(index) for index in range(calls)])
+        streams = [[json.dumps(event).encode() for event in call_events(index, turns, run_id)] for index in range(calls)]
+        total_events = sum(len(stream) for stream in streams)
+
+        self.stand_in.start()
+        try:
+            self.start_server()
+            baseline_rss = process_tree_rss(self.process.pid) or 0
+            sampler = threading.Thread(target=self._sample_memory, daemon=True)
+            sampler.start()
+
+            latencies: List[float] = []
+            failures: List[int] = []
+            started = time.time()
+            with ThreadPoolExecutor(max_workers=calls) as executor:
+                for stream in streams:
+                    executor.submit(self._run_call, stream, latencies, failures)
+            sent = time.time()
+            accepted = total_events - len(failures)
+            finished = self.wait_until_processed(accepted, end_calls=calls if not failures else 0)
+
+            samples = self.scrape_metrics()
+            self._sampling.set()
+            sampler.join()
+            final_rss = process_tree_rss(self.process.pid) or 0
+        finally:
+            self.stop_server()
+            self.stand_in.stop()
+
+        applications = self.stored_rows('applications')
+        filled = sum(1 for application in applications if application.get('loan_amount_requested'))
+        transcript_events = len(self.stored_rows('call_transcript_events'))
+
+        def milliseconds(seconds: Optional[float]) -> Optional[float]:
+            return round(seconds * 1000, 2) if seconds is not None else None
+
+        result = {
+            'scenario': self.name,
+            'server': self.server,
+            'storage': self.storage,
+            'calls': calls,
+            'turns': turns,
+            'webhooks': total_events,
+            'failed_requests': len(failures),
+            'ack_p50_ms': round(percentile(latencies, 0.50), 2),
+            'ack_p95_ms': round(percentile(latencies, 0.95), 2),
+            'ack_p99_ms': round(percentile(latencies, 0.99), 2),
+            'processing_p50_ms': milliseconds(histogram_quantile(samples, 0.50, stage='total')),
+            'processing_p95_ms': milliseconds(histogram_quantile(samples, 0.95, stage='total')),
+            'processing_p99_ms': milliseconds(histogram_quantile(samples, 0.99, stage='total')),
+            'end_of_call_p95_ms': milliseconds(histogram_quantile(samples, 0.95, stage='total', type='end-of-call-report')),
+            'throughput_rps': round(total_events / max(sent - started, 1e-9), 1),
+            'processed_rps': round(accepted / max(finished - started, 1e-9), 1),
+            'stage_errors': stage_errors(samples),
+            'baseline_rss_mb': round(baseline_rss / 2**20, 1),
+            'peak_rss_mb': round(max(self.peak_rss, final_rss) / 2**20, 1),
+            'applications_filled': filled,
+            # Every call's history is a system prompt plus one message per turn
+            'transcript_events': transcript_events,
+            'transcript_events_expected': calls * (turns + 1),
+            'stand_in_requests': dict(self.stand_in.request_counts),
+        }
+        shutil.rmtree(self.workdir, ignore_errors=True)
+        return result
+
+
+def load_baselines(path: str) -> Dict[str, Dict[str, Any]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baselines(path: str, baselines: Dict[str, Dict[str, Any]]):
+    with open(path, 'w') as baseline_file:
+        json.dump(baselines, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write('\n')
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print the change of every compared metric and return the ones that regressed beyond tolerance"""
+    regressions = []
+    for metric, higher_is_better in COMPARED_METRICS.items():
+        current, previous = result.get(metric), baseline.get(metric)
+        if not current or not previous:
+            continue
+        change = (current - previous) / previous
+        regressed = change < -tolerance if higher_is_better else change > tolerance
+        marker = '❌' if regressed else '  '
+        print(f"   {marker} {metric:<22} {previous:>10} -> {current:<10} ({change:+.1%})")
+        if regressed:
+            regressions.append(metric)
+    return regressions
+
+
+def print_result(result: Dict[str, Any]):
+    print(f"📊 {result['server']}:{result['storage']}:{result['scenario']} - {result['calls']} calls x {result['turns']} turns, "
+          f"{result['webhooks']} webhooks")
+    print(f"   ack latency        p50 {result['ack_p50_ms']} ms  p95 {result['ack_p95_ms']} ms  p99 {result['ack_p99_ms']} ms")
+    print(f"   processing latency p50 {result['processing_p50_ms']} ms  p95 {result['processing_p95_ms']} ms  "
+          f"p99 {result['processing_p99_ms']} ms  (end-of-call p95 {result['end_of_call_p95_ms']} ms)")
+    print(f"   throughput         {result['throughput_rps']} webhooks/s acknowledged, {result['processed_rps']} webhooks/s processed")
+    print(f"   memory             {result['baseline_rss_mb']} MB at start, {result['peak_rss_mb']} MB peak")
+    errors = result['stage_errors']
+    error_detail = f" {errors}" if errors else ''
+    print(f"   correctness        {result['failed_requests']} failed requests, {sum(errors.values())} stage errors{error_detail}, "
+          f"{result['applications_filled']}/{result['calls']} applications filled, "
+          f"{result['transcript_events']}/{result['transcript_events_expected']} transcript messages stored")
+    print(f"   stand-in requests  {result['stand_in_requests']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the VAPI webhook server with synthetic calls and local stand-ins")
+    parser.add_argument('scenarios', nargs='*', default=list(SCENARIOS), help=f"Scenarios to run ({', '.join(SCENARIOS)})")
+    parser.add_argument('--server', choices=['flask', 'serve', 'asgi'], default='flask',
+                        help="flask: vapi_webhook.py, serve: pre-forked serve.py, asgi: asgi_app.py under uvicorn")
+    parser.add_argument('--processes', type=int, default=4, help="Worker processes for --server serve")
+    parser.add_argument('--storage', choices=['supabase', 'sqlite'], default='supabase',
+                        help="supabase: PostgREST stand-in over HTTP, sqlite: DatabaseManager on a local SQLite file")
+    parser.add_argument('--calls', type=int, help="Override the number of concurrent calls")
+    parser.add_argument('--turns', type=int, help="Override the conversation-updates per call")
+    parser.add_argument('--db-latency-ms', type=float, help="Override the simulated Supabase latency")
+    parser.add_argument('--openai-latency-ms', type=float, help="Override the simulated OpenAI latency")
+    parser.add_argument('--timeout', type=float, default=300, help="Seconds to wait for the server to drain its queues")
+    parser.add_argument('--baseline-file', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Relative change counted as a regression")
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenario(s): {', '.join(unknown)}")
+    if args.storage == 'sqlite' and args.server == 'asgi':
+        parser.error("--storage sqlite needs a DatabaseManager server (flask or serve) - async_db talks to PostgREST directly")
+
+    baselines = load_baselines(args.baseline_file)
+    results = []
+    regressions = {}
+    for name in args.scenarios:
+        shape = dict(SCENARIOS[name])
+        for key in ('calls', 'turns', 'db_latency_ms', 'openai_latency_ms'):
+            if getattr(args, key) is not None:
+                shape[key] = getattr(args, key)
+
+        print("=" * 100)
+        print(f"🏁 Running {name} on {args.server} ({args.storage}): {shape}")
+        result = ScenarioRun(name, shape, args.server, args.processes, args.timeout, args.storage).run()
+        results.append(result)
+        print_result(result)
+
+        # Supabase keys keep their original form so existing baselines still apply
+        key = f"{args.server}:{name}" if args.storage == 'supabase' else f"{args.server}:{args.storage}:{name}"
+        if key in baselines and not args.save_baseline:
+            print(f"   compared with baseline from {baselines[key].get('recorded_at', 'unknown')}:")
+            regressed = compare(result, baselines[key], args.tolerance)
+            if regressed:
+                regressions[key] = regressed
+        if args.save_baseline:
+            baselines[key] = dict(result, recorded_at=datetime.utcnow().isoformat(timespec='seconds'))
+
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(results, json_file, indent=2)
+
+    print("=" * 100)
+    if args.save_baseline:
+        save_baselines(args.baseline_file, baselines)
+        print(f"💾 Baseline saved to {args.baseline_file}")
+    if regressions:
+        for key, metrics in regressions.items():
+            print(f"❌ {key} regressed: {', '.join(metrics)}")
+        sys.exit(1)
+    if not args.save_baseline:
+        print("✅ No regressions" if baselines else "💡 No baseline yet - run with --save-baseline to record one")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark for the Voice Server
+Import time of the server entry points, checked against a budget
+
+Each module is imported in fresh interpreters (no warm bytecode or module
+cache beyond __pycache__). The script fails when the median import time is
+over budget, or when an import has side effects it should not have:
+loading a heavy client library or the test helpers, or creating a service
+(database, call logger, OpenAI client) or storage backend.
+
+    python benchmark_startup.py                          # every entry point, 5 imports each
+    python benchmark_startup.py vapi_webhook --runs 10
+    python benchmark_startup.py --scale 2                # double every budget on a slow machine
+    python benchmark_startup.py --budget serve=300       # override one budget (ms)
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Median import time budget per entry point, in milliseconds. Flask and FastAPI themselves
+# take most of it; openai alone used to add about 500 ms
+BUDGETS_MS = {
+    'vapi_webhook': 400,
+    'serve': 450,
+    'wal_replay': 100,
+    'asgi_app': 800,
+}
+
+# Modules that must not be loaded by importing a server: created lazily or only used by tests
+FORBIDDEN_MODULES = ('openai', 'supabase', 'test', 'test_calls', 'test_call_trigger', 'models')
+
+# Run in the child interpreter: import the module, then report what the import did
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+try:
+    import {module}
+except ModuleNotFoundError as e:
+    print(json.dumps({{"missing": e.name}}))
+    sys.exit(0)
+elapsed = (time.perf_counter() - started) * 1000
+import services, storage
+print(json.dumps({{
+    "import_ms": elapsed,
+    "loaded": [name for name in {forbidden!r} if name in sys.modules],
+    "services": [name for name in ('db', 'call_logger', 'openai') if services.container.created(name)],
+    "storage": storage._storage is not None,
+}}))
+'''
+
+
+def probe(module: str) -> Dict[str, Any]:
+    """Import module in a fresh interpreter and return what the probe reported"""
+    env = dict(os.environ, VAPI_TRACE_EXPORTER='none')
+    completed = subprocess.run(
+        [sys.executable, '-c', PROBE.format(module=module, forbidden=FORBIDDEN_MODULES)],
+        cwd=SERVER_DIR, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{completed.stderr.strip()}")
+    # The module may print while importing; the report is the last line
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(module: str, count: int = 8) -> List[Tuple[float, str]]:
+    """The direct imports of module that take longest, from python -X importtime"""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=SERVER_DIR, capture_output=True, text=True
+    )
+    # Children are printed before their parent, indented two spaces per level
+    children: List[Tuple[float, str]] = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            if name.strip() == module:
+                return sorted(children, reverse=True)[:count]
+            children = []
+        elif depth == 1:
+            children.append((int(cumulative) / 1000, name.strip()))
+    return []
+
+
+def measure(module: str, runs: int) -> Optional[Dict[str, Any]]:
+    """Median import time over runs, plus the side effects of the import. None if a dependency is missing"""
+    # One warm-up import so every run reads the same compiled bytecode
+    first = probe(module)
+    if 'missing' in first:
+        print(f"⏭️  {module}: skipped, {first['missing']} is not installed")
+        return None
+
+    reports = [probe(module) for _ in range(runs)]
+    return {
+        'module': module,
+        'median_ms': statistics.median(report['import_ms'] for report in reports),
+        'max_ms': max(report['import_ms'] for report in reports),
+        'loaded': first['loaded'],
+        'services': first['services'],
+        'storage': first['storage'],
+    }
+
+
+def parse_budgets(overrides: List[str]) -> Dict[str, float]:
+    budgets = dict(BUDGETS_MS)
+    for override in overrides:
+        module, _, value = override.partition('=')
+        if not value:
+            raise ValueError(f"--budget expects MODULE=MS, got {override!r}")
+        budgets[module] = float(value)
+    return budgets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check voice server import time against a budget")
+    parser.add_argument('modules', nargs='*', help=f"Entry points to import (default: {', '.join(BUDGETS_MS)})")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh-interpreter imports per module")
+    parser.add_argument('--budget', action='append', default=[], metavar='MODULE=MS', help="Override a module's budget")
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiply every budget, for slower machines")
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+
+    try:
+        budgets = parse_budgets(args.budget)
+    except ValueError as e:
+        parser.error(str(e))
+
+    results = []
+    failures = []
+    for module in args.modules or list(BUDGETS_MS):
+        result = measure(module, args.runs)
+        if result is None:
+            continue
+        budget = budgets.get(module, max(BUDGETS_MS.values())) * args.scale
+        result['budget_ms'] = budget
+        results.append(result)
+
+        problems = []
+        if result['median_ms'] > budget:
+            problems.append(f"median {result['median_ms']:.0f} ms is over the {budget:.0f} ms budget")
+        if result['loaded']:
+            problems.append(f"loads {', '.join(result['loaded'])}")
+        if result['services']:
+            problems.append(f"creates the {', '.join(result['services'])} service(s) at import")
+        if result['storage']:
+            problems.append("creates the storage backend at import")
+
+        marker = '❌' if problems else '✅'
+        print(f"{marker} {module:<14} median {result['median_ms']:7.1f} ms  max {result['max_ms']:7.1f} ms  budget {budget:.0f} ms")
+        for problem in problems:
+            print(f"   - {problem}")
+        if problems:
+            failures.append(module)
+            print("   slowest imports:")
+            for cumulative_ms, name in slowest_imports(module):
+                print(f"   {cumulative_ms:9.1f} ms  {name}")
+
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(results, json_file, indent=2)
+
+    if failures:
+        print(f"❌ Startup budget exceeded by: {', '.join(failures)}")
+        sys.exit(1)
+    print("✅ Startup within budget")
+
+
+if __name__ == "__main__":
+    main()
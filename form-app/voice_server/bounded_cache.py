@@ -0,0 +1,169 @@
+"""
+Bounded Cache for the Voice Server
+Dict-like in-memory cache with LRU and TTL eviction and hit/miss/eviction counters
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import heapq
+import threading
+import time
+
+
+class BoundedCache:
+    """
+    Thread-safe mapping with a size limit and two kinds of expiry.
+
+    - Idle TTL: an entry that has not been read or written for ttl_seconds is dropped.
+    - Deadlines: expire_after() pins an entry to an absolute expiry time that
+      later reads and writes do not extend (used for completed calls).
+
+    When max_entries is exceeded the least recently used entry is evicted.
+    Expiry is enforced lazily on every access, so there is no background thread.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: Optional[float] = None,
+                 on_evict: Optional[Callable[[Hashable, Any, str], None]] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.on_evict = on_evict
+        self._data: "OrderedDict[Hashable, list]" = OrderedDict()  # key -> [value, last_access, deadline]
+        self._deadlines: list = []  # heap of (deadline, key)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = {'capacity': 0, 'ttl': 0, 'deadline': 0}
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            self._expire(time.monotonic())
+            return key in self._data
+
+    def __getitem__(self, key: Hashable) -> Any:
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                raise KeyError(key)
+            self.hits += 1
+            entry[1] = now
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return (value, created), inserting factory() atomically if key is missing"""
+        with self._lock:
+            try:
+                return self[key], False
+            except KeyError:
+                value = factory()
+                self[key] = value
+                return value, True
+
+    def __setitem__(self, key: Hashable, value: Any):
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            entry = self._data.get(key)
+            if entry is None:
+                self._data[key] = [value, now, None]
+            else:
+                entry[0] = value
+                entry[1] = now
+                self._data.move_to_end(key)
+
+            while len(self._data) > self.max_entries:
+                oldest_key, oldest_entry = self._data.popitem(last=False)
+                self._evicted(oldest_key, oldest_entry[0], 'capacity')
+
+    def __delitem__(self, key: Hashable):
+        with self._lock:
+            del self._data[key]
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[0] if entry is not None else default
+
+    def expire_after(self, key: Hashable, seconds: float):
+        """Evict key a fixed number of seconds from now, regardless of later access"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return
+            deadline = time.monotonic() + seconds
+            entry[2] = deadline
+            heapq.heappush(self._deadlines, (deadline, key))
+
+    def purge_expired(self):
+        """Drop expired entries now instead of waiting for the next access"""
+        with self._lock:
+            self._expire(time.monotonic())
+
+    def items(self) -> list:
+        """Snapshot of (key, value) pairs, least recently used first"""
+        with self._lock:
+            self._expire(time.monotonic())
+            return [(key, entry[0]) for key, entry in self._data.items()]
+
+    def keys(self) -> list:
+        with self._lock:
+            self._expire(time.monotonic())
+            return list(self._data.keys())
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire(time.monotonic())
+            return len(self._data)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and hit/miss/eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0,
+                'evictions': dict(self.evictions)
+            }
+
+    def _expire(self, now: float):
+        # Pinned deadlines, earliest first
+        while self._deadlines and self._deadlines[0][0] <= now:
+            deadline, key = heapq.heappop(self._deadlines)
+            entry = self._data.get(key)
+            # Skip stale heap items for keys that were removed or re-pinned
+            if entry is not None and entry[2] == deadline:
+                del self._data[key]
+                self._evicted(key, entry[0], 'deadline')
+
+        # Idle entries sit at the LRU end of the ordered dict
+        if self.ttl_seconds is not None:
+            while self._data:
+                key, entry = next(iter(self._data.items()))
+                if now - entry[1] < self.ttl_seconds:
+                    break
+                del self._data[key]
+                self._evicted(key, entry[0], 'ttl')
+
+    def _evicted(self, key: Hashable, value: Any, reason: str):
+        self.evictions[reason] += 1
+        if self.on_evict:
+            try:
+                self.on_evict(key, value, reason)
+            except Exception as e:
+                print(f"⚠️  Cache eviction callback error: {e}")
@@ -0,0 +1,197 @@
+"""
+Call Log Write Buffer for the Voice Server
+Coalesces the call_logs updates of a live call into one write per flush interval
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import os
+import threading
+import zlib
+
+from sharded_cache import AtomicCounter
+
+
+Result = Dict[str, Any]
+
+# Locks that keep the writes of one call from overlapping - calls share them by crc32
+LOCK_STRIPES = 64
+
+
+class PendingUpdates:
+    """Field updates waiting to be written, merged per call - later values win"""
+
+    def __init__(self):
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.buffered = AtomicCounter()
+        self.written = AtomicCounter()
+
+    def merge(self, call_id: str, values: Dict[str, Any]):
+        with self._lock:
+            self._pending.setdefault(call_id, {}).update(values)
+        self.buffered.increment()
+
+    def take(self, call_id: str) -> Dict[str, Any]:
+        with self._lock:
+            return self._pending.pop(call_id, None) or {}
+
+    def calls(self) -> List[str]:
+        with self._lock:
+            return list(self._pending)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'pending': len(self._pending), 'buffered': self.buffered.value, 'written': self.written.value}
+
+
+def flush_interval_from_env() -> float:
+    return float(os.getenv('CALL_LOG_WRITE_INTERVAL_SECONDS', '1'))
+
+
+class CallLogWriteBuffer:
+    """
+    Write-behind buffer for call_logs updates, keyed by VAPI call ID.
+
+    update() merges an update into the call's pending one, and a background thread
+    writes each call's pending update once per interval, so a burst of status updates
+    costs one write. flush() writes the pending update now, merged under the values
+    it is given - terminal events use it, so their write includes and comes after
+    everything buffered before them. Writes for one call never overlap.
+
+    on_write(call_id, result) is called after each write of buffered updates.
+    An interval of 0 writes every update immediately.
+    """
+
+    def __init__(self, write: Callable[[str, Dict[str, Any]], Result], interval: float = 1.0,
+                 on_write: Optional[Callable[[str, Result], None]] = None):
+        self._write = write
+        self.interval = interval
+        self.on_write = on_write
+        self.pending = PendingUpdates()
+        self._write_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    @classmethod
+    def from_env(cls, write, on_write=None) -> 'CallLogWriteBuffer':
+        return cls(write, interval=flush_interval_from_env(), on_write=on_write)
+
+    def update(self, call_id: str, values: Dict[str, Any]):
+        """Buffer an update for the call's log"""
+        self.pending.merge(call_id, values)
+        if self.interval <= 0:
+            self._flush_buffered(call_id)
+        elif self._thread is None:
+            self._start()
+
+    def flush(self, call_id: str, values: Optional[Dict[str, Any]] = None,
+              write: Optional[Callable[[str, Dict[str, Any]], Result]] = None) -> Optional[Result]:
+        """
+        Write the call's pending update now, with values on top, through write if given
+        None if there was nothing to write
+        """
+        with self._write_locks[zlib.crc32(call_id.encode()) % LOCK_STRIPES]:
+            merged = {**self.pending.take(call_id), **(values or {})}
+            if not merged:
+                return None
+            self.pending.written.increment()
+            return (write or self._write)(call_id, merged)
+
+    def flush_all(self):
+        """Write every call's pending update"""
+        for call_id in self.pending.calls():
+            self._flush_buffered(call_id)
+
+    def stop(self):
+        """Stop the background thread and write what is still pending (server shutdown)"""
+        self._stopped.set()
+        self.flush_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.pending.stats()
+
+    def _flush_buffered(self, call_id: str):
+        result = self.flush(call_id)
+        if result is not None and self.on_write:
+            self.on_write(call_id, result)
+
+    def _start(self):
+        # Started on the first update, so forked workers each get their own thread
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._flush_loop, name='call-log-writes', daemon=True)
+                self._thread.start()
+
+    def _flush_loop(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.flush_all()
+            except Exception as e:
+                print(f"❌ Call log flush failed: {e}")
+
+
+class AsyncCallLogWriteBuffer:
+    """CallLogWriteBuffer for the event loop: awaits the writes and flushes from a task"""
+
+    def __init__(self, write: Callable[[str, Dict[str, Any]], Awaitable[Result]], interval: float = 1.0,
+                 on_write: Optional[Callable[[str, Result], None]] = None):
+        self._write = write
+        self.interval = interval
+        self.on_write = on_write
+        self.pending = PendingUpdates()
+        # asyncio locks are created in the loop that uses them
+        self._write_locks = None
+        self._task = None
+
+    @classmethod
+    def from_env(cls, write, on_write=None) -> 'AsyncCallLogWriteBuffer':
+        return cls(write, interval=flush_interval_from_env(), on_write=on_write)
+
+    async def update(self, call_id: str, values: Dict[str, Any]):
+        """Buffer an update for the call's log"""
+        self.pending.merge(call_id, values)
+        if self.interval <= 0:
+            await self._flush_buffered(call_id)
+        elif self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def flush(self, call_id: str, values: Optional[Dict[str, Any]] = None,
+                    write: Optional[Callable[[str, Dict[str, Any]], Awaitable[Result]]] = None) -> Optional[Result]:
+        """See CallLogWriteBuffer.flush"""
+        if self._write_locks is None:
+            self._write_locks = [asyncio.Lock() for _ in range(LOCK_STRIPES)]
+        async with self._write_locks[zlib.crc32(call_id.encode()) % LOCK_STRIPES]:
+            merged = {**self.pending.take(call_id), **(values or {})}
+            if not merged:
+                return None
+            self.pending.written.increment()
+            return await (write or self._write)(call_id, merged)
+
+    async def flush_all(self):
+        """Write every call's pending update"""
+        for call_id in self.pending.calls():
+            await self._flush_buffered(call_id)
+
+    async def stop(self):
+        """Cancel the flush task and write what is still pending (lifespan shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.pending.stats()
+
+    async def _flush_buffered(self, call_id: str):
+        result = await self.flush(call_id)
+        if result is not None and self.on_write:
+            self.on_write(call_id, result)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush_all()
+            except Exception as e:
+                print(f"❌ Call log flush failed: {e}")
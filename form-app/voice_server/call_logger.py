@@ -3,309 +3,475 @@ Call Logger for VAPI Integration
 Handles call logging and database integration
 """
 
-from typing import Dict, Any, Optional
-from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timedelta
+import os
+import threading
+
+from bounded_cache import BoundedCache
+from call_log_buffer import CallLogWriteBuffer
 from db import DatabaseManager
+from transcript_store import MERGE_TAIL
+from webhook_envelope import HISTORY_EVENT_TYPES, WebhookEnvelope
+from webhook_logging import get_logger, log_fields
+from webhook_metrics import instrumented, timed
+from tracing import set_attribute, traced
+import services
 import json
 
 
+logger = get_logger('call_logger')
+
+
+# Status after which VAPI sends no more live updates - failed calls end too, with an endedReason.
+# Its update is written immediately instead of being buffered
+TERMINAL_CALL_STATUSES = ('ended',)
+
+
+class CallLogCache:
+    """
+    What this process knows about each call's call_logs row: that it exists, its application_id
+    and last status. Status updates for a known call go straight to the update; the first event
+    of a call this process has not seen resolves its application and creates the row.
+    Also how much of each call's message history is stored as call_transcript_events.
+
+    Entries are dropped when the call is finalized, when an update finds no open row,
+    and after CALL_LOG_CACHE_TTL_SECONDS without events.
+    """
+
+    def __init__(self, max_calls: int = 2000, ttl_seconds: Optional[float] = 7200):
+        self._calls = BoundedCache(max_entries=max_calls, ttl_seconds=ttl_seconds)
+        self._transcript_positions = BoundedCache(max_entries=max_calls, ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'CallLogCache':
+        return cls(
+            max_calls=int(os.getenv('CALL_LOG_CACHE_MAX_CALLS', '2000')),
+            ttl_seconds=float(os.getenv('CALL_LOG_CACHE_TTL_SECONDS', '7200'))
+        )
+
+    def get(self, call_id: str) -> Optional[Dict[str, Any]]:
+        """{'application_id', 'status'} of a call whose log exists, or None if not known"""
+        state = self._calls.get(call_id)
+        return dict(state) if state is not None else None
+
+    def remember(self, call_id: str, application_id: Optional[str] = None, status: Optional[str] = None) -> Dict[str, Any]:
+        """Record that the call's log exists, keeping the fields already known when one is None"""
+        with self._lock:
+            # pop() rather than get() so the cache's hit/miss counters only count lookups
+            state = self._calls.pop(call_id) or {'application_id': None, 'status': None}
+            if application_id is not None:
+                state['application_id'] = application_id
+            if status is not None:
+                state['status'] = status
+            self._calls[call_id] = state
+            return dict(state)
+
+    def transcript_position(self, call_id: str) -> Optional[int]:
+        """Number of the call's history messages stored as events, or None if not known"""
+        return self._transcript_positions.get(call_id)
+
+    def set_transcript_position(self, call_id: str, position: int):
+        self._transcript_positions[call_id] = position
+
+    def forget(self, call_id: str):
+        self._calls.pop(call_id)
+        self._transcript_positions.pop(call_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._calls.stats()
+
+
 class CallLogger:
-    def __init__(self):
-        self.db = DatabaseManager()
-    
-    def log_call_start(self, webhook_data: Dict[str, Any]) -> Optional[str]:
+    def __init__(self, db: Optional[DatabaseManager] = None, cache: Optional[CallLogCache] = None,
+                 writes: Optional[CallLogWriteBuffer] = None):
+        self.db = db or DatabaseManager()
+        self.calls = cache or CallLogCache.from_env()
+        # Status updates of a live call are coalesced into one write per CALL_LOG_WRITE_INTERVAL_SECONDS
+        self.writes = writes or CallLogWriteBuffer.from_env(self._write_status, on_write=self._status_written)
+
+    @traced()
+    def log_call_start(self, envelope: WebhookEnvelope) -> Optional[str]:
         """
-        Log the start of a VAPI call
-        Returns call_log_id if successful
+        Log the start of a VAPI call - the first event of a call this process has not seen yet
+        The application is resolved first, then the row is inserted in one request. If the call
+        already has a log (another worker, a restart), the event updates it like a status update
+        Returns call_log_id if a log was created
         """
+        webhook_data = envelope.data
         try:
             # Handle both root-level call data and VAPI webhook structure (message.call)
-            call_data = webhook_data.get('call', {})
-            message_data = webhook_data.get('message', {})
-            
-            # VAPI sends call data in message.call
-            if not call_data and message_data.get('call'):
-                call_data = message_data['call']
-            
+            call_data = extract_call_data(webhook_data)
             call_id = call_data.get('id', 'unknown')
             phone_number = self._extract_phone_number(call_data)
+            set_attribute('call_id', call_id)
             
-            # Try to link to application by phone number
-            application_id = None
-            if phone_number:
-                application_id = self.db.link_call_to_application_by_phone(call_id, phone_number)
-            
-            # Also check variable values for application_id
-            if not application_id:
-                variable_values = self._extract_variable_values(webhook_data)
-                application_id = variable_values.get('application_id')
+            # Calls placed by /api/trigger-call name their application - otherwise link by phone number
+            application_id = envelope.variable_values.get('application_id')
+            if not application_id and phone_number:
+                application_id = instrumented('application_lookup', self.db.find_application_by_phone, phone_number)
             
-            # Create call log entry
-            call_log_data = {
-                'vapi_call_id': call_id,
-                'application_id': application_id,
-                'phone_number': phone_number,
-                'status': call_data.get('status', 'started'),
-                'started_at': call_data.get('createdAt') or datetime.utcnow().isoformat(),
-                'full_transcript': [],
-                'performance_metrics': {},
-                'cost_breakdown': {}
-            }
+            set_attribute('application_id', application_id)
+
+            # Create call log entry - concurrent first events for a call insert the same vapi_call_id,
+            # and all but one are skipped instead of failing on the unique key
+            _, _, status = webhook_call_status(webhook_data)
+            call_log_data = build_call_start_data(call_data, application_id, status)
             
-            result = self.db.create_call_log(call_log_data)
-            if result.get('success'):
-                print(f"✅ Started logging call: {call_id}")
+            result = instrumented('call_log_write', self.db.create_call_log, call_log_data, skip_existing=True)
+            if result.get('success') and result.get('data') is None:
+                self.calls.remember(call_id, application_id)
                 if application_id:
-                    print(f"   📋 Linked to application: {application_id}")
+                    self.writes.update(call_id, {'application_id': application_id})
+                self.update_call_status(call_id, call_log_data['status'], webhook_data)
+                return None
+            elif result.get('success'):
+                self.calls.remember(call_id, application_id, call_log_data['status'])
+                logger.info("started call log", extra=log_fields(call_id=call_id, application_id=application_id))
                 return result['data']['id']
             else:
-                print(f"❌ Failed to create call log: {result.get('error')}")
+                logger.error("failed to create call log", extra=log_fields(call_id=call_id, error=result.get('error')))
                 return None
                 
         except Exception as e:
-            print(f"❌ Error logging call start: {e}")
+            logger.exception("error logging call start", extra=log_fields(error=str(e)))
             return None
     
-    def update_call_transcript(self, call_id: str, transcript_messages: list):
-        """Update call with new transcript messages"""
+    @traced()
+    def update_call_transcript(self, call_id: str, transcript_messages: list, final: bool = False) -> int:
+        """
+        Store the messages of the call's VAPI history that are not stored yet, as call_transcript_events
+        Only the new messages are written, in one insert, however long the call is. final stores the
+        still-growing tail too (end-of-call-report). Returns the number of events written
+        """
         try:
-            # Get existing call log
-            existing_log = self.db.get_call_log_by_vapi_id(call_id)
-            
-            if existing_log.get('success'):
-                # Merge new messages with existing transcript
-                existing_transcript = existing_log['data'].get('full_transcript', [])
-                
-                # Add new messages (avoid duplicates)
-                for new_msg in transcript_messages:
-                    message_text = new_msg.get('message', '')
-                    # Check if message already exists
-                    if not any(msg.get('message', '') == message_text for msg in existing_transcript):
-                        existing_transcript.append(new_msg)
-                
-                # Update call log
-                update_data = {
-                    'full_transcript': existing_transcript,
-                    'updated_at': datetime.utcnow().isoformat()
-                }
-                
-                result = self.db.update_call_log(call_id, update_data)
-                if result.get('success'):
-                    print(f"📝 Updated transcript for call: {call_id} ({len(existing_transcript)} messages)")
-                
+            position = self.calls.transcript_position(call_id)
+            if position is None:
+                # First history for this call in this process - continue where any other worker stopped
+                with timed('transcript_lookup'):
+                    stored = self.db.get_transcript_position(call_id)
+                position = stored['data'] if stored.get('success') else 0
+
+            events, position = build_transcript_events(call_id, transcript_messages, position, final)
+            if events:
+                result = instrumented('transcript_write', self.db.append_transcript_events, call_id, events)
+                if not result.get('success'):
+                    logger.error("failed to store transcript events", extra=log_fields(call_id=call_id, error=result.get('error')))
+                    return 0
+                logger.debug("stored transcript events", extra=log_fields(call_id=call_id, events=len(events), position=position))
+
+            self.calls.set_transcript_position(call_id, position)
+            return len(events)
+
         except Exception as e:
-            print(f"❌ Error updating call transcript: {e}")
+            logger.exception("error updating call transcript", extra=log_fields(call_id=call_id, error=str(e)))
+            return 0
     
+    @traced()
     def update_call_status(self, call_id: str, status: str, webhook_data: Dict[str, Any]):
-        """Update call status from status-update webhook"""
+        """
+        Update call status from status-update webhook
+        The update is buffered and merged with the call's next ones, except for a terminal status
+        """
         try:
-            call_data = webhook_data.get('message', {}).get('call', {})
-            
-            # Prepare update data
-            update_data = {
-                'status': status,
-                'updated_at': datetime.utcnow().isoformat()
-            }
-            
-            # Add cost if available
-            cost = call_data.get('cost', 0)
-            if cost > 0:
-                update_data['cost_total'] = cost
-            
-            # Add any transcript messages if available in this webhook
-            artifact = webhook_data.get('message', {}).get('artifact', {})
-            if artifact.get('messages'):
-                update_data['full_transcript'] = artifact['messages']
-            
-            # Update call log
-            result = self.db.update_call_log(call_id, update_data)
-            
-            if result.get('success'):
-                print(f"🔄 Updated call status: {call_id} -> {status}")
-                if cost > 0:
-                    print(f"   💰 Cost: ${cost}")
+            update_data = build_status_update_data(status, webhook_data)
+            # Remembered first: a failed write forgets the call again
+            self.calls.remember(call_id, status=status)
+
+            if status in TERMINAL_CALL_STATUSES:
+                result = self.writes.flush(call_id, update_data)
+                self._status_written(call_id, result)
             else:
-                print(f"❌ Failed to update call status: {result.get('error')}")
+                self.writes.update(call_id, update_data)
+            logger.debug("updated call status", extra=log_fields(call_id=call_id, status=status, cost=update_data.get('cost_total', 0)))
                 
         except Exception as e:
-            print(f"❌ Error updating call status: {e}")
+            logger.exception("error updating call status", extra=log_fields(call_id=call_id, error=str(e)))
+
+    def _write_status(self, call_id: str, update_data: Dict[str, Any]) -> Dict[str, Any]:
+        # open_only: a buffered update must not undo the finalize of another worker process
+        return instrumented('call_log_write', self.db.update_call_log, call_id, update_data, open_only=True)
+
+    def _write_final(self, call_id: str, update_data: Dict[str, Any]) -> Dict[str, Any]:
+        # An upsert, so a call whose earlier events were missed still gets its log
+        return instrumented('call_log_write', self.db.upsert_call_log, {'vapi_call_id': call_id, **update_data})
+
+    def _status_written(self, call_id: str, result: Dict[str, Any]):
+        """After the call's buffered status updates were written"""
+        if result.get('success') and result.get('data') is None:
+            # The row is gone (deleted mid-call) or the call has ended - the next event looks it up again
+            self.calls.forget(call_id)
+            logger.warning("no open call log to update", extra=log_fields(call_id=call_id))
+        elif not result.get('success'):
+            logger.error("failed to update call status", extra=log_fields(call_id=call_id, error=result.get('error')))
     
+    @traced()
     def finalize_call(self, call_id: str, end_call_data: Dict[str, Any]) -> bool:
         """
         Finalize call with end-of-call data including costs and analysis
         """
         try:
-            # Extract relevant data from end-of-call webhook
-            message = end_call_data.get('message', {})
-            artifact = message.get('artifact', {})
-            call_info = message.get('call', {})
-            
-            # Prepare update data - cost data is at message level, not artifact level
-            update_data = {
-                'status': 'completed',
-                'ended_at': message.get('endedAt') or datetime.utcnow().isoformat(),
-                'transcript_summary': message.get('summary', ''),
-                'cost_total': message.get('cost', 0),
-                'cost_breakdown': message.get('costBreakdown', {}),
-                'performance_metrics': message.get('performanceMetrics', {}),
-                'updated_at': datetime.utcnow().isoformat()
-            }
-            
-            # Add duration if available (try both locations)
-            duration = message.get('durationSeconds') or artifact.get('durationSeconds')
-            if duration:
-                update_data['duration_seconds'] = duration
-            
-            # Add full transcript if available (try both locations)
-            transcript = message.get('messages') or artifact.get('messages')
-            if transcript:
-                update_data['full_transcript'] = transcript
+            update_data = build_finalize_data(end_call_data)
+
+            # The report has the complete history: store the tail that was still growing
+            history = webhook_history(end_call_data)
+            if history:
+                self.update_call_transcript(call_id, history, final=True)
+            # Nothing is logged for this call after its end-of-call-report, so stop caching it
+            self.calls.forget(call_id)
             
-            # Update call log
-            result = self.db.update_call_log(call_id, update_data)
+            # One write: the status updates still buffered, overridden by the final data
+            result = self.writes.flush(call_id, update_data, write=self._write_final)
             
             if result.get('success'):
-                print(f"✅ Finalized call log: {call_id}")
-                print(f"   ⏱️  Duration: {update_data.get('duration_seconds', 0)} seconds")
-                print(f"   💰 Cost: ${update_data.get('cost_total', 0)}")
+                logger.info("finalized call log", extra=log_fields(
+                    call_id=call_id,
+                    duration_seconds=update_data.get('duration_seconds', 0),
+                    cost=update_data.get('cost_total', 0)
+                ))
                 return True
             else:
-                print(f"❌ Failed to finalize call: {result.get('error')}")
+                logger.error("failed to finalize call log", extra=log_fields(call_id=call_id, error=result.get('error')))
                 return False
                 
         except Exception as e:
-            print(f"❌ Error finalizing call: {e}")
+            logger.exception("error finalizing call log", extra=log_fields(call_id=call_id, error=str(e)))
             return False
     
     def _extract_phone_number(self, call_data: Dict[str, Any]) -> Optional[str]:
         """Extract phone number from call data"""
-        try:
-            # Try different possible locations for phone number
-            customer = call_data.get('customer', {})
-            if isinstance(customer, dict) and customer.get('number'):
-                return customer['number']
-            
-            # Try from phoneNumberId or other fields
-            # This might need adjustment based on actual VAPI webhook structure
-            return None
-            
-        except Exception:
-            return None
-    
-    def _extract_variable_values(self, webhook_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Extract variable values from webhook data"""
-        try:
-            # Look for variableValues in various locations
-            variable_locations = [
-                webhook_data.get('message', {}).get('call', {}).get('assistantOverrides', {}).get('variableValues', {}),
-                webhook_data.get('call', {}).get('assistantOverrides', {}).get('variableValues', {}),
-                webhook_data.get('message', {}).get('variableValues', {}),
-                webhook_data.get('variableValues', {})
-            ]
-            
-            for variables in variable_locations:
-                if variables and isinstance(variables, dict):
-                    return variables
-            
-            return {}
-            
-        except Exception:
-            return {}
+        return extract_phone_number(call_data)
     
     def get_call_analytics(self, time_range: str = '30d') -> Dict[str, Any]:
-        """Get call analytics for dashboard"""
+        """
+        Get call analytics for dashboard
+        Aggregated by the database over every call in time_range ('7d', '30d', '90d' or 'all')
+        """
         try:
-            # This will be used by the analytics service
-            all_calls = self.db.get_all_call_logs(limit=1000)
-            
-            if not all_calls.get('success'):
-                return {"success": False, "error": "Failed to fetch call logs"}
-            
-            calls = all_calls['data']
+            result = self.db.get_call_analytics(analytics_from_date(time_range))
             
-            # Calculate basic metrics
-            total_calls = len(calls)
-            completed_calls = len([c for c in calls if c.get('status') in ['completed', 'ended']])
-            total_duration = sum(c.get('duration_seconds', 0) for c in calls if c.get('duration_seconds'))
-            total_cost = sum(float(c.get('cost_total', 0)) for c in calls)
+            if not result.get('success'):
+                return {"success": False, "error": f"Failed to aggregate call logs: {result.get('error')}"}
             
-            analytics = {
-                'total_calls': total_calls,
-                'completed_calls': completed_calls,
-                'success_rate': (completed_calls / total_calls * 100) if total_calls > 0 else 0,
-                'total_duration_minutes': total_duration / 60,
-                'average_duration_minutes': (total_duration / completed_calls / 60) if completed_calls > 0 else 0,
-                'total_cost': total_cost,
-                'average_cost_per_call': (total_cost / total_calls) if total_calls > 0 else 0
-            }
-            
-            return {"success": True, "data": analytics}
+            return {"success": True, "data": build_call_analytics(result['data'])}
             
         except Exception as e:
             return {"success": False, "error": str(e)}
 
 
-# Global call logger instance
-call_logger = CallLogger()
+def analytics_from_date(time_range: str) -> Optional[datetime]:
+    """Start of an analytics time range: '<days>d', or 'all' for None. Anything else means 30 days"""
+    if time_range == 'all':
+        return None
+    days = time_range[:-1] if time_range.endswith('d') else ''
+    # call_logs.created_at is UTC
+    return datetime.utcnow() - timedelta(days=int(days) if days.isdigit() else 30)
+
+
+def build_call_analytics(totals: Dict[str, Any]) -> Dict[str, Any]:
+    """Dashboard call analytics from a call_analytics row - counts as ints, the rest as floats"""
+    analytics = {}
+    for key in ('total_calls', 'completed_calls'):
+        analytics[key] = int(totals.get(key) or 0)
+    for key in ('success_rate', 'total_duration_minutes', 'average_duration_minutes', 'total_cost', 'average_cost_per_call'):
+        analytics[key] = float(totals.get(key) or 0)
+    return analytics
+
+
+def extract_call_data(webhook_data: Dict[str, Any]) -> Dict[str, Any]:
+    """The call object of a webhook - root-level call data, or message.call as VAPI sends it"""
+    call_data = webhook_data.get('call', {})
+    message_data = webhook_data.get('message', {})
+    
+    # VAPI sends call data in message.call
+    if not call_data and message_data.get('call'):
+        call_data = message_data['call']
+    return call_data
+
+
+def extract_phone_number(call_data: Dict[str, Any]) -> Optional[str]:
+    """Extract phone number from call data"""
+    try:
+        # Try different possible locations for phone number
+        customer = call_data.get('customer', {})
+        if isinstance(customer, dict) and customer.get('number'):
+            return customer['number']
+        
+        # Try from phoneNumberId or other fields
+        # This might need adjustment based on actual VAPI webhook structure
+        return None
+        
+    except Exception:
+        return None
+
+
+def build_call_start_data(call_data: Dict[str, Any], application_id: Optional[str],
+                          status: Optional[str] = None) -> Dict[str, Any]:
+    """New call_logs row for the first webhook of a call - status is the webhook's, if it has one"""
+    return {
+        'vapi_call_id': call_data.get('id', 'unknown'),
+        'application_id': application_id,
+        'phone_number': extract_phone_number(call_data),
+        'status': status if status and status != 'unknown' else call_data.get('status', 'started'),
+        'started_at': call_data.get('createdAt') or datetime.utcnow().isoformat(),
+        'full_transcript': [],
+        'performance_metrics': {},
+        'cost_breakdown': {}
+    }
+
+
+def webhook_history(webhook_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The conversation history (artifact.messages) a webhook carries, or [] for event types without one"""
+    message = webhook_data.get('message', {})
+    if message.get('type') not in HISTORY_EVENT_TYPES:
+        return []
+    # Same source as the live transcript (WebhookEnvelope.messages), so seq matches between event types
+    return (message.get('artifact') or {}).get('messages') or message.get('messages') or []
+
 
+def build_transcript_events(call_id: str, history: List[Dict[str, Any]], position: int,
+                            final: bool = False) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    call_transcript_events rows for the history messages from position on
+    The last MERGE_TAIL messages can still grow (partial utterances), so they are only stored
+    once newer messages follow them, or when final. seq is the message's index in the history,
+    so storing the same message twice (redelivery, another worker) hits the same key
+    Returns (rows, new position)
+    """
+    if not isinstance(history, list):
+        return [], position
+    stable = len(history) if final else max(len(history) - MERGE_TAIL, 0)
+    rows = [
+        {
+            'vapi_call_id': call_id,
+            'seq': seq,
+            'role': message.get('role'),
+            'message': message.get('message', message.get('content')),
+            'payload': message
+        }
+        for seq, message in enumerate(history[position:stable], start=position)
+        if isinstance(message, dict)
+    ]
+    return rows, max(position, stable)
+
+
+def transcript_history(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """A call's message history put back together from its transcript events (in seq order)"""
+    return [event.get('payload') or {'role': event.get('role'), 'message': event.get('message')} for event in events]
+
+
+def build_status_update_data(status: str, webhook_data: Dict[str, Any]) -> Dict[str, Any]:
+    """call_logs update for a status-update webhook"""
+    call_data = webhook_data.get('message', {}).get('call', {})
+    
+    update_data = {
+        'status': status,
+        'updated_at': datetime.utcnow().isoformat()
+    }
+    
+    # Add cost if available
+    cost = call_data.get('cost', 0)
+    if cost > 0:
+        update_data['cost_total'] = cost
+    
+    # Transcript messages are stored as call_transcript_events, not rewritten on every status update
+    return update_data
+
+
+def build_finalize_data(end_call_data: Dict[str, Any]) -> Dict[str, Any]:
+    """call_logs update for an end-of-call-report - costs, duration, summary and the final transcript"""
+    message = end_call_data.get('message', {})
+    artifact = message.get('artifact', {})
+    
+    # Cost data is at message level, not artifact level
+    update_data = {
+        'status': 'completed',
+        'ended_at': message.get('endedAt') or datetime.utcnow().isoformat(),
+        'transcript_summary': message.get('summary', ''),
+        'cost_total': message.get('cost', 0),
+        'cost_breakdown': message.get('costBreakdown', {}),
+        'performance_metrics': message.get('performanceMetrics', {}),
+        'updated_at': datetime.utcnow().isoformat()
+    }
+    
+    # Add duration if available (try both locations)
+    duration = message.get('durationSeconds') or artifact.get('durationSeconds')
+    if duration:
+        update_data['duration_seconds'] = duration
+    
+    # Add full transcript if available (try both locations)
+    transcript = message.get('messages') or artifact.get('messages')
+    if transcript:
+        update_data['full_transcript'] = transcript
+    return update_data
 
-def handle_vapi_webhook(webhook_data: Dict[str, Any]) -> Dict[str, Any]:
+
+def webhook_call_status(webhook_data: Dict[str, Any]) -> tuple:
+    """(message_type, call_id, call_status) of a VAPI webhook"""
+    message_type = webhook_data.get('message', {}).get('type', 'unknown')
+    call_id = webhook_data.get('message', {}).get('call', {}).get('id', 'unknown')
+    
+    # For status-update webhooks, get status from message level
+    # For other webhooks, get status from call object  
+    if message_type == 'status-update':
+        call_status = webhook_data.get('message', {}).get('status', 'unknown')
+    else:
+        call_status = webhook_data.get('message', {}).get('call', {}).get('status', 'unknown')
+    return message_type, call_id, call_status
+
+
+def __getattr__(name: str):
+    # The global call logger is created on first use by the service container
+    if name == 'call_logger':
+        return services.call_logger()
+    raise AttributeError(f"module 'call_logger' has no attribute '{name}'")
+
+
+@traced()
+def handle_vapi_webhook(envelope: WebhookEnvelope) -> Dict[str, Any]:
     """
     Main webhook handler for VAPI events
     Integrates with call logging
     """
+    webhook_data = envelope.data
     try:
-        message_type = webhook_data.get('message', {}).get('type', 'unknown')
-        call_id = webhook_data.get('message', {}).get('call', {}).get('id', 'unknown')
-        
-        # For status-update webhooks, get status from message level
-        # For other webhooks, get status from call object  
-        if message_type == 'status-update':
-            call_status = webhook_data.get('message', {}).get('status', 'unknown')
-        else:
-            call_status = webhook_data.get('message', {}).get('call', {}).get('status', 'unknown')
+        message_type, call_id, call_status = webhook_call_status(webhook_data)
+        set_attribute('call_id', call_id)
+        call_logger = services.call_logger()
         
-        print(f"📞 VAPI Webhook: {message_type} for call {call_id} (status: {call_status})")
-        
-        # Check if call log exists
-        existing_log = call_logger.db.get_call_log_by_vapi_id(call_id)
+        logger.debug("call logging", extra=log_fields(type=message_type, call_id=call_id, status=call_status))
         
         if message_type in ['call-start', 'status-update']:
-            if not existing_log.get('success'):
-                # Create new call log if one doesn't exist yet
-                call_logger.log_call_start(webhook_data)
+            if call_logger.calls.get(call_id) is None:
+                # First event for the call in this process: create its log, or update the existing one
+                call_logger.log_call_start(envelope)
             else:
                 # Update existing call log with new status
                 call_logger.update_call_status(call_id, call_status, webhook_data)
         
-        elif message_type == 'transcript':
-            # Update transcript
-            transcript_data = webhook_data.get('message', {}).get('transcript', [])
-            if transcript_data:
-                call_logger.update_call_transcript(call_id, transcript_data)
-        
         elif message_type == 'end-of-call-report':
-            # Finalize call
+            # Finalize call - extraction and the application update run once, in fill_application.handle_end_call
             call_logger.finalize_call(call_id, webhook_data)
-            
-            # Also trigger the existing end_call processing for application filling
-            try:
-                from fill_application import handle_end_call
-                handle_end_call(webhook_data)
-            except ImportError:
-                print("⚠️  fill_application module not found, skipping end_call processing")
-        
+
+        # Append the new part of the conversation history. 'transcript' webhooks carry single
+        # (often partial) utterances that reach the history with the next conversation-update
+        if message_type in ('status-update', 'conversation-update'):
+            history = webhook_history(webhook_data)
+            if history:
+                call_logger.update_call_transcript(call_id, history)
+
         return {"success": True, "message": f"Processed {message_type}"}
         
     except Exception as e:
-        print(f"❌ Error in VAPI webhook handler: {e}")
+        logger.exception("error in call logging webhook handler", extra=log_fields(error=str(e)))
         return {"success": False, "error": str(e)}
 
 
 if __name__ == "__main__":
     # Test the call logger
-    logger = CallLogger()
+    test_logger = CallLogger()
     
     # Test analytics
-    analytics = logger.get_call_analytics()
+    analytics = test_logger.get_call_analytics()
     print(f"Call analytics: {analytics}")
\ No newline at end of file
@@ -0,0 +1,144 @@
+"""
+Call Registry for the Voice Server
+Indexed view of active and completed calls, maintained incrementally as webhooks arrive
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import threading
+
+from bounded_cache import BoundedCache
+
+
+class CallRegistry:
+    """
+    Tracks which calls are active vs completed.
+
+    Every call has one summary dict, and that dict is also referenced from an
+    active index or a completed index:
+    - Active calls are keyed by call ID.
+    - Completed calls are kept in the order they ended.
+
+    Message counts and last-activity times are updated on write, so listing
+    costs O(number of calls returned). Entry lifetime is handled by a
+    BoundedCache: LRU size limit, idle TTL, and a fixed deadline after
+    completion. Evicted calls are dropped from the indexes too.
+    """
+
+    def __init__(self, max_calls: int = 500, ttl_seconds: Optional[float] = None,
+                 completed_ttl_seconds: float = 900):
+        self.completed_ttl_seconds = completed_ttl_seconds
+        self._calls = BoundedCache(max_entries=max_calls, ttl_seconds=ttl_seconds, on_evict=self._on_evict)
+        self._active: Dict[str, Dict[str, Any]] = {}
+        self._completed: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def mark_active(self, call_id: str) -> bool:
+        """Register a call the first time it is seen. Returns True if it is new"""
+        with self._lock:
+            if call_id in self._calls:
+                return False
+
+            now = datetime.now().isoformat()
+            entry = {
+                'call_id': call_id,
+                'status': 'active',
+                'started_at': now,
+                'last_activity': now,
+                'message_count': 0,
+                'last_message_time': 0
+            }
+            self._calls[call_id] = entry
+            self._active[call_id] = entry
+            return True
+
+    def record_activity(self, call_id: str, message_count: int, last_message_time: Optional[float] = None):
+        """Update a call's message count and last-activity time after a transcript merge"""
+        with self._lock:
+            entry = self._calls.get(call_id)
+            if entry is None:
+                self.mark_active(call_id)
+                entry = self._calls.get(call_id)
+
+            entry['message_count'] = message_count
+            entry['last_activity'] = datetime.now().isoformat()
+            if last_message_time is not None:
+                entry['last_message_time'] = last_message_time
+
+    def mark_completed(self, call_id: str, ended_at: Optional[str] = None):
+        """Move a call to the completed index; it is evicted completed_ttl_seconds later"""
+        with self._lock:
+            entry = self._calls.get(call_id)
+            if entry is None:
+                self.mark_active(call_id)
+                entry = self._calls.get(call_id)
+
+            self._active.pop(call_id, None)
+            entry['status'] = 'completed'
+            entry['ended_at'] = ended_at or datetime.now().isoformat()
+
+            # Re-completion (e.g. a redelivered end-of-call-report) moves it to the newest position
+            self._completed.pop(call_id, None)
+            self._completed[call_id] = entry
+            self._calls.expire_after(call_id, self.completed_ttl_seconds)
+
+    def get(self, call_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._calls.get(call_id)
+            return dict(entry) if entry else None
+
+    def status(self, call_id: str) -> Optional[str]:
+        entry = self.get(call_id)
+        return entry['status'] if entry else None
+
+    def remove(self, call_id: str):
+        with self._lock:
+            self._calls.pop(call_id)
+            self._active.pop(call_id, None)
+            self._completed.pop(call_id, None)
+
+    def active_calls(self) -> List[Dict[str, Any]]:
+        """Summaries of active calls, oldest first"""
+        with self._lock:
+            self._calls.purge_expired()
+            return [
+                {
+                    'call_id': entry['call_id'],
+                    'message_count': entry['message_count'],
+                    'last_message_time': entry['last_message_time'],
+                    'last_activity': entry['last_activity'],
+                    'status': entry['status']
+                }
+                for entry in self._active.values()
+            ]
+
+    def completed_calls(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Summaries of completed calls, most recently ended first"""
+        with self._lock:
+            self._calls.purge_expired()
+            calls = []
+            for entry in reversed(self._completed.values()):
+                if limit is not None and len(calls) >= limit:
+                    break
+                calls.append({
+                    'call_id': entry['call_id'],
+                    'message_count': entry['message_count'],
+                    'ended_at': entry['ended_at'],
+                    'status': entry['status']
+                })
+            return calls
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._calls.purge_expired()
+            stats = self._calls.stats()
+            stats['active'] = len(self._active)
+            stats['completed'] = len(self._completed)
+            return stats
+
+    def _on_evict(self, call_id: str, entry: Dict[str, Any], reason: str):
+        # Called by the BoundedCache while self._lock is already held (RLock)
+        with self._lock:
+            self._active.pop(call_id, None)
+            self._completed.pop(call_id, None)
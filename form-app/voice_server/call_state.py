@@ -0,0 +1,184 @@
+"""
+Call State for the Voice Server
+Live transcripts, call status and transcript change events behind one interface
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import os
+
+from sharded_cache import ShardedCache
+from call_registry import CallRegistry
+from transcript_store import CallTranscript
+from transcript_stream import TranscriptEventBus
+
+
+class CallState:
+    """
+    Everything the webhook server keeps in memory about calls.
+
+    This object is the single owner of three things:
+    - the transcript cache (CallTranscript per call)
+    - the call registry
+    - the transcript event bus
+
+    Every method takes and returns plain data (message lists, dicts, tuples)
+    and never hands out internal objects. Because of that the same class can
+    run in-process or behind a multiprocessing manager (see serve.py), so
+    every worker process sees the same state.
+
+    All methods are safe to call from many threads:
+    - The transcript cache is sharded, so lookups for different calls do not
+      share a lock.
+    - Each transcript has its own lock, held while it is merged or copied.
+      Webhooks for different calls merge in parallel, while webhooks for the
+      same call are serialized.
+    - Readers get a copy taken under that lock, never a list that is still
+      being mutated.
+    """
+
+    def __init__(self, max_calls: int = 500, ttl_seconds: Optional[float] = None,
+                 completed_ttl_seconds: float = 900, stream_buffer: int = 5000,
+                 num_shards: int = 16):
+        self.completed_ttl_seconds = completed_ttl_seconds
+        self.transcripts = ShardedCache(num_shards=num_shards, max_entries=max_calls, ttl_seconds=ttl_seconds)
+        self.registry = CallRegistry(
+            max_calls=max_calls,
+            ttl_seconds=ttl_seconds,
+            completed_ttl_seconds=completed_ttl_seconds
+        )
+        self.events = TranscriptEventBus(buffer_size=stream_buffer)
+
+    @classmethod
+    def from_env(cls) -> 'CallState':
+        """
+        CallState configured from the environment
+        Completed calls are dropped COMPLETED_CALL_TTL_SECONDS after end-of-call-report,
+        anything idle for CALL_CACHE_TTL_SECONDS is dropped, and at most CALL_CACHE_MAX_CALLS are kept
+        """
+        return cls(
+            max_calls=int(os.getenv('CALL_CACHE_MAX_CALLS', '500')),
+            ttl_seconds=float(os.getenv('CALL_CACHE_TTL_SECONDS', '7200')),
+            completed_ttl_seconds=float(os.getenv('COMPLETED_CALL_TTL_SECONDS', '900')),
+            stream_buffer=int(os.getenv('TRANSCRIPT_STREAM_BUFFER', '5000')),
+            num_shards=int(os.getenv('CALL_CACHE_SHARDS', '16'))
+        )
+
+    def merge_transcript(self, call_id: str, messages: list) -> Tuple[int, int, int, bool]:
+        """
+        Merge a webhook's message history into the call's transcript and publish the changes
+        Returns (added_count, updated_count, message_count, created) - created is True for a new cache entry
+        """
+        transcript, created = self.transcripts.get_or_create(call_id, CallTranscript)
+        if created and self.registry.status(call_id) == 'completed':
+            # A late webhook recreated an evicted entry - keep the completed call's deadline
+            self.transcripts.expire_after(call_id, self.completed_ttl_seconds)
+
+        # Publishing under the call's lock keeps its events in version order
+        with transcript.lock:
+            changes = []
+            added_count, updated_count = transcript.merge(messages, changes)
+            if changes:
+                self.registry.record_activity(call_id, len(transcript.messages), transcript.last_seconds_from_start)
+
+            # Push appended/updated messages to live transcript streams
+            for index, change in changes:
+                entry = transcript.messages[index]
+                self.events.publish(call_id, 'transcript', {
+                    'call_id': call_id,
+                    'index': index,
+                    'op': 'append' if change == 'added' else 'update',
+                    'role': entry['role'],
+                    'message': entry['message'],
+                    'version': transcript.entry_versions[index]
+                })
+
+            return added_count, updated_count, len(transcript.messages), created
+
+    def record_webhook(self, call_id: str, messages: list, completed: bool = False) -> Tuple[int, int, int, bool]:
+        """
+        Status and transcript updates for one webhook, in the order the live streams expect:
+        'active' before the call's first transcript event, 'completed' after its last one
+        A single call, so a serve.py worker makes one round trip to the state process per webhook
+        Returns merge_transcript's (added_count, updated_count, message_count, created)
+        """
+        if not completed:
+            self.mark_active(call_id)
+        result = self.merge_transcript(call_id, messages) if messages else (0, 0, 0, False)
+        if completed:
+            self.mark_completed(call_id)
+        return result
+
+    def transcript(self, call_id: str) -> Optional[Dict[str, Any]]:
+        """{'messages': [...], 'version': n} for a cached call, or None"""
+        transcript = self.transcripts.get(call_id)
+        if transcript is None:
+            return None
+        with transcript.lock:
+            return {
+                'messages': [dict(message) for message in transcript.messages],
+                'version': transcript.version
+            }
+
+    def transcript_changes(self, call_id: str, since: int) -> Optional[Dict[str, Any]]:
+        """{'changes': [...], 'message_count': n, 'version': n} for a cached call, or None"""
+        transcript = self.transcripts.get(call_id)
+        if transcript is None:
+            return None
+        with transcript.lock:
+            return {
+                'changes': transcript.changes_since(since),
+                'message_count': len(transcript.messages),
+                'version': transcript.version
+            }
+
+    def call_status(self, call_id: str) -> Optional[str]:
+        """'active' or 'completed' for a call this server knows about, else None"""
+        return self.registry.status(call_id)
+
+    def mark_active(self, call_id: str) -> bool:
+        """Register a call the first time it is seen and announce it. Returns True if it is new"""
+        if not self.registry.mark_active(call_id):
+            return False
+        self.events.publish(call_id, 'call-status', {'call_id': call_id, 'status': 'active'})
+        return True
+
+    def mark_completed(self, call_id: str):
+        """
+        Completed calls stay visible for completed_ttl_seconds, then fall back to call_logs
+        Call after merging the end-of-call transcript, so the deadline lands on an existing entry
+        """
+        self.registry.mark_completed(call_id)
+        self.transcripts.expire_after(call_id, self.completed_ttl_seconds)
+        self.events.publish(call_id, 'call-status', {'call_id': call_id, 'status': 'completed'})
+
+    def clear(self, call_id: str) -> bool:
+        """Drop a call's transcript and status. Returns False if it was not cached"""
+        if self.transcripts.pop(call_id) is None:
+            return False
+        self.registry.remove(call_id)
+        return True
+
+    def active_calls(self) -> List[Dict[str, Any]]:
+        return self.registry.active_calls()
+
+    def completed_calls(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.registry.completed_calls(limit)
+
+    def cached_calls(self) -> List[Tuple[str, int]]:
+        """(call_id, message_count) for every cached transcript"""
+        return [(call_id, len(transcript.messages)) for call_id, transcript in self.transcripts.items()]
+
+    def last_event_id(self) -> int:
+        return self.events.last_id
+
+    def events_since(self, last_id: int, call_id: Optional[str] = None) -> Tuple[List[tuple], bool, int]:
+        return self.events.events_since(last_id, call_id)
+
+    def wait_for_events(self, last_id: int, timeout: float) -> bool:
+        return self.events.wait(last_id, timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'transcript_cache': self.transcripts.stats(),
+            'call_registry': self.registry.stats()
+        }
@@ -1,93 +1,148 @@
-from test import get_call_body
-import db
-from db import db_manager
+from typing import Any, Dict
 import os
 import json
-from openai import OpenAI
+from datetime import datetime
 from dotenv import load_dotenv
+import services
+from webhook_logging import dumps_enabled, get_logger, log_fields
+from webhook_envelope import WebhookEnvelope
+from webhook_metrics import count_error, instrumented, instrumented_async, timed
+from tracing import record_error, set_attribute, traced
 
 load_dotenv()
 
+logger = get_logger('fill_application')
 
-def handle_end_call(end_call_body):
-    
-    for i in range(20):
-        print()
 
-    print("🔍 Starting fill_application...")
+def _end_call_details(envelope: WebhookEnvelope):
+    """(call_id, transcript, variable_values) of an end-of-call-report"""
+    end_call_body = envelope.data
+    # Extract call_id from the VAPI webhook structure (message.call.id)
+    call_id = (envelope.message.get('call') or {}).get('id', 'unknown')
+    transcript = (end_call_body.get("message", {}).get("artifact", {}).get("transcript") or end_call_body.get("transcript"))
+    variable_values = envelope.variable_values
+    logger.debug("starting end-of-call processing", extra=log_fields(call_id=call_id))
+    set_attribute('call_id', call_id)
+    set_attribute('application_id', variable_values.get('application_id'))
+    return call_id, transcript, variable_values
 
-    print(end_call_body)
 
-    for i in range(20):
-        print()
+def _claim_acquired(call_id: str, claim: Dict[str, Any]) -> bool:
+    """Whether claim_end_of_call's result lets this invocation process the call"""
+    if not claim.get('success'):
+        logger.error("could not claim end-of-call processing", extra=log_fields(call_id=call_id, error=claim.get('error')))
+        return False
+    if not claim.get('claimed'):
+        logger.info("end-of-call already processed, skipping extraction", extra=log_fields(call_id=call_id))
+        return False
+    return True
 
-    # Extract call_id from the VAPI webhook structure (message.call.id)
-    call_id = end_call_body.get('message', {}).get('call', {}).get('id', 'unknown')
-    print(f"📞 Extracted Call ID: {call_id}")
-    
-    # Extract transcript from call body
-    transcript = (end_call_body.get("message", {}).get("artifact", {}).get("transcript") or end_call_body.get("transcript"))
-    print(f"📝 End Call Transcript: {transcript}")
 
-    variable_values =  _find_last_variable_values(end_call_body)
+def _extraction_saved(call_id: str, saved: Dict[str, Any]) -> bool:
+    if not saved.get('success'):
+        logger.error("failed to save extracted data", extra=log_fields(call_id=call_id, error=saved.get('error')))
+        return False
+    return True
 
-    print(f"📝 Variable Values: {variable_values}")
 
-    # Extract structured information from transcript using OpenAI
-    extracted_info = extract_information_from_transcript(transcript)
-    print(f"🎯 Extracted Information: {json.dumps(extracted_info, indent=2)}")
-    
-    # Fill the database
-    fill_database(extracted_info, variable_values, call_id)
+@traced()
+def handle_end_call(envelope: WebhookEnvelope):
+    """
+    End-of-call stage: extract the application fields from the transcript and save them
+    Runs at most once per call - the call log is claimed first, so redelivered or
+    concurrent end-of-call-reports for the same call are skipped. The claim is released
+    if the extraction does not reach the call log, so a redelivery can retry
+    Returns True if this invocation processed the call
+    """
+    if dumps_enabled():
+        print(json.dumps(envelope.data, indent=2))
+
+    call_id, transcript, variable_values = _end_call_details(envelope)
+    claimed = call_id != 'unknown'
+    db_manager = services.db_manager()
+    if claimed:
+        if not _claim_acquired(call_id, instrumented('end_call_claim', db_manager.claim_end_of_call, call_id)):
+            return False
+    else:
+        logger.warning("no call ID in end-of-call-report, processing without a claim")
+
+    # Transcripts, variable values and extractions hold personal details - only dumped when asked for
+    if dumps_enabled():
+        print(f"📝 End Call Transcript: {transcript}")
+        print(f"📝 Variable Values: {variable_values}")
 
-    return
+    saved = False
+    try:
+        # Extract structured information from transcript using OpenAI
+        with timed('openai_extraction'):
+            extracted_info = extract_information_from_transcript(transcript)
+        if dumps_enabled():
+            print(f"🎯 Extracted Information: {json.dumps(extracted_info, indent=2)}")
 
+        # Persist the extraction on the call log before applying it to the application
+        if claimed:
+            saved = _extraction_saved(call_id, instrumented('call_log_write', db_manager.save_extracted_data, call_id, extracted_info))
+    finally:
+        if claimed and not saved:
+            # The extraction failed or never reached the call log - release the claim so a redelivery can retry
+            db_manager.save_extracted_data(call_id, None)
 
-def _find_last_variable_values(obj):
-    last = None
-    if isinstance(obj, dict):
-        for k, v in obj.items():
-            if k == "variableValues" and isinstance(v, dict):
-                last = v  # keep overwriting; the final one wins
-            sub = _find_last_variable_values(v)
-            if sub is not None:
-                last = sub
-    elif isinstance(obj, list):
-        for item in obj:
-            sub = _find_last_variable_values(item)
-            if sub is not None:
-                last = sub
-    return last
+    # Fill the database
+    fill_database(extracted_info, variable_values, call_id)
 
+    return True
 
-def extract_information_from_transcript(transcript):
+
+@traced()
+async def handle_end_call_async(envelope: WebhookEnvelope, db, openai_client):
     """
-    Extract structured information from a transcript using OpenAI.
-    
-    Args:
-        transcript (str): The call transcript to analyze
-        
-    Returns:
-        dict: Dictionary with extracted information, blank values for items not found
+    Async variant of handle_end_call for the ASGI server
+    db is an AsyncDatabaseManager and openai_client an openai.AsyncOpenAI - the claim,
+    extraction and application update are the same as in handle_end_call
     """
-    # Initialize OpenAI client
-    client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-    
-    if not transcript:
-        # Return blank structure if no transcript
-        return {
-            "date_of_birth": "",
-            "loan_amount": "",
-            "property_address": "",
-            "property_value": "",
-            "mortgage_balance": "",
-            "property_usage": "",
-            "employment_type": "",
-            "annual_income": "",
-            "what_looking_to_do": ""
-        }
-    
-    prompt = """
+    call_id, transcript, variable_values = _end_call_details(envelope)
+    claimed = call_id != 'unknown'
+    if claimed:
+        if not _claim_acquired(call_id, await instrumented_async('end_call_claim', db.claim_end_of_call, call_id)):
+            return False
+    else:
+        logger.warning("no call ID in end-of-call-report, processing without a claim")
+
+    saved = False
+    try:
+        with timed('openai_extraction'):
+            extracted_info = await extract_information_from_transcript_async(transcript, openai_client)
+        if claimed:
+            saved = _extraction_saved(call_id, await instrumented_async('call_log_write', db.save_extracted_data, call_id, extracted_info))
+    finally:
+        if claimed and not saved:
+            await db.save_extracted_data(call_id, None)
+
+    await fill_database_async(extracted_info, variable_values, call_id, db)
+
+    return True
+
+
+EXTRACTION_MODEL = "gpt-5"
+
+EXTRACTED_FIELDS = [
+    "date_of_birth", "loan_amount", "property_address", "property_value",
+    "mortgage_balance", "property_usage", "employment_type", "annual_income", "what_looking_to_do"
+]
+
+# extracted field -> applications column (date_of_birth is converted separately)
+APPLICATION_FIELD_MAPPINGS = {
+    'loan_amount': 'loan_amount_requested',
+    'property_address': 'property_address', 
+    'property_value': 'property_value',
+    'mortgage_balance': 'mortgage_balance',
+    'property_usage': 'property_use',
+    'employment_type': 'employment_type',
+    'annual_income': 'annual_income',
+    'what_looking_to_do': 'what_looking_to_do'
+}
+
+EXTRACTION_PROMPT = """
 You are an expert at extracting structured information from call transcripts. 
 Analyze the following transcript and extract the requested information with exact formatting requirements.
 
@@ -127,49 +182,102 @@ Important:
 - Dates must be MM/DD/YYYY format
 - Property usage and employment type must match the exact options provided
 - Return only the JSON object, no other text
-""".format(transcript=transcript)
+"""
+
+
+def blank_extraction():
+    """Extraction result with every field blank"""
+    return {key: "" for key in EXTRACTED_FIELDS}
 
+
+def build_extraction_messages(transcript):
+    """Chat messages for the extraction request"""
+    return [
+        {"role": "system", "content": "You are a precise information extraction assistant. Return only valid JSON."},
+        {"role": "user", "content": EXTRACTION_PROMPT.format(transcript=transcript)}
+    ]
+
+
+def parse_extraction(content):
+    """Parse the model's JSON reply, filling in any missing field with a blank"""
+    extracted_info = json.loads(content.strip())
+    
+    # Validate the structure and ensure all required keys exist
+    for key in EXTRACTED_FIELDS:
+        if key not in extracted_info:
+            extracted_info[key] = ""
+    
+    return extracted_info
+
+
+@traced()
+def extract_information_from_transcript(transcript):
+    """
+    Extract structured information from a transcript using OpenAI.
+    
+    Args:
+        transcript (str): The call transcript to analyze
+        
+    Returns:
+        dict: Dictionary with extracted information, blank values for items not found
+        
+    Raises:
+        Exception: the OpenAI request or its reply failed - handle_end_call releases the call's claim
+        so the extraction can be retried, instead of saving a blank result as final
+    """
+    if not transcript:
+        # Return blank structure if no transcript
+        return blank_extraction()
+
+    # Shared client, created on the first extraction
+    client = services.openai_client()
+
+    set_attribute('model', EXTRACTION_MODEL)
+    set_attribute('transcript_chars', len(transcript))
     try:
         response = client.chat.completions.create(
-            model="gpt-5",
-            messages=[
-                {"role": "system", "content": "You are a precise information extraction assistant. Return only valid JSON."},
-                {"role": "user", "content": prompt}
-            ],
+            model=EXTRACTION_MODEL,
+            messages=build_extraction_messages(transcript),
             max_completion_tokens=2000
         )
         
         # Parse the JSON response
-        extracted_info = json.loads(response.choices[0].message.content.strip())
-        
-        # Validate the structure and ensure all required keys exist
-        required_keys = [
-            "date_of_birth", "loan_amount", "property_address", "property_value",
-            "mortgage_balance", "property_usage", "employment_type", "annual_income", "what_looking_to_do"
-        ]
-        
-        for key in required_keys:
-            if key not in extracted_info:
-                extracted_info[key] = ""
-        
-        return extracted_info
+        return parse_extraction(response.choices[0].message.content)
         
     except Exception as e:
-        print(f"❌ Error extracting information from transcript: {e}")
-        # Return blank structure on error
-        return {
-            "date_of_birth": "",
-            "loan_amount": "",
-            "property_address": "",
-            "property_value": "",
-            "mortgage_balance": "",
-            "property_usage": "",
-            "employment_type": "",
-            "annual_income": "",
-            "what_looking_to_do": ""
-        }
+        logger.error("error extracting information from transcript", extra=log_fields(error=str(e)))
+        count_error('openai_extraction')
+        record_error(e)
+        raise
+
+
+@traced()
+async def extract_information_from_transcript_async(transcript, client):
+    """
+    Async variant of extract_information_from_transcript, raising on failure as well
+    client is an openai.AsyncOpenAI sharing the server's pooled HTTP connections
+    """
+    if not transcript:
+        return blank_extraction()
+
+    set_attribute('model', EXTRACTION_MODEL)
+    set_attribute('transcript_chars', len(transcript))
+    try:
+        response = await client.chat.completions.create(
+            model=EXTRACTION_MODEL,
+            messages=build_extraction_messages(transcript),
+            max_completion_tokens=2000
+        )
+        return parse_extraction(response.choices[0].message.content)
+
+    except Exception as e:
+        logger.error("error extracting information from transcript", extra=log_fields(error=str(e)))
+        count_error('openai_extraction')
+        record_error(e)
+        raise
 
 
+@traced()
 def fill_database(extracted_info, variable_values, call_id):
     """
     Fill the Supabase applications table with extracted information from the call.
@@ -185,68 +293,92 @@ def fill_database(extracted_info, variable_values, call_id):
     try:
         # Get application_id from variable_values if available
         application_id = variable_values.get('application_id') if variable_values else None
+        set_attribute('application_id', application_id)
         
-        print(f"📝 Filling database for call {call_id}")
-        print(f"📊 Application ID: {application_id}")
-        print(f"🎯 Extracted Info: {json.dumps(extracted_info, indent=2)}")
+        logger.debug("filling application from call", extra=log_fields(call_id=call_id, application_id=application_id))
+        if dumps_enabled():
+            print(f"🎯 Extracted Info: {json.dumps(extracted_info, indent=2)}")
         
         # Prepare the data mapping from extracted_info to database columns
-        update_data = {}
-        
-        # Map date_of_birth - convert MM/DD/YYYY to YYYY-MM-DD format for PostgreSQL
-        if extracted_info.get('date_of_birth'):
-            try:
-                # Parse MM/DD/YYYY format and convert to YYYY-MM-DD
-                from datetime import datetime
-                date_obj = datetime.strptime(extracted_info['date_of_birth'], '%m/%d/%Y')
-                update_data['date_of_birth'] = date_obj.strftime('%Y-%m-%d')
-                print(f"📅 Date of birth: {extracted_info['date_of_birth']} -> {update_data['date_of_birth']}")
-            except ValueError as e:
-                print(f"❌ Error parsing date of birth '{extracted_info['date_of_birth']}': {e}")
-        
-        # Map other fields directly
-        field_mappings = {
-            'loan_amount': 'loan_amount_requested',
-            'property_address': 'property_address', 
-            'property_value': 'property_value',
-            'mortgage_balance': 'mortgage_balance',
-            'property_usage': 'property_use',
-            'employment_type': 'employment_type',
-            'annual_income': 'annual_income',
-            'what_looking_to_do': 'what_looking_to_do'
-        }
-        
-        for extracted_key, db_column in field_mappings.items():
-            if extracted_info.get(extracted_key):
-                update_data[db_column] = extracted_info[extracted_key]
-                print(f"📝 {extracted_key}: {extracted_info[extracted_key]}")
+        update_data = build_application_update(extracted_info)
         
         # Only proceed if we have data to update and an application_id
         if not update_data:
-            print("⚠️  No data extracted from transcript to update")
+            logger.warning("no data extracted from transcript to update", extra=log_fields(call_id=call_id))
             return False
             
         if not application_id:
-            print("⚠️  No application_id found in variable_values - cannot update database")
+            logger.warning("no application_id in variable_values, cannot update application", extra=log_fields(call_id=call_id))
             return False
         
-        # Update the database using the existing db module
-        print(f"🔄 Updating application {application_id} with extracted data...")
-        
         # Use the database manager to update the application
-        result = db_manager.update_application(application_id, update_data)
+        result = instrumented('application_update', services.db_manager().update_application, application_id, update_data)
         
         if result.get('success'):
-            print(f"✅ Successfully updated application {application_id} in database")
-            print(f"📊 Updated data: {result.get('data', {})}")
+            logger.info("updated application from call", extra=log_fields(call_id=call_id, application_id=application_id))
+            if dumps_enabled():
+                print(f"📊 Updated data: {result.get('data', {})}")
             return True
         else:
-            error_msg = result.get('error', 'Unknown error')
-            print(f"❌ Failed to update application {application_id} in database: {error_msg}")
+            logger.error("failed to update application", extra=log_fields(
+                call_id=call_id,
+                application_id=application_id,
+                error=result.get('error', 'Unknown error')
+            ))
             return False
             
     except Exception as e:
-        print(f"❌ Error filling database: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
\ No newline at end of file
+        logger.exception("error filling application", extra=log_fields(call_id=call_id, error=str(e)))
+        return False
+
+
+@traced()
+async def fill_database_async(extracted_info, variable_values, call_id, db):
+    """Async variant of fill_database, writing through an AsyncDatabaseManager"""
+    application_id = variable_values.get('application_id') if variable_values else None
+    set_attribute('application_id', application_id)
+    update_data = build_application_update(extracted_info)
+
+    if not update_data:
+        logger.warning("no data extracted from transcript to update", extra=log_fields(call_id=call_id))
+        return False
+
+    if not application_id:
+        logger.warning("no application_id in variable_values, cannot update application", extra=log_fields(call_id=call_id))
+        return False
+
+    result = await instrumented_async('application_update', db.update_application, application_id, update_data)
+    if result.get('success'):
+        logger.info("updated application from call", extra=log_fields(call_id=call_id, application_id=application_id))
+        return True
+
+    logger.error("failed to update application", extra=log_fields(
+        call_id=call_id,
+        application_id=application_id,
+        error=result.get('error', 'Unknown error')
+    ))
+    return False
+
+def build_application_update(extracted_info):
+    """Map extracted fields onto applications columns, skipping blanks"""
+    update_data = {}
+    
+    # Map date_of_birth - convert MM/DD/YYYY to YYYY-MM-DD format for PostgreSQL
+    if extracted_info.get('date_of_birth'):
+        try:
+            # Parse MM/DD/YYYY format and convert to YYYY-MM-DD
+            date_obj = datetime.strptime(extracted_info['date_of_birth'], '%m/%d/%Y')
+            update_data['date_of_birth'] = date_obj.strftime('%Y-%m-%d')
+        except ValueError:
+            # The value itself is not logged - it is personal data
+            logger.warning("could not parse date of birth, expected MM/DD/YYYY")
+    
+    # Map other fields directly
+    for extracted_key, db_column in APPLICATION_FIELD_MAPPINGS.items():
+        if extracted_info.get(extracted_key):
+            update_data[db_column] = extracted_info[extracted_key]
+    
+    if dumps_enabled():
+        print(f"📝 Application update: {update_data}")
+    
+    return update_data
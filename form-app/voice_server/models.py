@@ -0,0 +1,35 @@
+"""
+Data Models for the Voice Server
+Pydantic model of an applications row
+"""
+
+from typing import Optional, Dict, Any, List
+from pydantic import BaseModel
+
+
+class ApplicationRecord(BaseModel):
+    id: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    user_id: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    full_legal_name: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    date_of_birth: Optional[str] = None
+    marital_status: Optional[str] = None
+    what_looking_to_do: Optional[str] = None
+    property_address: Optional[str] = None
+    property_type: Optional[str] = None
+    property_value: Optional[str] = None
+    mortgage_balance: Optional[str] = None
+    property_use: Optional[str] = None
+    loan_amount_requested: Optional[str] = None
+    loan_purpose: Optional[str] = None
+    employment_type: Optional[str] = None
+    annual_income: Optional[str] = None
+    other_income_sources: Optional[List[Dict[str, Any]]] = None
+    current_bank: Optional[str] = None
+    current_step: Optional[int] = None
+    completed: Optional[bool] = None
@@ -0,0 +1,93 @@
+"""
+Phone Lookup for the Voice Server
+E.164 phone normalization and the phone -> latest application cache
+"""
+
+from typing import Any, Dict, Optional
+import os
+import re
+import threading
+
+from bounded_cache import BoundedCache
+
+
+def format_phone_to_e164(phone: Optional[str]) -> Optional[str]:
+    """
+    The phone number in E.164 form, as the web form formats it (ApplicationForm.formatPhoneToE164)
+    Numbers without a country code are taken as US/Canada. None if there are no digits
+    Keep in sync with normalize_phone_e164() in the applications phone_e164 migration
+    """
+    if not phone:
+        return None
+
+    # Remove all non-digit characters
+    digits_only = re.sub(r'\D', '', phone)
+    if not digits_only:
+        return None
+
+    # If it's already 11 digits and starts with 1, it's likely US/Canada format
+    if len(digits_only) == 11 and digits_only.startswith('1'):
+        return f"+{digits_only}"
+
+    # If it's 10 digits, assume US/Canada and add +1
+    if len(digits_only) == 10:
+        return f"+1{digits_only}"
+
+    # If it already has a country code, keep it - without the separators
+    if phone.strip().startswith('+'):
+        return f"+{digits_only}"
+
+    # Default: assume US/Canada and add +1
+    return f"+1{digits_only}"
+
+
+class PhoneApplicationCache:
+    """
+    Latest application_id per E.164 phone number, so repeat calls to a number skip the lookup.
+
+    Only found applications are cached: a number without an application is looked up again,
+    since the web form may create one at any time. Inserts and updates made through this
+    process invalidate the affected numbers. Applications created elsewhere (the web form
+    writes to Supabase directly) are picked up once the entry expires after ttl_seconds.
+    """
+
+    def __init__(self, max_entries: int = 5000, ttl_seconds: Optional[float] = 300):
+        self._applications = BoundedCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+        # Bumped on every invalidation; a lookup that overlapped one is not cached
+        self.generation = 0
+
+    @classmethod
+    def from_env(cls) -> 'PhoneApplicationCache':
+        return cls(
+            max_entries=int(os.getenv('PHONE_LOOKUP_CACHE_MAX_ENTRIES', '5000')),
+            ttl_seconds=float(os.getenv('PHONE_LOOKUP_CACHE_TTL_SECONDS', '300'))
+        )
+
+    def get(self, phone_e164: str) -> Optional[str]:
+        return self._applications.get(phone_e164)
+
+    def remember(self, phone_e164: str, application_id: str, generation: int):
+        """Cache a lookup result, unless an invalidation happened since the lookup started (generation)"""
+        with self._lock:
+            if generation == self.generation:
+                self._applications[phone_e164] = application_id
+
+    def invalidate_phone(self, phone: Optional[str]):
+        """An application was created or changed to this number - its latest application may differ now"""
+        phone_e164 = format_phone_to_e164(phone)
+        with self._lock:
+            self.generation += 1
+            if phone_e164:
+                self._applications.pop(phone_e164)
+
+    def invalidate_application(self, application_id: str):
+        """Drop every number that resolves to this application (its phone changed, or it was deleted)"""
+        with self._lock:
+            self.generation += 1
+            for phone_e164, cached_id in self._applications.items():
+                if cached_id == application_id:
+                    self._applications.pop(phone_e164)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._applications.stats()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Production entry point for the VAPI webhook server
+
+Runs N pre-forked worker processes that accept connections from one shared
+listening socket. The transcript cache, call status and live transcript
+events live in a single state process, and every worker talks to it over a
+local unix socket, so any worker can serve /transcript/<call_id> and the SSE
+streams consistently. Webhook deduplication is shared the same way, and
+workers merge their /metrics counters into the state process. Each
+worker keeps its own write-ahead log in VAPI_WAL_DIR/worker-<n>.
+
+Each worker answers HTTP with Werkzeug's threaded server - the webhook
+handler only parses, logs to the WAL and queues, so it is not the
+bottleneck. It has no request timeouts or body limits of its own, so keep
+a reverse proxy (nginx, a load balancer) in front of it.
+
+    python serve.py                      # VAPI_SERVER_PROCESSES workers on port 5001
+    python serve.py --workers 8 --port 5001
+"""
+
+from multiprocessing.managers import BaseManager
+import argparse
+import multiprocessing
+import os
+import secrets
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from dotenv import load_dotenv
+from werkzeug.serving import make_server
+
+import services
+import vapi_webhook
+import webhook_metrics
+from call_state import CallState
+from webhook_dedupe import WebhookDeduplicator
+from webhook_metrics import MetricsRegistry
+
+
+load_dotenv()
+
+_call_state = None
+_deduplicator = None
+_metrics = None
+
+
+def _get_call_state() -> CallState:
+    # Runs in the state process - every worker's proxy refers to this one object
+    global _call_state
+    if _call_state is None:
+        _call_state = CallState.from_env()
+    return _call_state
+
+
+def _get_deduplicator() -> WebhookDeduplicator:
+    global _deduplicator
+    if _deduplicator is None:
+        _deduplicator = WebhookDeduplicator()
+    return _deduplicator
+
+
+def _get_metrics() -> MetricsRegistry:
+    global _metrics
+    if _metrics is None:
+        _metrics = MetricsRegistry()
+    return _metrics
+
+
+class SharedStateManager(BaseManager):
+    """Serves the shared CallState, WebhookDeduplicator and metrics to the worker processes"""
+
+
+SharedStateManager.register('CallState', callable=_get_call_state)
+SharedStateManager.register('Deduplicator', callable=_get_deduplicator)
+SharedStateManager.register('Metrics', callable=_get_metrics)
+
+
+def worker_main(index: int, listen_fd: int, address: str, authkey: bytes, host: str, port: int):
+    """Worker process: serve the Flask app on the shared socket, with state from the state process"""
+    manager = SharedStateManager(address=address, authkey=authkey)
+    manager.connect()
+    vapi_webhook.set_call_state(manager.CallState())
+    # Metrics are recorded locally and merged into the state process every few seconds
+    webhook_metrics.share_metrics(manager.Metrics(), f'worker-{index}')
+
+    wal_root = os.getenv('VAPI_WAL_DIR', 'webhook_wal')
+    server = vapi_webhook.VapiWebHookServer(
+        deduplicator=manager.Deduplicator(),
+        wal_dir=os.path.join(wal_root, f'worker-{index}') if wal_root else ''
+    )
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent handles Ctrl+C
+
+    httpd = make_server(host, port, server.app, threaded=True, fd=listen_fd)
+    server.worker_pool.start()
+    server.replay_pending_webhooks()
+    # Clients are created after the fork, in each worker, never inherited
+    server.warm_up_thread = services.warm_up()
+    print(f"👷 Worker {index} (pid {os.getpid()}) ready")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.worker_pool.stop()
+        server.flush_call_log_writes()
+        webhook_metrics.flush()
+        if server.wal:
+            server.wal.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the VAPI webhook server with pre-forked workers")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('VAPI_SERVER_PROCESSES', '4')), help="Number of worker processes")
+    parser.add_argument('--host', default=os.getenv('VAPI_SERVER_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('VAPI_SERVER_PORT', '5001')))
+    args = parser.parse_args()
+
+    # fork keeps startup cheap and lets workers inherit the listening socket
+    context = multiprocessing.get_context('fork')
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((args.host, args.port))
+    listener.listen(1024)
+    listener.set_inheritable(True)
+
+    state_dir = tempfile.mkdtemp(prefix='voice-server-')
+    address = os.path.join(state_dir, 'state.sock')
+    authkey = secrets.token_bytes(32)
+    manager = SharedStateManager(address=address, authkey=authkey, ctx=context)
+    manager.start()
+
+    print(f"🚀 Starting VAPI Webhook Server on {args.host}:{args.port} with {args.workers} worker processes")
+    print(f"📡 Webhook URL: http://localhost:{args.port}/vapi/webhook")
+    print(f"🗄️  Shared state: {address}")
+    print("=" * 80)
+
+    def spawn(index):
+        process = context.Process(
+            target=worker_main,
+            args=(index, listener.fileno(), address, authkey, args.host, args.port),
+            name=f"webhook-server-{index}",
+            daemon=False
+        )
+        process.start()
+        return process
+
+    workers = {index: spawn(index) for index in range(args.workers)}
+    stopping = False
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    try:
+        while not stopping:
+            time.sleep(0.5)
+            for index, process in list(workers.items()):
+                if not process.is_alive() and not stopping:
+                    print(f"⚠️  Worker {index} exited with code {process.exitcode}, restarting")
+                    workers[index] = spawn(index)
+    finally:
+        print("\n👋 Stopping workers...")
+        for process in workers.values():
+            if process.is_alive():
+                process.terminate()
+        for process in workers.values():
+            process.join(10)
+        manager.shutdown()
+        listener.close()
+        try:
+            os.remove(address)
+            os.rmdir(state_dir)
+        except OSError:
+            pass
+
+
+if __name__ == "__main__":
+    main()
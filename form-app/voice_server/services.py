@@ -0,0 +1,119 @@
+"""
+Service Container for the Voice Server
+Shared clients (database, call logger, OpenAI) created on first use instead of at import time
+
+Importing a server module never opens a connection or resolves a hostname, so workers fork
+fast and a slow DNS lookup delays the first request that needs the service, not boot.
+Tests and tools can swap a service before it is created:
+
+    services.override('db', DatabaseManager(SQLiteStorage()))
+"""
+
+from typing import Any, Callable, Dict, Optional, Tuple
+import os
+import threading
+
+
+class ServiceContainer:
+    """Named factories whose results are created once, on first get(), and then shared"""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        with self._lock:
+            self._factories[name] = factory
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            # Factories can get() the services they depend on, hence the re-entrant lock
+            if name not in self._instances:
+                if name not in self._factories:
+                    raise KeyError(f"Unknown service: {name}")
+                self._instances[name] = self._factories[name]()
+            return self._instances[name]
+
+    def override(self, name: str, instance: Any):
+        """Use instance for name from now on, e.g. a DatabaseManager on another storage backend"""
+        with self._lock:
+            self._instances[name] = instance
+
+    def created(self, name: str) -> bool:
+        return name in self._instances
+
+    def reset(self, name: Optional[str] = None):
+        """Forget created instances (all of them if name is None); the next get() creates them again"""
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(name, None)
+
+
+def _create_db_manager():
+    from db import DatabaseManager
+    return DatabaseManager()
+
+
+def _create_call_logger():
+    from call_logger import CallLogger
+    return CallLogger(container.get('db'))
+
+
+def _create_openai_client():
+    # openai takes about half a second to import, so only the first extraction pays for it
+    from openai import OpenAI
+    return OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+
+
+container = ServiceContainer()
+container.register('db', _create_db_manager)
+container.register('call_logger', _create_call_logger)
+container.register('openai', _create_openai_client)
+
+
+def db_manager():
+    """The shared DatabaseManager"""
+    return container.get('db')
+
+
+def call_logger():
+    """The shared CallLogger"""
+    return container.get('call_logger')
+
+
+def openai_client():
+    """The shared openai.OpenAI client - one connection pool for every extraction"""
+    return container.get('openai')
+
+
+def warm_up(names: Tuple[str, ...] = ('db', 'call_logger', 'openai')) -> threading.Thread:
+    """
+    Create services on a background thread once the server is up, so the first
+    webhooks don't wait for imports and clients. Failures are left for first use to report
+    """
+    def run():
+        for name in names:
+            try:
+                instance = container.get(name)
+                if hasattr(instance, 'warm_up'):
+                    instance.warm_up()
+            except Exception as e:
+                print(f"⚠️  Could not warm up {name}: {e}")
+
+    thread = threading.Thread(target=run, name='service-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+def override(name: str, instance: Any):
+    container.override(name, instance)
+
+
+def reset(name: Optional[str] = None):
+    container.reset(name)
@@ -0,0 +1,123 @@
+"""
+Sharded Cache for the Voice Server
+Lock-striped BoundedCache and atomic counters for request handlers running on many threads
+"""
+
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import threading
+import zlib
+
+from bounded_cache import BoundedCache
+
+
+class AtomicCounter:
+    """Integer counter that is safe to increment from any thread"""
+
+    def __init__(self, value: int = 0):
+        self._value = value
+        self._lock = threading.Lock()
+
+    def increment(self, amount: int = 1) -> int:
+        """Add amount and return the new value"""
+        with self._lock:
+            self._value += amount
+            return self._value
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+
+class ShardedCache:
+    """
+    BoundedCache split into independently locked shards.
+
+    Keys are routed to a shard by crc32. Threads working on different calls
+    usually hit different shards and do not contend on a single lock. Each
+    shard holds max_entries / num_shards entries. LRU and TTL eviction
+    therefore apply per shard, which approximates a global LRU when keys
+    are spread evenly.
+    """
+
+    def __init__(self, num_shards: int = 16, max_entries: int = 1000, ttl_seconds: Optional[float] = None,
+                 on_evict: Optional[Callable[[Hashable, Any, str], None]] = None):
+        self.num_shards = max(num_shards, 1)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        per_shard = max(-(-max_entries // self.num_shards), 1)  # ceiling division
+        self._shards = [
+            BoundedCache(max_entries=per_shard, ttl_seconds=ttl_seconds, on_evict=on_evict)
+            for _ in range(self.num_shards)
+        ]
+
+    def shard(self, key: Hashable) -> BoundedCache:
+        return self._shards[zlib.crc32(str(key).encode()) % self.num_shards]
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.shard(key)
+
+    def __getitem__(self, key: Hashable) -> Any:
+        return self.shard(key)[key]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        return self.shard(key).get(key, default)
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Tuple[Any, bool]:
+        return self.shard(key).get_or_create(key, factory)
+
+    def __setitem__(self, key: Hashable, value: Any):
+        self.shard(key)[key] = value
+
+    def __delitem__(self, key: Hashable):
+        del self.shard(key)[key]
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        return self.shard(key).pop(key, default)
+
+    def expire_after(self, key: Hashable, seconds: float):
+        self.shard(key).expire_after(key, seconds)
+
+    def purge_expired(self):
+        for shard in self._shards:
+            shard.purge_expired()
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Snapshot of (key, value) pairs across all shards"""
+        items = []
+        for shard in self._shards:
+            items.extend(shard.items())
+        return items
+
+    def keys(self) -> list:
+        keys = []
+        for shard in self._shards:
+            keys.extend(shard.keys())
+        return keys
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def __bool__(self) -> bool:
+        return any(shard for shard in self._shards)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters summed over all shards"""
+        stats = {
+            'size': 0,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'shards': self.num_shards,
+            'hits': 0,
+            'misses': 0,
+            'evictions': {'capacity': 0, 'ttl': 0, 'deadline': 0}
+        }
+        for shard in self._shards:
+            shard_stats = shard.stats()
+            stats['size'] += shard_stats['size']
+            stats['hits'] += shard_stats['hits']
+            stats['misses'] += shard_stats['misses']
+            for reason, count in shard_stats['evictions'].items():
+                stats['evictions'][reason] += count
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] / lookups) if lookups else 0
+        return stats
@@ -35,5 +35,6 @@ echo ""
 echo "Press Ctrl+C to stop the server"
 echo "=" * 60
 
-# Start the server with option 1 (webhook server only)
-echo "1" | python vapi_webhook.py
\ No newline at end of file
+# Start the production server (pre-forked workers sharing one transcript store)
+# Set VAPI_SERVER_PROCESSES to change the number of worker processes
+python serve.py
\ No newline at end of file
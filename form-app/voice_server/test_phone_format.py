@@ -3,27 +3,7 @@
 Test phone number formatting
 """
 
-def format_phone_to_e164(phone: str) -> str:
-    """JavaScript version ported to Python for testing"""
-    import re
-    
-    # Remove all non-digit characters
-    digits_only = re.sub(r'\D', '', phone)
-    
-    # If it's already 11 digits and starts with 1, it's likely US/Canada format
-    if len(digits_only) == 11 and digits_only.startswith('1'):
-        return f"+{digits_only}"
-    
-    # If it's 10 digits, assume US/Canada and add +1
-    if len(digits_only) == 10:
-        return f"+1{digits_only}"
-    
-    # If it already starts with +, return as is
-    if phone.startswith('+'):
-        return phone
-    
-    # Default: assume US/Canada and add +1
-    return f"+1{digits_only}"
+from phone_lookup import format_phone_to_e164
 
 def test_phone_formatting():
     """Test various phone number formats"""
@@ -36,6 +16,7 @@ def test_phone_formatting():
         "1-416-700-9468",       # Should become +14167009468
         "14167009468",          # Should become +14167009468
         "+14167009468",         # Should stay +14167009468
+        "+44 20 7946 0958",     # Should become +442079460958
     ]
     
     print("📞 Phone Number Formatting Tests")
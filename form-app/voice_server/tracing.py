@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Tracing for the Voice Server
+Spans across the webhook, call logging, database, OpenAI and VAPI calls, with pluggable exporters
+
+Spans are off unless an exporter is configured:
+
+    VAPI_TRACE_EXPORTER=console              # one JSON line per span through the structured logger
+    VAPI_TRACE_EXPORTER=file                 # JSON lines appended to VAPI_TRACE_FILE (default traces.jsonl)
+    VAPI_TRACE_EXPORTER=my_module:MyExporter # any callable returning an object with export(span) / shutdown()
+
+A file of spans can be examined offline:
+
+    python tracing.py traces.jsonl                # slowest traces as span trees
+    python tracing.py traces.jsonl --call <id>    # every trace for one call
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+import functools
+import importlib
+import inspect
+import json
+import os
+import secrets
+import threading
+import time
+
+
+# Attributes copied from a span to its children, so every span of a call can be filtered on them
+INHERITED_ATTRIBUTES = ('call_id', 'application_id')
+
+# Function arguments recorded as span attributes by @traced
+TRACED_ARGUMENTS = {'call_id': 'call_id', 'vapi_call_id': 'call_id', 'application_id': 'application_id'}
+
+
+class Span:
+    """One timed operation. Finished spans are handed to the exporter as plain dicts"""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'attributes', 'status', 'error',
+                 'start_time', '_start')
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.status = 'ok'
+        self.error = None
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+
+    def set_attribute(self, key: str, value: Any):
+        if value is not None:
+            self.attributes[key] = value
+
+    def record_error(self, error: Any):
+        self.status = 'error'
+        self.error = str(error)
+
+    def context(self) -> 'SpanContext':
+        inherited = {key: self.attributes[key] for key in INHERITED_ATTRIBUTES if key in self.attributes}
+        return SpanContext(self.trace_id, self.span_id, inherited)
+
+    def finish(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': datetime.fromtimestamp(self.start_time, timezone.utc).isoformat(),
+            'duration_ms': round((time.perf_counter() - self._start) * 1000, 3),
+            'status': self.status,
+            'error': self.error,
+            'pid': os.getpid(),
+            'attributes': self.attributes
+        }
+
+
+class SpanContext:
+    """Where a span sits in its trace - handed to a worker thread so its spans join the request's trace"""
+
+    __slots__ = ('trace_id', 'span_id', 'attributes')
+
+    def __init__(self, trace_id: str, span_id: Optional[str], attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.attributes = attributes or {}
+
+
+class SpanExporter:
+    """Receives every finished span. Subclass and pass to set_exporter() to send spans elsewhere"""
+
+    def export(self, span: Dict[str, Any]):
+        raise NotImplementedError
+
+    def shutdown(self):
+        pass
+
+
+class ConsoleSpanExporter(SpanExporter):
+    """Writes spans through the structured logger, so request threads never block on stdout"""
+
+    def __init__(self):
+        from webhook_logging import get_logger, log_fields
+        self._logger = get_logger('trace')
+        self._log_fields = log_fields
+
+    def export(self, span: Dict[str, Any]):
+        self._logger.info("span", extra=self._log_fields(span=span))
+
+
+class FileSpanExporter(SpanExporter):
+    """Appends spans to a JSON lines file (pre-forked workers can share one file - each line is one write)"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv('VAPI_TRACE_FILE', 'traces.jsonl')
+        self._lock = threading.Lock()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def export(self, span: Dict[str, Any]):
+        line = json.dumps(span, default=str) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def shutdown(self):
+        with self._lock:
+            self._file.close()
+
+
+_current: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+_exporter: Optional[SpanExporter] = None
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def _exporter_from_env() -> Optional[SpanExporter]:
+    name = os.getenv('VAPI_TRACE_EXPORTER', 'none').strip()
+    if name in ('', 'none', '0', 'off'):
+        return None
+    if name == 'console':
+        return ConsoleSpanExporter()
+    if name == 'file':
+        return FileSpanExporter()
+    if ':' in name:
+        module_name, factory_name = name.split(':', 1)
+        return getattr(importlib.import_module(module_name), factory_name)()
+    print(f"⚠️  Unknown VAPI_TRACE_EXPORTER '{name}' - tracing disabled")
+    return None
+
+
+def get_exporter() -> Optional[SpanExporter]:
+    """The configured exporter, read from the environment on first use"""
+    global _exporter, _configured
+    if not _configured:
+        with _configure_lock:
+            if not _configured:
+                _exporter = _exporter_from_env()
+                _configured = True
+    return _exporter
+
+
+def set_exporter(exporter: Optional[SpanExporter]):
+    """Send spans to exporter from now on (None disables tracing)"""
+    global _exporter, _configured
+    previous = _exporter
+    _exporter = exporter
+    _configured = True
+    if previous is not None and previous is not exporter:
+        previous.shutdown()
+
+
+def enabled() -> bool:
+    return get_exporter() is not None
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_context() -> Optional[SpanContext]:
+    """Context of the active span, to continue the trace on another thread (see span(parent=...))"""
+    active = _current.get()
+    return active.context() if active is not None else None
+
+
+def set_attribute(key: str, value: Any):
+    """Set an attribute on the active span, if there is one"""
+    active = _current.get()
+    if active is not None:
+        active.set_attribute(key, value)
+
+
+def record_error(error: Any):
+    """Mark the active span as failed, for errors that are handled instead of raised"""
+    active = _current.get()
+    if active is not None:
+        active.record_error(error)
+
+
+@contextmanager
+def span(name: str, parent: Optional[SpanContext] = None, **attributes):
+    """
+    Time a block as a span, as a child of parent or of the active span
+    Exceptions mark the span as failed and are re-raised. Yields the Span (None when tracing is off)
+    """
+    exporter = get_exporter()
+    if exporter is None:
+        yield None
+        return
+
+    parent = parent or current_context()
+    inherited = dict(parent.attributes) if parent else {}
+    inherited.update((key, value) for key, value in attributes.items() if value is not None)
+    active = Span(name, parent.trace_id if parent else secrets.token_hex(16), parent.span_id if parent else None, inherited)
+
+    token = _current.set(active)
+    try:
+        yield active
+    except BaseException as e:
+        active.record_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        try:
+            exporter.export(active.finish())
+        except Exception as e:
+            print(f"❌ Span export failed: {e}")
+
+
+def _argument_attributes(signature: inspect.Signature, args: tuple, kwargs: dict) -> Dict[str, Any]:
+    try:
+        bound = signature.bind_partial(*args, **kwargs).arguments
+    except TypeError:
+        return {}
+    return {
+        attribute: bound[argument]
+        for argument, attribute in TRACED_ARGUMENTS.items()
+        if isinstance(bound.get(argument), (str, int))
+    }
+
+
+def _check_result(active: Optional[Span], result: Any):
+    # DatabaseManager-style results report failures instead of raising
+    if active is not None and isinstance(result, dict) and result.get('success') is False:
+        active.record_error(result.get('error', 'failed'))
+
+
+def traced(name: Optional[str] = None, record_failures: bool = True) -> Callable:
+    """
+    Decorator: run the function (sync or async) in a span
+    call_id / vapi_call_id / application_id arguments become span attributes,
+    and a {"success": False} result marks the span as failed unless record_failures is False
+    (lookups where a missing row is an expected answer)
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+        signature = inspect.signature(func)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if get_exporter() is None:
+                    return await func(*args, **kwargs)
+                with span(span_name, **_argument_attributes(signature, args, kwargs)) as active:
+                    result = await func(*args, **kwargs)
+                    if record_failures:
+                        _check_result(active, result)
+                    return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if get_exporter() is None:
+                return func(*args, **kwargs)
+            with span(span_name, **_argument_attributes(signature, args, kwargs)) as active:
+                result = func(*args, **kwargs)
+                if record_failures:
+                    _check_result(active, result)
+                return result
+        return wrapper
+
+    return decorator
+
+
+def load_spans(path: str) -> List[Dict[str, Any]]:
+    spans = []
+    with open(path, encoding='utf-8') as trace_file:
+        for line in trace_file:
+            line = line.strip()
+            if line:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue
+    return spans
+
+
+def print_trace(spans: List[Dict[str, Any]]):
+    """Print one trace as an indented span tree with durations"""
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    span_ids = {item['span_id'] for item in spans}
+    for item in sorted(spans, key=lambda item: item['start']):
+        parent = item['parent_id'] if item['parent_id'] in span_ids else None
+        children.setdefault(parent, []).append(item)
+
+    def walk(parent_id, depth):
+        for item in children.get(parent_id, []):
+            attributes = ' '.join(f"{key}={value}" for key, value in item['attributes'].items())
+            marker = '❌' if item['status'] == 'error' else '  '
+            print(f"{marker} {'  ' * depth}{item['name']:<{48 - 2 * depth}} {item['duration_ms']:>10.1f} ms  {attributes}")
+            if item.get('error'):
+                print(f"   {'  ' * depth}  {item['error']}")
+            walk(item['span_id'], depth + 1)
+
+    walk(None, 0)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show traces recorded by the file span exporter")
+    parser.add_argument('path', nargs='?', default=os.getenv('VAPI_TRACE_FILE', 'traces.jsonl'))
+    parser.add_argument('--call', help="Only traces for this call ID")
+    parser.add_argument('--limit', type=int, default=10, help="Number of traces to show, slowest first")
+    args = parser.parse_args()
+
+    traces: Dict[str, List[Dict[str, Any]]] = {}
+    for item in load_spans(args.path):
+        traces.setdefault(item['trace_id'], []).append(item)
+
+    def root_duration(items) -> float:
+        return max(item['duration_ms'] for item in items)
+
+    selected: List[Tuple[str, List[Dict[str, Any]]]] = [
+        (trace_id, items) for trace_id, items in traces.items()
+        if not args.call or any(item['attributes'].get('call_id') == args.call for item in items)
+    ]
+    selected.sort(key=lambda entry: root_duration(entry[1]), reverse=True)
+
+    print(f"📊 {len(traces)} traces in {args.path}, showing {min(args.limit, len(selected))}")
+    for trace_id, items in selected[:args.limit]:
+        print("=" * 100)
+        print(f"🔎 Trace {trace_id} - {root_duration(items):.1f} ms, {len(items)} spans")
+        print_trace(items)
+
+
+if __name__ == "__main__":
+    main()
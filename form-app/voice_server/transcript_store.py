@@ -0,0 +1,135 @@
+"""
+Transcript Store for VAPI Integration
+Keeps the live transcript for each call and merges incoming webhook history incrementally
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+import threading
+
+
+# Roles that make up the visible conversation
+CONVERSATION_ROLES = ('bot', 'user', 'assistant', 'customer')
+
+# How many of the most recent incoming messages are re-checked on every webhook.
+# VAPI only ever grows the tail of artifact.messages, so anything older is final.
+MERGE_TAIL = 4
+
+
+class CallTranscript:
+    """
+    Live transcript for a single call.
+
+    VAPI resends the full artifact.messages history on every
+    conversation-update/status-update. Instead of comparing every incoming
+    message against every cached one, the transcript remembers how many
+    incoming messages it has already consumed and only re-checks the last
+    few for partial utterances that are still growing.
+    """
+
+    def __init__(self):
+        self.messages: List[Dict[str, str]] = []  # [{"role": "bot/user", "message": "..."}]
+        self.consumed = 0  # number of incoming history messages already merged
+        self.last_seconds_from_start: Optional[float] = None
+        self.version = 0  # bumped on every append/update
+        self.entry_versions: List[int] = []  # version at which each message last changed
+        self.lock = threading.Lock()  # held by callers that merge into or read this transcript concurrently
+
+    def merge(self, history: List[Dict[str, Any]], changes: Optional[list] = None) -> Tuple[int, int]:
+        """
+        Merge the full message history from a webhook
+        If a changes list is given, (index, 'added'/'updated') is appended for every changed message
+        Returns (added_count, updated_count)
+        """
+        if len(history) < self.consumed:
+            # Older snapshot (redelivery, or webhooks handled out of order by concurrent
+            # threads/workers). History only grows, so it holds nothing newer than what is merged
+            return 0, 0
+
+        start = max(self.consumed - MERGE_TAIL, 0)
+
+        added_count = 0
+        updated_count = 0
+
+        for msg in history[start:]:
+            role = msg.get('role', 'unknown')
+            if role not in CONVERSATION_ROLES:
+                continue
+
+            # Normalize role names
+            normalized_role = 'bot' if role in ['bot', 'assistant'] else 'user'
+            message_text = msg.get('message', msg.get('content', ''))
+
+            result, index = self._merge_message(normalized_role, message_text)
+            if result == 'added':
+                added_count += 1
+            elif result == 'updated':
+                updated_count += 1
+            if result != 'skipped':
+                self.version += 1
+                self.entry_versions[index] = self.version
+                if changes is not None:
+                    changes.append((index, result))
+
+            seconds = msg.get('secondsFromStart')
+            if seconds is not None:
+                self.last_seconds_from_start = seconds
+
+        self.consumed = max(self.consumed, len(history))
+        return added_count, updated_count
+
+    def _merge_message(self, role: str, message_text: str) -> Tuple[str, int]:
+        """
+        Merge one message against the tail of the cached transcript
+        Returns ('added'/'updated'/'skipped', index of the matching cache entry)
+        """
+        # Re-checked incoming messages can only correspond to recent cache entries
+        window_start = max(len(self.messages) - 2 * MERGE_TAIL, 0)
+
+        for i in range(window_start, len(self.messages)):
+            existing_entry = self.messages[i]
+            if existing_entry["role"] != role:
+                continue
+
+            existing_msg = existing_entry["message"]
+
+            # The new message is an extension of an existing partial utterance
+            if message_text.startswith(existing_msg) and len(message_text) > len(existing_msg):
+                existing_entry["message"] = message_text
+                return 'updated', i
+            # The existing message is an extension of the new one (keep the longer version)
+            elif existing_msg.startswith(message_text) and len(existing_msg) > len(message_text):
+                return 'skipped', i
+            # Exact duplicate
+            elif existing_msg == message_text:
+                return 'skipped', i
+
+        self.messages.append({
+            "role": role,
+            "message": message_text
+        })
+        self.entry_versions.append(0)
+        return 'added', len(self.messages) - 1
+
+    def changes_since(self, version: int) -> List[Dict[str, Any]]:
+        """
+        Messages appended or updated after the given version, oldest index first
+        Each item is {"index": i, "role": ..., "message": ...}
+        """
+        if version >= self.version:
+            return []
+
+        # Updates only ever touch the last 2 * MERGE_TAIL entries, so once that many
+        # consecutive unchanged entries have been passed nothing older can have changed
+        changed = []
+        unchanged_run = 0
+        for index in range(len(self.messages) - 1, -1, -1):
+            if self.entry_versions[index] > version:
+                changed.append({"index": index, **self.messages[index]})
+                unchanged_run = 0
+            else:
+                unchanged_run += 1
+                if unchanged_run >= 2 * MERGE_TAIL:
+                    break
+
+        changed.reverse()
+        return changed
@@ -0,0 +1,78 @@
+"""
+Live Transcript Streaming for the Voice Server
+Event bus and Server-Sent Events formatting for transcript changes
+"""
+
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+import itertools
+import json
+import threading
+
+
+class TranscriptEventBus:
+    """
+    In-memory log of transcript change events with monotonically increasing IDs.
+
+    Events are kept in a bounded ring buffer so SSE clients that reconnect
+    with Last-Event-ID can be replayed everything they missed. If the ID has
+    already fallen out of the buffer, the stream sends a fresh snapshot instead.
+    """
+
+    def __init__(self, buffer_size: int = 5000):
+        self._events: deque = deque(maxlen=buffer_size)  # (event_id, call_id, event_name, data)
+        self._last_id = 0
+        self._condition = threading.Condition()
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def publish(self, call_id: str, event_name: str, data: Dict[str, Any]) -> int:
+        """Append an event and wake up waiting streams. Returns the event ID"""
+        with self._condition:
+            self._last_id += 1
+            self._events.append((self._last_id, call_id, event_name, data))
+            self._condition.notify_all()
+            return self._last_id
+
+    def events_since(self, last_id: int, call_id: Optional[str] = None) -> Tuple[List[tuple], bool, int]:
+        """
+        Events newer than last_id, optionally for a single call
+        Returns (events, complete, newest_id) - complete is False if some events were already dropped
+        """
+        with self._condition:
+            if not self._events or last_id >= self._last_id:
+                return [], True, self._last_id
+
+            oldest_id = self._events[0][0]
+            complete = last_id >= oldest_id - 1
+
+            # IDs are contiguous, so the first wanted event sits at a known offset
+            offset = max(last_id + 1 - oldest_id, 0)
+            events = [
+                event for event in itertools.islice(self._events, offset, None)
+                if call_id is None or event[1] == call_id
+            ]
+            return events, complete, self._last_id
+
+    def wait(self, last_id: int, timeout: float) -> bool:
+        """Block until an event newer than last_id is published or timeout expires"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._last_id > last_id, timeout)
+
+
+def format_sse(data: Dict[str, Any], event_name: Optional[str] = None, event_id: Optional[int] = None) -> str:
+    """Format a single Server-Sent Events message"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event_name:
+        lines.append(f"event: {event_name}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def format_heartbeat() -> str:
+    """SSE comment line, keeps proxies and the browser from timing out idle streams"""
+    return ": heartbeat\n\n"
@@ -0,0 +1,94 @@
+"""
+Async VAPI Client for the Voice Server
+Places, schedules and looks up calls over pooled httpx connections
+"""
+
+from typing import Any, Dict, Optional
+import json
+import os
+
+import httpx
+
+from tracing import record_error, set_attribute, traced
+from voice import VAPI_CALL_URL, build_call_payload
+
+
+VAPI_API_URL = "https://api.vapi.ai"
+
+
+class AsyncVapiClient:
+    """Non-blocking counterpart of voice.make_call/schedule_call and test.get_call_body"""
+
+    def __init__(self, http_client: httpx.AsyncClient, api_key: Optional[str] = None):
+        self.http = http_client
+        self.api_key = api_key or os.getenv('VAPI_API_PRIVATE_KEY')
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    @traced()
+    async def make_call(self, application_id: str, mortgage_agent_name: str, first_name: str,
+                        last_name: str, email: str, phone_number: str, interest: str,
+                        brokerage_name: str, earliest_at: Optional[str] = None) -> Optional[str]:
+        """
+        Start an outbound call (or schedule it when earliest_at is given)
+        Returns the VAPI call ID, or None if the request failed
+        """
+        if not self.api_key:
+            print("❌ VAPI_API_PRIVATE_KEY environment variable is required")
+            return None
+
+        payload = build_call_payload(application_id, mortgage_agent_name, first_name, last_name,
+                                     email, phone_number, interest, brokerage_name, earliest_at=earliest_at)
+        try:
+            response = await self.http.post(VAPI_CALL_URL, json=payload, headers=self._headers())
+            response.raise_for_status()
+
+            call_data = response.json()
+            call_id = call_data.get('id')
+            set_attribute('call_id', call_id)
+            if call_id:
+                action = "scheduled" if earliest_at else "initiated"
+                print(f"✅ Call {action} successfully! Call ID: {call_id} (status: {call_data.get('status', 'unknown')})")
+                return call_id
+
+            print(f"❌ No call ID in response: {json.dumps(call_data)}")
+            return None
+
+        except httpx.HTTPStatusError as e:
+            record_error(e)
+            print(f"❌ Call request failed: {e}")
+            print(f"Response Body: {e.response.text}")
+            return None
+        except Exception as e:
+            record_error(e)
+            print(f"❌ Call request failed: {e}")
+            return None
+
+    async def schedule_call(self, application_id: str, earliest_at: str, mortgage_agent_name: str,
+                            first_name: str, last_name: str, email: str, phone_number: str,
+                            interest: str, brokerage_name: str) -> Optional[str]:
+        """Schedule a call for earliest_at - same arguments as voice.schedule_call"""
+        return await self.make_call(application_id, mortgage_agent_name, first_name, last_name, email,
+                                    phone_number, interest, brokerage_name, earliest_at=earliest_at)
+
+    @traced()
+    async def get_call(self, call_id: str) -> Dict[str, Any]:
+        """
+        The complete call body from VAPI
+        Raises Exception if the API key is missing or the request fails, like test.get_call_body
+        """
+        if not self.api_key:
+            raise Exception("VAPI_API_PRIVATE_KEY environment variable not set")
+
+        try:
+            response = await self.http.get(f"{VAPI_API_URL}/call/{call_id}", headers=self._headers())
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            raise Exception(f"Failed to fetch call data from Vapi: {str(e)}")
+        except ValueError as e:
+            raise Exception(f"Failed to parse response from Vapi: {str(e)}")
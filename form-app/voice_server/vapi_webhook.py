@@ -9,107 +9,124 @@ and prints them to the terminal for debugging purposes.
 import os
 import json
 import time
-import requests
 from datetime import datetime
-from flask import Flask, request, jsonify
-import hmac
-import hashlib
-from db import DatabaseManager
+from flask import Flask, Response, request, jsonify, stream_with_context
 from dotenv import load_dotenv
-import test_calls
 import fill_application
-from call_logger import handle_vapi_webhook
+import services
+from call_logger import handle_vapi_webhook, transcript_history
+from webhook_queue import WebhookWorkerPool
+from transcript_store import CallTranscript
+from call_state import CallState
+from sharded_cache import AtomicCounter
+from transcript_stream import format_sse, format_heartbeat
+from webhook_envelope import WebhookEnvelope, verify_signature
+from webhook_dedupe import WebhookDeduplicator, webhook_key
+from webhook_wal import WebhookWAL
+from webhook_logging import get_logger, log_fields, dumps_enabled, StageTimer
+import webhook_metrics
+import tracing
 
 
 # Load environment variables
 load_dotenv()
 
-# Global transcript cache indexed by call ID
-transcript_cache = {}  # {call_id: [{"role": "bot/user", "message": "...", "timestamp": "...", "secondsFromStart": 0}, ...]}
+logger = get_logger('webhook')
 
-# Global call status tracker - tracks which calls are active vs completed
-call_status_cache = {}  # {call_id: {"status": "active/completed", "ended_at": "timestamp"}}
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
 
-db_manager = DatabaseManager()
+# Global call state: transcript cache indexed by call ID, call status tracking and
+# transcript change events for the SSE streams. Messages are [{"role": "bot/user", "message": "..."}, ...]
+# In production mode (serve.py) this is replaced by a proxy to a state shared by all worker processes
+call_state = CallState.from_env()
 
 
-def add_to_transcript_cache(call_id: str, messages: list):
-    """Add transcript messages to the global cache for a specific call ID with intelligent deduplication"""
-    print(f"    🔧 add_to_transcript_cache called with:")
-    print(f"      Call ID: {call_id}")
-    print(f"      Messages to add: {len(messages)}")
-    
-    if call_id not in transcript_cache:
-        transcript_cache[call_id] = []
-        print(f"      Created new cache array for call {call_id}")
+def add_to_transcript_cache(call_id: str, messages: list, completed: bool = False) -> tuple:
+    """
+    Merge a webhook's message history into the global cache for a specific call ID, and update the call's status
+    Only the tail of the history is re-checked, so each webhook costs constant time
+    Returns (added_count, updated_count, message_count)
+    """
+    added_count, updated_count, message_count, created = call_state.record_webhook(call_id, messages, completed)
+    if created:
+        logger.debug("created transcript cache entry", extra=log_fields(call_id=call_id))
+    return added_count, updated_count, message_count
 
-        # Find the application id from the call id
-        application_id = db_manager.find_application_id_by_call_id(call_id)
-        
-    else:
-        print(f"      Using existing cache array for call {call_id}")
-    
-    added_count = 0
-    updated_count = 0
-    
-    for msg in messages:
-        role = msg.get('role', 'unknown')
-        if role in ['bot', 'user', 'assistant', 'customer']:
-            # Normalize role names
-            normalized_role = 'bot' if role in ['bot', 'assistant'] else 'user'
-            message_text = msg.get('message', msg.get('content', ''))
-            
-            # Create cache entry in the specified format
-            cache_entry = {
-                "role": normalized_role,
-                "message": message_text
-            }
-            
-            # Smart deduplication: handle progressive speech updates
-            existing_cache = transcript_cache[call_id]
-            found_similar = False
-            
-            # Look for existing messages from the same role that might be partial versions
-            for i, existing_entry in enumerate(existing_cache):
-                if existing_entry["role"] == normalized_role:
-                    existing_msg = existing_entry["message"]
-                    
-                    # Check if the new message is an extension of an existing message
-                    if message_text.startswith(existing_msg) and len(message_text) > len(existing_msg):
-                        # Update the existing message with the longer version
-                        existing_cache[i]["message"] = message_text
-                        updated_count += 1
-                        found_similar = True
-                        print(f"      Updated message: role='{normalized_role}', message='{message_text[:50]}...'")
-                        break
-                    # Check if the existing message is an extension of the new message (ignore shorter version)
-                    elif existing_msg.startswith(message_text) and len(existing_msg) > len(message_text):
-                        # Keep the longer existing message, ignore the shorter new one
-                        found_similar = True
-                        print(f"      Kept longer existing message: '{existing_msg[:50]}...'")
-                        break
-                    # Check for exact match
-                    elif existing_msg == message_text:
-                        found_similar = True
-                        print(f"      Skipped duplicate message: '{message_text[:50]}...'")
-                        break
-            
-            # If no similar message found, add as new
-            if not found_similar:
-                transcript_cache[call_id].append(cache_entry)
-                added_count += 1
-                print(f"      Added new message: role='{normalized_role}', message='{message_text[:50]}...'")
-                
-        else:
-            print(f"      Skipped message with role '{role}' (not in allowed roles)")
-    
-    print(f"      Total new messages added: {added_count}")
-    print(f"      Total messages updated: {updated_count}")
-    print(f"      Final cache size for {call_id}: {len(transcript_cache[call_id])}")
+def set_call_state(state):
+    """Swap the call state, e.g. for a proxy to the state shared between worker processes"""
+    global call_state
+    call_state = state
 
 def get_transcript_cache(call_id: str) -> list:
     """Get the transcript cache for a specific call ID"""
-    return transcript_cache.get(call_id, [])
+    transcript = call_state.transcript(call_id)
+    return transcript['messages'] if transcript else []
+
+def get_active_calls() -> list:
+    """Summaries of all calls that have not completed yet"""
+    return call_state.active_calls()
+
+def stream_transcript_events(call_id: str = None, last_event_id: int = None):
+    """
+    Generate Server-Sent Events for one call's transcript, or for all calls if call_id is None
+    Starts with a snapshot unless the client can be resumed from last_event_id
+    """
+    def snapshot(event_id):
+        if call_id:
+            # Completed or evicted calls are no longer cached - the dashboard relies on the persisted transcript
+            data = {
+                'call_id': call_id,
+                'status': call_state.call_status(call_id),
+                'transcript': get_transcript_cache(call_id) or get_persisted_transcript(call_id)
+            }
+        else:
+            data = {'calls': get_active_calls()}
+        return format_sse(data, 'snapshot', event_id)
+
+    # Take the cursor before the snapshot so nothing published in between is lost
+    cursor = call_state.last_event_id()
+    if last_event_id is None or last_event_id > cursor:
+        # New client, or an ID from before a server restart
+        yield snapshot(cursor)
+    else:
+        events, complete, cursor = call_state.events_since(last_event_id, call_id)
+        if not complete:
+            yield snapshot(cursor)
+        else:
+            for event_id, _, event_name, data in events:
+                yield format_sse(data, event_name, event_id)
+
+    while True:
+        if not call_state.wait_for_events(cursor, SSE_HEARTBEAT_SECONDS):
+            yield format_heartbeat()
+            continue
+        
+        events, complete, newest_id = call_state.events_since(cursor, call_id)
+        if not complete:
+            # This client fell behind the event buffer - resend the full state
+            yield snapshot(newest_id)
+        else:
+            for event_id, _, event_name, data in events:
+                yield format_sse(data, event_name, event_id)
+        cursor = newest_id
+
+def get_persisted_transcript(call_id: str) -> list:
+    """
+    Load a call's transcript from its transcript events, in the same format as the cache
+    Calls logged before call_transcript_events existed fall back to call_logs.full_transcript
+    """
+    db_manager = services.db_manager()
+    events = db_manager.get_transcript_events(call_id)
+    history = transcript_history(events['data']) if events.get('success') else []
+    if not history:
+        result = db_manager.get_call_log_by_vapi_id(call_id)
+        if not result.get('success'):
+            return []
+        history = result['data'].get('full_transcript') or []
+
+    transcript = CallTranscript()
+    transcript.merge(history)
+    return transcript.messages
 
 def display_transcript_cache(call_id: str):
     """Display the current transcript cache for a call ID"""
@@ -146,31 +163,35 @@ def display_transcript_cache(call_id: str):
 
 def clear_transcript_cache(call_id: str):
     """Clear transcript cache for a specific call ID"""
-    if call_id in transcript_cache:
-        del transcript_cache[call_id]
+    if call_state.clear(call_id):
         print(f"🗑️  Cleared transcript cache for call {call_id}")
+        return True
+    return False
 
 def list_cached_calls():
     """List all call IDs that have cached transcripts"""
-    if not transcript_cache:
+    cached_calls = call_state.cached_calls()
+    if not cached_calls:
         print("📭 No calls have cached transcripts")
         return
     
-    print(f"\n📋 CACHED CALLS ({len(transcript_cache)}):")
-    for call_id, messages in transcript_cache.items():
-        print(f"   📞 {call_id}: {len(messages)} messages")
+    print(f"\n📋 CACHED CALLS ({len(cached_calls)}):")
+    for call_id, message_count in cached_calls:
+        print(f"   📞 {call_id}: {message_count} messages")
     print()
 
 def display_complete_cache():
     """Display the complete cache structure with all call IDs and their transcript arrays"""
-    if not transcript_cache:
+    cached_calls = call_state.cached_calls()
+    if not cached_calls:
         print("📭 No calls have cached transcripts")
         return
     
     print(f"\n🗂️  COMPLETE CACHE STRUCTURE:")
     print("=" * 100)
     
-    for call_id, messages in transcript_cache.items():
+    for call_id, _ in cached_calls:
+        messages = get_transcript_cache(call_id)
         print(f"📞 CALL ID: {call_id}")
         print(f"📊 Messages: {len(messages)}")
         print("-" * 80)
@@ -189,14 +210,16 @@ def display_complete_cache():
 
 def print_raw_cache_data():
     """Print the exact raw cache data structure"""
-    if not transcript_cache:
+    cached_calls = call_state.cached_calls()
+    if not cached_calls:
         print("📭 No calls have cached transcripts")
         return
     
     print(f"\n🔍 RAW CACHE DATA STRUCTURE:")
     print("=" * 100)
     
-    for call_id, messages in transcript_cache.items():
+    for call_id, _ in cached_calls:
+        messages = get_transcript_cache(call_id)
         print(f"📞 CALL ID: {call_id}")
         print(f"📊 Messages: {len(messages)}")
         print("-" * 80)
@@ -211,13 +234,100 @@ def print_raw_cache_data():
         
         print("=" * 80)
 
+def process_webhook_event(envelope: WebhookEnvelope, call_id: str, webhook_number: int, timer: StageTimer = None):
+    """
+    Process a single webhook event
+    Runs on a webhook worker thread, after the HTTP request has been acknowledged.
+    The end-of-call extraction is not part of it - see process_end_of_call
+    """
+    timer = timer or StageTimer()
+    timer.mark('received_to_worker')
+    webhook_data = envelope.data
+    webhook_type = envelope.type
+    fields = {'webhook': webhook_number, 'call_id': call_id, 'type': webhook_type}
+    # Stage metrics recorded further down (call log, extraction, ...) are labelled with this type
+    webhook_metrics.set_webhook_type(webhook_type)
+
+    if dumps_enabled():
+        # Print the entire webhook body from VAPI
+        print(f"\n📋 COMPLETE WEBHOOK BODY FROM VAPI (#{webhook_number}):")
+        print("=" * 80)
+        print(json.dumps(webhook_data, indent=2))
+        print("=" * 80)
+
+    # Call logging - handles all webhook types (call-start, transcript, end-of-call-report)
+    try:
+        with timer.stage('call_logging'):
+            logging_result = handle_vapi_webhook(envelope)
+        if not logging_result.get('success'):
+            logger.warning("call logging issue", extra=log_fields(error=logging_result.get('error'), **fields))
+    except Exception as e:
+        logger.exception("error in call logging", extra=log_fields(error=str(e), **fields))
+
+    # Merge transcript messages into the cache and track the call's status. Completed calls stay
+    # visible for a while, then fall back to call_logs (add_to_transcript_cache filters out
+    # system/tool messages itself)
+    messages = envelope.messages
+    if call_id and call_id != 'unknown':
+        with timer.stage('transcript_merge'):
+            added_count, updated_count, message_count = add_to_transcript_cache(
+                call_id, messages, completed=webhook_type == 'end-of-call-report'
+            )
+        if messages:
+            fields.update(added=added_count, updated=updated_count, cached=message_count)
+
+            if dumps_enabled():
+                display_transcript_cache(call_id)
+                display_complete_cache()
+                print_raw_cache_data()
+
+    webhook_metrics.observe_timer(webhook_type, timer)
+    logger.info("webhook processed", extra=log_fields(
+        total_ms=timer.total_ms(),
+        stages=timer.stages,
+        **fields
+    ))
+
+def process_end_of_call(envelope: WebhookEnvelope, call_id: str, webhook_number: int):
+    """
+    Extract the application fields from an end-of-call-report and save them
+    Runs on the worker pool's deferred threads once the event's ordered stages are done -
+    the OpenAI request takes seconds, and would hold up the events of other calls
+    """
+    webhook_metrics.set_webhook_type(envelope.type)
+    try:
+        with webhook_metrics.timed('end_call'):
+            fill_application.handle_end_call(envelope)
+    except Exception as e:
+        logger.exception("error in fill_application.handle_end_call", extra=log_fields(
+            error=str(e), webhook=webhook_number, call_id=call_id, type=envelope.type
+        ))
+
 class VapiWebHookServer:
     """Simple webhook server to debug VAPI webhook events"""
     
-    def __init__(self, port=5001):
+    def __init__(self, port=5001, deduplicator=None, wal_dir=None):
         self.app = Flask(__name__)
         self.port = 5001  # Always use port 5001
-        self.webhook_count = 0
+        self.webhook_counter = AtomicCounter()
+        self.start_time = time.time()
+        self.warm_up_thread = None
+        
+        # Webhook events are processed off the request thread, ordered per call
+        self.worker_pool = WebhookWorkerPool(self.process_event)
+        
+        # Redelivered webhooks (VAPI retries on timeout) are acknowledged without reprocessing
+        # (serve.py passes one shared by all worker processes)
+        self.deduplicator = deduplicator if deduplicator is not None else WebhookDeduplicator()
+        
+        # Accepted webhooks are logged to disk before the ack and replayed after a crash
+        # (set VAPI_WAL_DIR to an empty string to disable)
+        wal_dir = os.getenv('VAPI_WAL_DIR', 'webhook_wal') if wal_dir is None else wal_dir
+        self.wal = WebhookWAL(wal_dir) if wal_dir else None
+        self.pending_replay = self.wal.recover() if self.wal else []
+        
+        # Queue depths and cache sizes are read when /metrics is scraped
+        webhook_metrics.registry.add_gauge_callback(self.metric_gauges)
         
         # Add CORS support for frontend calls
         @self.app.after_request
@@ -246,6 +356,7 @@ class VapiWebHookServer:
         """Setup webhook routes"""
         
         @self.app.route('/vapi/webhook', methods=['GET', 'POST'])
+        @tracing.traced('handle_webhook')
         def handle_webhook():
             try:
                 # Handle GET requests (VAPI health check or misconfiguration)
@@ -260,267 +371,95 @@ class VapiWebHookServer:
                         'expected_method': 'POST'
                     }), 200
                 
-                self.webhook_count += 1
-                current_time = datetime.now().strftime('%H:%M:%S.%f')[:-3]
+                webhook_number = self.webhook_counter.increment()
+                self.last_webhook_time = datetime.now().isoformat()
+                timer = StageTimer()
                 
                 # Get raw body for signature verification
                 raw_body = request.get_data()
                 
-                # DEBUG: Print webhook headers and basic info
-                print(f"\n🔥 WEBHOOK #{self.webhook_count} RECEIVED [{current_time}]")
-                print(f"📦 Body size: {len(raw_body)} bytes")
-                print(f"\n📋 HEADERS:")
-                for header, value in request.headers.items():
-                    print(f"   {header}: {value}")
-                
                 # Verify signature if webhook secret is configured
                 signature = request.headers.get('x-vapi-signature', '')
                 if signature:
-                    if not self.verify_signature(raw_body, signature):
-                        print(f"\n🔐 ❌ Signature verification failed!")
+                    with timer.stage('signature'):
+                        verified = self.verify_signature(raw_body, signature)
+                    if not verified:
+                        webhook_metrics.count_error('signature')
+                        tracing.record_error('invalid signature')
+                        logger.warning("signature verification failed", extra=log_fields(webhook=webhook_number))
                         return jsonify({'error': 'Invalid signature'}), 401
-                    else:
-                        print(f"\n🔐 ✅ Signature verified successfully")
-                else:
-                    print(f"\n🔐 ⚠️  No signature present (VAPI_WEBHOOK_SECRET not configured)")
                 
-                # Parse webhook data
-                webhook_data = request.get_json()
-                if not webhook_data:
+                # Parse webhook data - one decode of the raw bytes already read for the signature check
+                try:
+                    with timer.stage('parse'):
+                        envelope = WebhookEnvelope.from_bytes(raw_body)
+                except ValueError:
+                    webhook_metrics.count_error('parse')
+                    tracing.record_error('invalid JSON body')
                     return jsonify({'error': 'No JSON data'}), 400
                 
-                print(f"\n📋 WEBHOOK DATA STRUCTURE:")
-                print(f"   Type: {type(webhook_data)}")
-                print(f"   Top-level keys: {list(webhook_data.keys())}")
-                print(f"   Data preview: {str(webhook_data)[:200]}...")
-                
-                # Check if this is a call end event - VAPI sends "end-of-call-report" in message.type
-                message_data = webhook_data.get('message', {})
-                webhook_type = message_data.get('type', '')
-                print(f"   Message Type: {webhook_type}")
-                
-                # Print the entire webhook body from VAPI
-                print(f"\n📋 COMPLETE WEBHOOK BODY FROM VAPI:")
-                print("=" * 80)
-                print(json.dumps(webhook_data, indent=2))
-                print("=" * 80)
-                
-                # ✅ INTEGRATE CALL LOGGING - Handle all webhook types (call-start, transcript, end-of-call-report)
-                print(f"\n🗃️ INTEGRATING CALL LOGGING - Processing {webhook_type}")
+                # Headers and cookies are only available on the request thread
+                call_id, call_id_source = envelope.resolve_call_id(request.headers, request.cookies)
+                tracing.set_attribute('call_id', call_id)
+                tracing.set_attribute('type', envelope.type)
+                
+                # A redelivery has the same body as the original - acknowledge it without side effects
+                dedupe_key = webhook_key(call_id, envelope.type, raw_body)
+                if not self.deduplicator.check_and_add(dedupe_key):
+                    webhook_metrics.registry.increment('vapi_webhook_duplicates_total', type=envelope.type)
+                    tracing.set_attribute('duplicate', True)
+                    logger.info("duplicate webhook acknowledged", extra=log_fields(
+                        webhook=webhook_number,
+                        call_id=call_id,
+                        type=envelope.type
+                    ))
+                    return jsonify({'status': 'duplicate', 'webhook_number': webhook_number}), 200
+                
+                wal_seq = None
                 try:
-                    logging_result = handle_vapi_webhook(webhook_data)
-                    if logging_result.get('success'):
-                        print(f"✅ Call logging completed successfully: {logging_result.get('message')}")
-                    else:
-                        print(f"⚠️ Call logging issue: {logging_result.get('error')}")
-                except Exception as e:
-                    print(f"❌ Error in call logging: {e}")
-                    import traceback
-                    traceback.print_exc()
-                
-                if webhook_type == 'end-of-call-report':
-                    print(f"\n🎯 CALL END DETECTED - Calling fill_application.handle_end_call() function")
-                    try:
-                        # Call the handle_end_call function from fill_application with the end call body
-                        fill_application.handle_end_call(webhook_data)
-                        print(f"✅ fill_application.handle_end_call() completed successfully")
-                    except Exception as e:
-                        print(f"❌ Error calling fill_application.handle_end_call(): {e}")
-                        import traceback
-                        traceback.print_exc()
-                
-
-                
-                # Extract call ID from the correct location in VAPI webhook structure
-                print(f"\n🔍 CALL ID EXTRACTION DEBUG:")
-                print(f"   Root webhook keys: {list(webhook_data.keys())}")
-                
-                # First try to get call ID from message.call.id (the correct location)
-                call_id = message_data.get('call', {}).get('id', 'unknown')
-                call_id_source = "message.call.id"
-                
-                if call_id != 'unknown':
-                    print(f"   Call ID found in message.call.id: {call_id}")
-                else:
-                    print(f"   No call ID found in message.call.id")
-                    # Fallback to root level
-                    if 'call' in webhook_data:
-                        call_data = webhook_data['call']
-                        print(f"   Call object keys: {list(call_data.keys())}")
-                        if 'id' in call_data:
-                            call_id = call_data['id']
-                            call_id_source = "root 'call.id'"
-                            print(f"   Call ID found in root: {call_id}")
-                        else:
-                            print(f"   No 'id' field in call object")
-                    else:
-                        print(f"   No 'call' field in root webhook")
-                
-                # If not found in root, check in message.artifact.call.id as fallback
-                if not call_id or call_id == 'unknown':
-                    print(f"   Checking message.artifact.call.id fallback...")
-                    if 'message' in webhook_data and 'artifact' in webhook_data['message']:
-                        artifact = webhook_data['message']['artifact']
-                        print(f"   Artifact keys: {list(artifact.keys())}")
-                        if 'call' in artifact:
-                            call_id = artifact['call'].get('id', 'unknown')
-                            call_id_source = "message.artifact.call.id"
-                            print(f"   Call ID found in artifact: {call_id}")
-                        else:
-                            print(f"   No 'call' field in artifact")
-                    else:
-                        print(f"   No 'message' or 'artifact' fields found")
-                
-                print(f"🔍 FINAL EXTRACTED CALL ID: {call_id} (from {call_id_source})")
-                
-                # Additional call ID search in other possible locations
-                if not call_id or call_id == 'unknown':
-                    print(f"   🔍 SEARCHING FOR CALL ID IN OTHER LOCATIONS...")
+                    # Make the webhook durable before acknowledging it
+                    if self.wal:
+                        with timer.stage('wal_append'):
+                            wal_seq = self.wal.append(raw_body)
                     
-                    # Check for call ID in headers
-                    call_id_header = request.headers.get('X-Call-Id', '')
-                    if call_id_header:
-                        print(f"   Found call ID in X-Call-Id header: {call_id_header}")
-                        call_id = call_id_header
-                        call_id_source = "X-Call-Id header"
-                    
-                    # Check for call ID in cookie
-                    cookie_call_id = request.cookies.get('callId', '')
-                    if cookie_call_id:
-                        print(f"   Found call ID in cookie: {cookie_call_id}")
-                        if not call_id or call_id == 'unknown':
-                            call_id = cookie_call_id
-                            call_id_source = "cookie"
-                    
-                    # Check for call ID in message object
-                    if 'message' in webhook_data:
-                        message_obj = webhook_data['message']
-                        print(f"   Message object keys: {list(message_obj.keys())}")
-                        
-                        # Check if call ID is directly in message
-                        if 'callId' in message_obj:
-                            print(f"   Found call ID in message.callId: {message_obj['callId']}")
-                            if not call_id or call_id == 'unknown':
-                                call_id = message_obj['callId']
-                                call_id_source = "message.callId"
-                
-                print(f"🔍 ULTIMATE CALL ID: {call_id} (from {call_id_source})")
-                
-                # ✅ UPDATE CALL STATUS TRACKING
-                if call_id and call_id != 'unknown':
-                    if webhook_type == 'end-of-call-report':
-                        # Mark call as completed
-                        call_status_cache[call_id] = {
-                            "status": "completed",
-                            "ended_at": datetime.now().isoformat()
-                        }
-                        print(f"📋 CALL STATUS: {call_id} marked as COMPLETED")
-                    elif call_id not in call_status_cache:
-                        # Mark call as active (for first time we see it)
-                        call_status_cache[call_id] = {
-                            "status": "active", 
-                            "started_at": datetime.now().isoformat()
-                        }
-                        print(f"📋 CALL STATUS: {call_id} marked as ACTIVE")
-                
-                # Process transcript messages if available
-                print(f"\n🔍 PARSING WEBHOOK DATA...")
-                print(f"   Call ID: {call_id}")
-                print(f"   Has 'message': {'message' in webhook_data}")
-                print(f"   Has 'artifact': {'artifact' in webhook_data.get('message', {})}")
-                
-                if 'message' in webhook_data and 'artifact' in webhook_data['message']:
-                    artifact = webhook_data['message']['artifact']
-                    print(f"   Has 'messages' in artifact: {'messages' in artifact}")
-                    
-                    if 'messages' in artifact:
-                        messages = artifact['messages']
-                        print(f"   Total messages in artifact: {len(messages)}")
-                        
-                        # Filter out system messages and show only conversation
-                        conversation_messages = []
-                        for msg in messages:
-                            role = msg.get('role', 'unknown')
-                            print(f"      Message role: {role}")
-                            if role in ['bot', 'user', 'assistant', 'customer']:
-                                conversation_messages.append(msg)
-                        
-                        print(f"   Conversation messages found: {len(conversation_messages)}")
-                        
-                        # Add to transcript cache if we have valid messages and call ID
-                        if conversation_messages and call_id and call_id != 'unknown':
-                            print(f"\n🔧 DEBUGGING CACHE OPERATION:")
-                            print(f"   Call ID: {call_id}")
-                            print(f"   Conversation messages: {len(conversation_messages)}")
-                            
-                            # Show what we're about to add
-                            for i, msg in enumerate(conversation_messages):
-                                role = msg.get('role', 'unknown')
-                                message = msg.get('message', msg.get('content', ''))
-                                print(f"   Message {i+1}: role='{role}', message='{message[:50]}...'")
-                            
-                            # Get previous cache state
-                            previous_count = len(get_transcript_cache(call_id))
-                            print(f"   Previous cache size: {previous_count}")
-                            
-                            # Add new messages to cache
-                            print(f"   Calling add_to_transcript_cache...")
-                            add_to_transcript_cache(call_id, conversation_messages)
-                            
-                            # Get updated cache state
-                            current_count = len(get_transcript_cache(call_id))
-                            new_messages = current_count - previous_count
-                            print(f"   After cache update: {current_count} messages")
-                            print(f"   New messages added: {new_messages}")
-                            
-                            print(f"\n🆕 WEBHOOK #{self.webhook_count} PROCESSED - Call {call_id}")
-                            print(f"📊 Messages in webhook: {len(conversation_messages)}")
-                            print(f"📊 New messages added: {new_messages}")
-                            print(f"📊 Total in cache: {current_count}")
-                            print("=" * 80)
-                            
-                            # ALWAYS display the current cache after updating
-                            display_transcript_cache(call_id)
-                            
-                            # Display the complete cache structure
-                            display_complete_cache()
-                            
-                            # Print the exact raw cache data
-                            print_raw_cache_data()
-                        else:
-                            print(f"\n⚠️  Webhook #{self.webhook_count} - No valid conversation messages found")
-                            print(f"   Call ID: {call_id}")
-                            print(f"   Conversation messages: {len(conversation_messages) if 'conversation_messages' in locals() else 'Not defined'}")
-                            if call_id and call_id != 'unknown':
-                                print(f"📊 Current cache size: {len(get_transcript_cache(call_id))}")
-                else:
-                    print(f"\n⚠️  Webhook #{self.webhook_count} - No transcript data found")
-                    print(f"   Has 'message': {'message' in webhook_data}")
-                    print(f"   Has 'artifact': {'artifact' in webhook_data.get('message', {})}")
-                    if call_id and call_id != 'unknown':
-                        print(f"📊 Current cache size: {len(get_transcript_cache(call_id))}")
-                
-                # Show final cache status
-                print(f"\n📊 FINAL CACHE STATUS:")
-                if call_id and call_id != 'unknown':
-                    cache_size = len(get_transcript_cache(call_id))
-                    print(f"   Call {call_id}: {cache_size} messages cached")
-                else:
-                    print(f"   No valid call ID found")
-                
-                return jsonify({'status': 'success', 'webhook_number': self.webhook_count}), 200
+                    # Hand off to the worker pool and acknowledge immediately - the worker's spans join this trace
+                    accepted = self.worker_pool.submit(call_id, envelope, call_id, webhook_number, timer, wal_seq,
+                                                       trace_parent=tracing.current_context())
+                except Exception:
+                    # Not accepted (e.g. the WAL write failed), so VAPI's retry must not be acknowledged as a duplicate
+                    self.deduplicator.discard(dedupe_key)
+                    if wal_seq is not None:
+                        self.wal.ack(wal_seq)
+                    raise
+                
+                if not accepted:
+                    # Not processed, so the retry must not be treated as a duplicate or replayed
+                    self.deduplicator.discard(dedupe_key)
+                    if wal_seq is not None:
+                        self.wal.ack(wal_seq)
+                    webhook_metrics.registry.increment('vapi_webhook_rejected_total', type=envelope.type)
+                    tracing.record_error('worker queue full')
+                    logger.warning("worker queue full, webhook rejected", extra=log_fields(
+                        webhook=webhook_number,
+                        call_id=call_id,
+                        type=envelope.type
+                    ))
+                    return jsonify({'error': 'Webhook queue full'}), 503
+                
+                return jsonify({'status': 'success', 'webhook_number': webhook_number}), 200
                 
             except Exception as e:
-                print(f"\n❌ Webhook error: {e}")
-                import traceback
-                traceback.print_exc()
+                tracing.record_error(e)
+                logger.exception("webhook error", extra=log_fields(error=str(e)))
                 return jsonify({'error': str(e)}), 500
         
         @self.app.route('/health', methods=['GET'])
         def health_check():
             return jsonify({
                 'status': 'healthy', 
-                'webhooks_received': self.webhook_count,
+                # False while the database and OpenAI clients are still being created
+                'ready': self.warm_up_thread is None or not self.warm_up_thread.is_alive(),
+                'webhooks_received': self.webhook_counter.value,
                 'timestamp': datetime.now().isoformat()
             }), 200
         
@@ -545,44 +484,76 @@ class VapiWebHookServer:
         @self.app.route('/stats', methods=['GET'])
         def stats():
             return jsonify({
-                'webhooks_received': self.webhook_count,
+                'webhooks_received': self.webhook_counter.value,
                 'server_uptime': time.time() - self.start_time,
+                'process_id': os.getpid(),
                 'last_webhook': getattr(self, 'last_webhook_time', 'Never'),
+                'worker_pool': self.worker_pool.stats(),
+                **call_state.stats(),
+                'deduplication': self.deduplicator.stats(),
+                'wal': self.wal.stats() if self.wal else None,
                 'status': 'running'
             }), 200
         
+        @self.app.route('/metrics', methods=['GET'])
+        def metrics():
+            """Prometheus metrics: per-stage latency histograms, error counters, queue depths and cache sizes"""
+            return Response(webhook_metrics.render(), content_type=webhook_metrics.CONTENT_TYPE)
+        
         @self.app.route('/transcript/<call_id>', methods=['GET'])
         def get_transcript(call_id):
-            """Get cached transcript for a specific call ID"""
-            messages = get_transcript_cache(call_id)
-            if not messages:
-                return jsonify({'error': f'No transcript found for call {call_id}'}), 404
+            """
+            Get cached transcript for a specific call ID
+            ?since=<version> returns only messages added or updated after that version,
+            and If-None-Match with the current ETag returns 304
+            """
+            transcript = call_state.transcript(call_id)
+            if transcript is None or not transcript['messages']:
+                # Evicted (or never cached here) - fall back to the persisted call log
+                messages = get_persisted_transcript(call_id)
+                if not messages:
+                    return jsonify({'error': f'No transcript found for call {call_id}'}), 404
+                return jsonify({
+                    'call_id': call_id,
+                    'message_count': len(messages),
+                    'transcript': messages,
+                    'source': 'call_logs'
+                }), 200
             
-            return jsonify({
-                'call_id': call_id,
-                'message_count': len(messages),
-                'transcript': messages
-            }), 200
+            version = transcript['version']
+            etag = f'{call_id}-{version}'
+            if etag in request.if_none_match:
+                return Response(status=304, headers={'ETag': f'"{etag}"'})
+            
+            since = request.args.get('since', type=int)
+            delta = call_state.transcript_changes(call_id, since) if since is not None and since <= version else None
+            if delta is not None:
+                body = {
+                    'call_id': call_id,
+                    'version': delta['version'],
+                    'message_count': delta['message_count'],
+                    'changes': delta['changes'],
+                    'source': 'cache'
+                }
+                etag = f"{call_id}-{delta['version']}"
+            else:
+                # No version, or a version from an older cache entry for this call - send everything
+                body = {
+                    'call_id': call_id,
+                    'version': version,
+                    'message_count': len(transcript['messages']),
+                    'transcript': transcript['messages'],
+                    'source': 'cache'
+                }
+            
+            response = jsonify(body)
+            response.set_etag(etag)
+            return response, 200
         
         @self.app.route('/transcripts', methods=['GET'])
         def list_transcripts():
             """List all cached transcripts - ONLY ACTIVE CALLS"""
-            if not transcript_cache:
-                return jsonify({'message': 'No transcripts cached', 'calls': []}), 200
-            
-            active_calls = []
-            for call_id, messages in transcript_cache.items():
-                # Check if call is still active (not completed)
-                call_status = call_status_cache.get(call_id, {}).get('status', 'active')
-                
-                # Only include active calls in live transcript view
-                if call_status == 'active':
-                    active_calls.append({
-                        'call_id': call_id,
-                        'message_count': len(messages),
-                        'last_message_time': max([msg.get('secondsFromStart', 0) for msg in messages]) if messages else 0,
-                        'status': call_status
-                    })
+            active_calls = get_active_calls()
             
             if not active_calls:
                 return jsonify({'message': 'No active calls', 'calls': []}), 200
@@ -592,29 +563,23 @@ class VapiWebHookServer:
                 'calls': active_calls
             }), 200
         
+        @self.app.route('/transcript/<call_id>/stream', methods=['GET'])
+        def stream_transcript(call_id):
+            """Server-Sent Events stream of appended/updated messages for one call"""
+            return self.sse_response(call_id)
+        
+        @self.app.route('/transcripts/stream', methods=['GET'])
+        def stream_all_transcripts():
+            """Server-Sent Events stream of transcript and status changes for all active calls"""
+            return self.sse_response(None)
+        
         @self.app.route('/completed-calls', methods=['GET'])
         def list_completed_calls():
-            """List all completed calls from transcript cache"""
-            if not transcript_cache:
-                return jsonify({'message': 'No completed calls cached', 'calls': []}), 200
-            
-            completed_calls = []
-            for call_id, messages in transcript_cache.items():
-                # Check if call is completed
-                call_info = call_status_cache.get(call_id, {})
-                call_status = call_info.get('status', 'active')
-                
-                # Only include completed calls
-                if call_status == 'completed':
-                    completed_calls.append({
-                        'call_id': call_id,
-                        'message_count': len(messages),
-                        'ended_at': call_info.get('ended_at'),
-                        'status': call_status
-                    })
+            """List completed calls, most recently ended first (?limit=N to cap the list)"""
+            completed_calls = call_state.completed_calls(limit=request.args.get('limit', type=int))
             
-            # Sort by ended_at (most recent first)
-            completed_calls.sort(key=lambda x: x.get('ended_at', ''), reverse=True)
+            if not completed_calls:
+                return jsonify({'message': 'No completed calls cached', 'calls': []}), 200
             
             return jsonify({
                 'total_calls': len(completed_calls),
@@ -624,8 +589,7 @@ class VapiWebHookServer:
         @self.app.route('/transcript/<call_id>/clear', methods=['DELETE'])
         def clear_transcript(call_id):
             """Clear transcript cache for a specific call ID"""
-            if call_id in transcript_cache:
-                clear_transcript_cache(call_id)
+            if clear_transcript_cache(call_id):
                 return jsonify({'message': f'Transcript cache cleared for call {call_id}'}), 200
             else:
                 return jsonify({'error': f'No transcript found for call {call_id}'}), 404
@@ -665,6 +629,10 @@ class VapiWebHookServer:
                 print(f"Phone: {phone}")
                 print(f"Email: {email}")
                 
+                # The application was just created or edited by the web form, outside this process -
+                # a cached lookup for its number may point at an older application
+                services.db_manager().phone_applications.invalidate_phone(phone)
+                
                 # Default values for voice call
                 mortgage_agent_name = "Sarah Johnson"  # Could be made dynamic later
                 brokerage_name = "Premier Mortgage Group"
@@ -708,26 +676,96 @@ class VapiWebHookServer:
                     'message': f'Internal server error: {str(e)}'
                 }), 500
     
-    def verify_signature(self, payload: bytes, signature: str) -> bool:
-        """Verify VAPI webhook signature"""
-        webhook_secret = os.getenv('VAPI_WEBHOOK_SECRET')
-        if not webhook_secret:
-            return False
-        
+    def process_event(self, envelope: WebhookEnvelope, call_id: str, webhook_number: int,
+                      timer: StageTimer = None, wal_seq: int = None, trace_parent: tracing.SpanContext = None):
+        """
+        Worker pool handler - processes the event, then marks it done in the write-ahead log
+        An end-of-call-report is marked done by finish_end_of_call, after its deferred extraction
+        """
+        deferred = False
         try:
-            expected_signature = hmac.new(
-                webhook_secret.encode(),
-                payload,
-                hashlib.sha256
-            ).hexdigest()
-            
-            # Remove 'sha256=' prefix if present
-            signature = signature.replace('sha256=', '')
+            with tracing.span('process_webhook_event', parent=trace_parent, call_id=call_id, type=envelope.type):
+                process_webhook_event(envelope, call_id, webhook_number, timer)
+                if envelope.type == 'end-of-call-report':
+                    self.worker_pool.defer(self.finish_end_of_call, envelope, call_id, webhook_number, wal_seq,
+                                           tracing.current_context())
+                    deferred = True
+        finally:
+            if wal_seq is not None and not deferred:
+                self.wal.ack(wal_seq)
+    
+    def finish_end_of_call(self, envelope: WebhookEnvelope, call_id: str, webhook_number: int,
+                           wal_seq: int = None, trace_parent: tracing.SpanContext = None):
+        """Deferred part of an end-of-call-report (see process_end_of_call)"""
+        try:
+            with tracing.span('process_end_of_call', parent=trace_parent, call_id=call_id):
+                process_end_of_call(envelope, call_id, webhook_number)
+        finally:
+            if wal_seq is not None:
+                self.wal.ack(wal_seq)
+    
+    def replay_pending_webhooks(self):
+        """Re-queue webhooks that were acknowledged to VAPI but not processed before the last shutdown"""
+        pending, self.pending_replay = self.pending_replay, []
+        if not pending:
+            return
+        
+        print(f"♻️  Replaying {len(pending)} unprocessed webhook(s) from the write-ahead log")
+        for wal_seq, raw_body in pending:
+            try:
+                envelope = WebhookEnvelope.from_bytes(raw_body)
+            except ValueError:
+                self.wal.ack(wal_seq)
+                continue
             
-            return hmac.compare_digest(signature, expected_signature)
-        except Exception as e:
-            print(f"Signature verification error: {e}")
-            return False
+            call_id, _ = envelope.resolve_call_id()
+            webhook_number = self.webhook_counter.increment()
+            # Replays must not be dropped, so wait for queue space instead of rejecting
+            while not self.worker_pool.submit(call_id, envelope, call_id, webhook_number, None, wal_seq):
+                time.sleep(0.05)
+    
+    def metric_gauges(self) -> list:
+        """(name, labels, value) for the /metrics gauges"""
+        gauges = [
+            ('vapi_webhook_queue_depth', {'process': webhook_metrics.process_label, 'worker': index}, depth)
+            for index, depth in enumerate(self.worker_pool.queue_depths())
+        ]
+        state = call_state.stats()
+        gauges.append(('vapi_cache_entries', {'cache': 'transcripts'}, state['transcript_cache']['size']))
+        gauges.append(('vapi_cache_entries', {'cache': 'call_registry'}, state['call_registry']['size']))
+        gauges.append(('vapi_cache_entries', {'cache': 'dedupe'}, self.deduplicator.stats()['size']))
+        if services.container.created('call_logger'):
+            gauges.append(('vapi_cache_entries', {'cache': 'call_logs', 'process': webhook_metrics.process_label}, services.call_logger().calls.stats()['size']))
+            gauges.append(('vapi_call_log_pending_writes', {'process': webhook_metrics.process_label}, services.call_logger().writes.stats()['pending']))
+        if services.container.created('db'):
+            gauges.append(('vapi_cache_entries', {'cache': 'phone_applications', 'process': webhook_metrics.process_label}, services.db_manager().phone_applications.stats()['size']))
+        return gauges
+
+    def flush_call_log_writes(self):
+        """Write the status updates still buffered for live calls (shutdown, after the workers stopped)"""
+        if services.container.created('call_logger'):
+            services.call_logger().writes.stop()
+    
+    def sse_response(self, call_id):
+        """Build a streaming SSE response, resuming from Last-Event-ID if the client sent one"""
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+        
+        return Response(
+            stream_with_context(stream_transcript_events(call_id, last_event_id)),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+    
+    def verify_signature(self, payload: bytes, signature: str) -> bool:
+        """Verify VAPI webhook signature"""
+        return verify_signature(payload, signature)
     
     def run(self):
         """Run the webhook server"""
@@ -745,15 +783,26 @@ class VapiWebHookServer:
         print(f"   Local: http://localhost:{self.port}/vapi/webhook")
         print("   External: http://your-ngrok-url.ngrok.io/vapi/webhook")
         print("=" * 80)
+        print(f"👷 Webhook workers: {self.worker_pool.num_workers} (queue depth {self.worker_pool.max_queue_depth})")
         print("🔄 Waiting for webhook events...")
         print("Press Ctrl+C to stop\n")
         
+        self.worker_pool.start()
+        self.replay_pending_webhooks()
+        self.warm_up_thread = services.warm_up()
         try:
-            self.app.run(host='0.0.0.0', port=self.port, debug=False, use_reloader=False)
+            # Handlers and the call state are thread-safe, so requests are served concurrently
+            self.app.run(host='0.0.0.0', port=self.port, debug=False, use_reloader=False, threaded=True)
         except KeyboardInterrupt:
-            print(f"\n👋 Server stopped. Total webhooks received: {self.webhook_count}")
+            print(f"\n👋 Server stopped. Total webhooks received: {self.webhook_counter.value}")
         except Exception as e:
             print(f"\n❌ Server error: {e}")
+        finally:
+            self.worker_pool.stop()
+            self.flush_call_log_writes()
+            self.deduplicator.close()
+            if self.wal:
+                self.wal.close()
 
 def main():
     """Main function to run the webhook server"""
@@ -783,6 +832,8 @@ def main():
         
         if choice == "2":
             print("\n🎬 Making test call first...")
+            # Only the interactive test mode needs the test helpers
+            import test_calls
             call_id = test_calls.test_make_call()
             if call_id:
                 print(f"\n⏳ Waiting 5 seconds for call to start...")
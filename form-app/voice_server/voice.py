@@ -1,44 +1,32 @@
-import db
 import requests
 import os
 import json
 from typing import Optional
 from dotenv import load_dotenv
+from tracing import record_error, set_attribute, traced
 
 # Load environment variables
 load_dotenv()
 
 
-def make_call(application_id: str, mortgage_agent_name: str, first_name: str, 
-                last_name: str, email: str, phone_number: str, interest: str, brokerage_name: str) -> Optional[str]:
-    
-    # Get API key from environment
-    api_key = os.getenv('VAPI_API_PRIVATE_KEY')
-    if not api_key:
-        print("❌ VAPI_API_PRIVATE_KEY environment variable is required")
-        print("💡 Set this in your .env file")
-        return None
-    
-    # Vapi configuration - these should ideally come from environment variables or database
-    # For now, using the values from the template code
-    assistant_id = "14f907e7-b3b2-43aa-aa33-9f8c14212bd3"
-    phone_number_id = "8c320a63-2ae0-4a5f-bbf4-9d33cede10e6"
-    
+# Vapi configuration - these should ideally come from environment variables or database
+# For now, using the values from the template code
+VAPI_CALL_URL = "https://api.vapi.ai/call/phone"
+ASSISTANT_ID = "14f907e7-b3b2-43aa-aa33-9f8c14212bd3"
+PHONE_NUMBER_ID = "8c320a63-2ae0-4a5f-bbf4-9d33cede10e6"
+
+
+def build_call_payload(application_id: str, mortgage_agent_name: str, first_name: str, last_name: str,
+                       email: str, phone_number: str, interest: str, brokerage_name: str,
+                       earliest_at: Optional[str] = None) -> dict:
+    """/call/phone request body - scheduled with a schedulePlan when earliest_at is given"""
     # Ensure phone number is in E.164 format
     if not phone_number.startswith('+'):
         phone_number = '+' + phone_number
     
-    # Make the call using Vapi API
-    url = "https://api.vapi.ai/call/phone"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    # Prepare the call payload for the /call/phone endpoint
     payload = {
-        "assistantId": assistant_id,
-        "phoneNumberId": phone_number_id,
+        "assistantId": ASSISTANT_ID,
+        "phoneNumberId": PHONE_NUMBER_ID,
         "customer": {
             "number": phone_number
         },
@@ -55,6 +43,32 @@ def make_call(application_id: str, mortgage_agent_name: str, first_name: str,
             }
         }
     }
+    if earliest_at:
+        payload["schedulePlan"] = {"earliestAt": earliest_at}
+    return payload
+
+
+@traced()
+def make_call(application_id: str, mortgage_agent_name: str, first_name: str, 
+                last_name: str, email: str, phone_number: str, interest: str, brokerage_name: str) -> Optional[str]:
+    
+    # Get API key from environment
+    api_key = os.getenv('VAPI_API_PRIVATE_KEY')
+    if not api_key:
+        print("❌ VAPI_API_PRIVATE_KEY environment variable is required")
+        print("💡 Set this in your .env file")
+        return None
+    
+    # Make the call using Vapi API
+    url = VAPI_CALL_URL
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    
+    # Prepare the call payload for the /call/phone endpoint
+    payload = build_call_payload(application_id, mortgage_agent_name, first_name, last_name,
+                                 email, phone_number, interest, brokerage_name)
     
     try:
         print("📡 Sending call request to Vapi...")
@@ -63,6 +77,7 @@ def make_call(application_id: str, mortgage_agent_name: str, first_name: str,
         
         call_data = response.json()
         call_id = call_data.get('id')
+        set_attribute('call_id', call_id)
         
         if call_id:
             print(f"✅ Call initiated successfully!")
@@ -77,6 +92,7 @@ def make_call(application_id: str, mortgage_agent_name: str, first_name: str,
             return None
             
     except requests.exceptions.RequestException as e:
+        record_error(e)
         print(f"❌ Call request failed: {e}")
         if hasattr(e, 'response') and e.response:
             print(f"Response Status: {e.response.status_code}")
@@ -89,10 +105,12 @@ def make_call(application_id: str, mortgage_agent_name: str, first_name: str,
                 pass
         return None
     except Exception as e:
+        record_error(e)
         print(f"❌ Unexpected error: {e}")
         return None
 
 
+@traced()
 def schedule_call(application_id: str, earliest_at: str, mortgage_agent_name: str, first_name: str, 
                 last_name: str, email: str, phone_number: str, interest: str, brokerage_name: str) -> Optional[str]:
     
@@ -103,45 +121,16 @@ def schedule_call(application_id: str, earliest_at: str, mortgage_agent_name: st
         print("💡 Set this in your .env file")
         return None
     
-    # Vapi configuration - these should ideally come from environment variables or database
-    # For now, using the values from the template code
-    assistant_id = "14f907e7-b3b2-43aa-aa33-9f8c14212bd3"
-    phone_number_id = "8c320a63-2ae0-4a5f-bbf4-9d33cede10e6"
-    
-    # Ensure phone number is in E.164 format
-    if not phone_number.startswith('+'):
-        phone_number = '+' + phone_number
-    
     # Make the call using Vapi API
-    url = "https://api.vapi.ai/call/phone"
+    url = VAPI_CALL_URL
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json"
     }
     
     # Prepare the call payload for scheduling with schedulePlan
-    payload = {
-        "assistantId": assistant_id,
-        "phoneNumberId": phone_number_id,
-        "customer": {
-            "number": phone_number
-        },
-        "schedulePlan": {
-            "earliestAt": earliest_at
-        },
-        "assistantOverrides": {
-            "variableValues": {
-                "application_id": application_id,
-                "mortgage_agent_name": mortgage_agent_name,
-                "brokerage_name": brokerage_name,
-                "first_name": first_name,
-                "last_name": last_name,
-                "email": email,
-                "phone_number": phone_number,
-                "interest": interest
-            }
-        }
-    }
+    payload = build_call_payload(application_id, mortgage_agent_name, first_name, last_name,
+                                 email, phone_number, interest, brokerage_name, earliest_at=earliest_at)
     
     try:
         print("📡 Scheduling call request to Vapi...")
@@ -150,6 +139,7 @@ def schedule_call(application_id: str, earliest_at: str, mortgage_agent_name: st
         
         call_data = response.json()
         call_id = call_data.get('id')
+        set_attribute('call_id', call_id)
         
         if call_id:
             print(f"✅ Call scheduled successfully!")
@@ -165,6 +155,7 @@ def schedule_call(application_id: str, earliest_at: str, mortgage_agent_name: st
             return None
             
     except requests.exceptions.RequestException as e:
+        record_error(e)
         print(f"❌ Call scheduling failed: {e}")
         if hasattr(e, 'response') and e.response:
             print(f"Response Status: {e.response.status_code}")
@@ -177,5 +168,6 @@ def schedule_call(application_id: str, earliest_at: str, mortgage_agent_name: st
                 pass
         return None
     except Exception as e:
+        record_error(e)
         print(f"❌ Unexpected error: {e}")
         return None
\ No newline at end of file
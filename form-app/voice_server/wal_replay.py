@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Offline replay of the webhook write-ahead log
+
+Re-drives handle_vapi_webhook with every webhook body recorded in the log,
+in the original order, as fast as the backend accepts them. Point
+SUPABASE_URL / SUPABASE_PUBLIC_KEY at a test project first - replaying
+against production rewrites real call logs.
+
+    python wal_replay.py --wal-dir webhook_wal
+    python wal_replay.py --unacked-only --end-call
+    python wal_replay.py --dry-run
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from webhook_envelope import WebhookEnvelope
+from webhook_wal import read_log
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded VAPI webhooks from the write-ahead log")
+    parser.add_argument('--wal-dir', default=os.getenv('VAPI_WAL_DIR', 'webhook_wal'), help="Write-ahead log directory")
+    parser.add_argument('--unacked-only', action='store_true', help="Only replay webhooks that were never fully processed")
+    parser.add_argument('--limit', type=int, help="Stop after this many webhooks")
+    parser.add_argument('--end-call', action='store_true', help="Also run the end-of-call extraction for end-of-call-reports")
+    parser.add_argument('--dry-run', action='store_true', help="Only list the webhooks that would be replayed")
+    args = parser.parse_args()
+
+    records = read_log(args.wal_dir, unacked_only=args.unacked_only)
+    if args.limit is not None:
+        records = records[:args.limit]
+
+    if not records:
+        print(f"📭 No webhooks to replay in {args.wal_dir}")
+        return
+
+    print(f"♻️  Replaying {len(records)} webhook(s) from {args.wal_dir}")
+
+    if args.dry_run:
+        for seq, raw_body in records:
+            envelope = WebhookEnvelope.from_bytes(raw_body)
+            call_id, _ = envelope.resolve_call_id()
+            print(f"   #{seq}: {envelope.type} call={call_id} ({len(raw_body)} bytes)")
+        return
+
+    # Imported here so --dry-run works without database credentials
+    from call_logger import handle_vapi_webhook
+    import fill_application
+
+    errors = 0
+    start = time.perf_counter()
+    for seq, raw_body in records:
+        try:
+            envelope = WebhookEnvelope.from_bytes(raw_body)
+            result = handle_vapi_webhook(envelope)
+            if not result.get('success'):
+                errors += 1
+            if args.end_call and envelope.type == 'end-of-call-report':
+                fill_application.handle_end_call(envelope)
+        except Exception as e:
+            errors += 1
+            print(f"❌ Webhook #{seq} failed: {e}")
+
+    elapsed = time.perf_counter() - start
+    print("=" * 60)
+    print(f"✅ Replayed {len(records)} webhook(s) in {elapsed:.2f}s ({len(records) / elapsed:.1f}/s)")
+    print(f"❌ Errors: {errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Webhook Deduplication for VAPI Integration
+Detects redelivered webhooks so retries are acknowledged without re-running side effects
+"""
+
+from typing import Any, Dict, Optional
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from bounded_cache import BoundedCache
+
+
+def webhook_key(call_id: str, webhook_type: str, raw_body: bytes) -> str:
+    """Idempotency key for a webhook: (call ID, message type, SHA-256 of the raw body)"""
+    return f"{call_id}:{webhook_type}:{hashlib.sha256(raw_body).hexdigest()}"
+
+
+class WebhookDeduplicator:
+    """
+    Bounded, persistent set of webhook keys that have already been accepted.
+
+    VAPI retries a webhook when it does not get a response in time. The retry
+    has the same body, so its key matches the original delivery.
+
+    Lookups are served from an in-memory BoundedCache, which evicts by LRU
+    size and by idle TTL. Every accepted key is also written to a small SQLite
+    table, and that table is loaded back on startup. This way a redelivery
+    that arrives across a server restart is still recognized. Pass db_path=''
+    to keep the set in memory only.
+    """
+
+    # Prune the SQLite table once every this many inserts
+    PRUNE_INTERVAL = 1000
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None):
+        self.db_path = os.getenv('WEBHOOK_DEDUPE_DB', 'webhook_seen.db') if db_path is None else db_path
+        self.max_entries = max_entries or int(os.getenv('WEBHOOK_DEDUPE_MAX_ENTRIES', '50000'))
+        self.ttl_seconds = ttl_seconds or float(os.getenv('WEBHOOK_DEDUPE_TTL_SECONDS', '86400'))
+        self._seen = BoundedCache(max_entries=self.max_entries, ttl_seconds=self.ttl_seconds)
+        self._lock = threading.Lock()
+        self._db = None
+        self._inserts = 0
+        self.checked_count = 0
+        self.duplicate_count = 0
+
+        if self.db_path:
+            self._open()
+
+    def check_and_add(self, key: str) -> bool:
+        """Record key as seen. Returns True if it is new, False if it is a duplicate"""
+        with self._lock:
+            self.checked_count += 1
+            if key in self._seen:
+                self.duplicate_count += 1
+                return False
+
+            now = time.time()
+            self._seen[key] = now
+            if self._db is not None:
+                try:
+                    self._db.execute("INSERT OR REPLACE INTO seen_webhooks (key, seen_at) VALUES (?, ?)", (key, now))
+                    self._db.commit()
+                    self._inserts += 1
+                    if self._inserts % self.PRUNE_INTERVAL == 0:
+                        self._prune(now)
+                except sqlite3.Error as e:
+                    print(f"⚠️  Could not persist webhook key: {e}")
+            return True
+
+    def discard(self, key: str):
+        """Forget a key, e.g. when the webhook was rejected and VAPI should retry it"""
+        with self._lock:
+            self._seen.pop(key)
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM seen_webhooks WHERE key = ?", (key,))
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"⚠️  Could not remove webhook key: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'checked': self.checked_count,
+                'duplicates': self.duplicate_count,
+                'duplicate_rate': (self.duplicate_count / self.checked_count) if self.checked_count else 0,
+                'size': len(self._seen),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'persistent': self._db is not None
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _open(self):
+        try:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS seen_webhooks (key TEXT PRIMARY KEY, seen_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_seen_webhooks_seen_at ON seen_webhooks (seen_at)")
+            self._prune(time.time())
+
+            # Reload the most recent keys, oldest first so LRU order matches arrival order
+            rows = self._db.execute(
+                "SELECT key, seen_at FROM (SELECT key, seen_at FROM seen_webhooks ORDER BY seen_at DESC LIMIT ?) "
+                "ORDER BY seen_at",
+                (self.max_entries,)
+            ).fetchall()
+            for key, seen_at in rows:
+                self._seen[key] = seen_at
+        except sqlite3.Error as e:
+            print(f"⚠️  Webhook dedupe store unavailable ({e}), keeping seen webhooks in memory only")
+            self._db = None
+
+    def _prune(self, now: float):
+        """Drop keys older than the TTL and anything beyond max_entries"""
+        self._db.execute("DELETE FROM seen_webhooks WHERE seen_at < ?", (now - self.ttl_seconds,))
+        self._db.execute(
+            "DELETE FROM seen_webhooks WHERE key NOT IN "
+            "(SELECT key FROM seen_webhooks ORDER BY seen_at DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+        self._db.commit()
@@ -0,0 +1,159 @@
+"""
+Webhook Envelope for VAPI Integration
+Parses a webhook body once and exposes the fields the pipeline needs
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import hmac
+import json
+import os
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # orjson is optional, stdlib json is a drop-in fallback
+    _loads = json.loads
+
+
+# Event types whose artifact.messages feed the live transcript
+HISTORY_EVENT_TYPES = ('conversation-update', 'status-update', 'end-of-call-report')
+
+
+class WebhookEnvelope:
+    """
+    A single VAPI webhook.
+
+    The raw body is decoded exactly once (with orjson when it is installed).
+    Derived values such as the call ID, variable values and conversation
+    history are computed on first access and cached. Event types that do not
+    carry a transcript never have their artifact walked.
+    """
+
+    __slots__ = ('raw', 'data', 'message', '_variable_values', '_messages')
+
+    def __init__(self, data: Dict[str, Any], raw: bytes = b''):
+        self.raw = raw
+        self.data = data
+        self.message = data.get('message') or {}
+        self._variable_values = None
+        self._messages = None
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> 'WebhookEnvelope':
+        """Decode a webhook body. Raises ValueError if it is not a JSON object"""
+        if not raw:
+            raise ValueError("Empty webhook body")
+        data = _loads(raw)
+        if not isinstance(data, dict):
+            raise ValueError("Webhook body is not a JSON object")
+        return cls(data, raw)
+
+    @property
+    def type(self) -> str:
+        return self.message.get('type', '')
+
+    def resolve_call_id(self, headers=None, cookies=None) -> Tuple[str, str]:
+        """
+        Find the call ID for this webhook
+        Tries message.call.id, root call.id and message.artifact.call.id, then the
+        X-Call-Id header, callId cookie and message.callId
+        Returns (call_id, source)
+        """
+        call_id = (self.message.get('call') or {}).get('id')
+        if call_id:
+            return call_id, "message.call.id"
+
+        call_id = (self.data.get('call') or {}).get('id')
+        if call_id:
+            return call_id, "root 'call.id'"
+
+        artifact_call = (self.message.get('artifact') or {}).get('call')
+        if artifact_call and artifact_call.get('id'):
+            return artifact_call['id'], "message.artifact.call.id"
+
+        call_id = headers.get('X-Call-Id', '') if headers is not None else ''
+        if call_id:
+            return call_id, "X-Call-Id header"
+
+        call_id = cookies.get('callId', '') if cookies is not None else ''
+        if call_id:
+            return call_id, "cookie"
+
+        if self.message.get('callId'):
+            return self.message['callId'], "message.callId"
+
+        return 'unknown', "not found"
+
+    @property
+    def variable_values(self) -> Dict[str, Any]:
+        """The call's assistant variableValues (application_id, names, ...)"""
+        if self._variable_values is None:
+            self._variable_values = find_variable_values(self.data) or {}
+        return self._variable_values
+
+    @property
+    def messages(self) -> Optional[List[Dict[str, Any]]]:
+        """artifact.messages for event types that carry the conversation history, else None"""
+        if self._messages is None and self.type in HISTORY_EVENT_TYPES:
+            self._messages = (self.message.get('artifact') or {}).get('messages') or []
+        return self._messages
+
+
+def verify_signature(payload: bytes, signature: str) -> bool:
+    """Verify a VAPI webhook signature (HMAC-SHA256 of the raw body with VAPI_WEBHOOK_SECRET)"""
+    webhook_secret = os.getenv('VAPI_WEBHOOK_SECRET')
+    if not webhook_secret:
+        return False
+
+    try:
+        expected_signature = hmac.new(
+            webhook_secret.encode(),
+            payload,
+            hashlib.sha256
+        ).hexdigest()
+
+        # Remove 'sha256=' prefix if present
+        signature = signature.replace('sha256=', '')
+
+        return hmac.compare_digest(signature, expected_signature)
+    except Exception as e:
+        print(f"Signature verification error: {e}")
+        return False
+
+
+def find_variable_values(webhook_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Find the variableValues for a webhook
+    Checks the locations VAPI actually uses before falling back to a full recursive walk
+    """
+    message = webhook_data.get('message') or {}
+    candidates = (
+        ((message.get('call') or {}).get('assistantOverrides') or {}).get('variableValues'),
+        ((message.get('assistant') or {}).get('variableValues')),
+        message.get('variableValues'),
+        ((webhook_data.get('call') or {}).get('assistantOverrides') or {}).get('variableValues'),
+        webhook_data.get('variableValues')
+    )
+    for variables in candidates:
+        if variables and isinstance(variables, dict):
+            return variables
+
+    return _find_last_variable_values(webhook_data)
+
+
+def _find_last_variable_values(obj):
+    last = None
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            if k == "variableValues" and isinstance(v, dict):
+                last = v  # keep overwriting; the final one wins
+            sub = _find_last_variable_values(v)
+            if sub is not None:
+                last = sub
+    elif isinstance(obj, list):
+        for item in obj:
+            sub = _find_last_variable_values(item)
+            if sub is not None:
+                last = sub
+    return last
@@ -0,0 +1,178 @@
+"""
+Structured Logging for the Voice Server
+Leveled JSON logs with per-event-type sampling, written through a non-blocking queue handler
+"""
+
+from typing import Any, Dict, Optional
+from contextlib import contextmanager
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+
+
+LOGGER_NAME = 'voice_server'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a single JSON line, merging in any `fields` passed via extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that keeps the traceback in its own field.
+
+    The stock prepare() formats the traceback into msg, so JsonFormatter
+    could no longer put it in 'exc'. Here it is rendered into exc_text
+    instead - the traceback object itself must not cross the queue.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class EventSampler(logging.Filter):
+    """
+    Keeps only a fraction of records per webhook event type.
+
+    Records carry their event type in fields['type']. Warnings and errors are
+    never sampled out.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        fields = getattr(record, 'fields', None) or {}
+        rate = self.rates.get(fields.get('type'), 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+
+class StageTimer:
+    """Collects per-stage durations (in milliseconds) for a single webhook"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        stage_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - stage_start)
+
+    def record(self, name: str, seconds: float):
+        self.stages[name] = round(self.stages.get(name, 0) + seconds * 1000, 3)
+
+    def mark(self, name: str):
+        """Record the time elapsed since the timer was created"""
+        self.stages[name] = round((time.perf_counter() - self.started) * 1000, 3)
+
+    def total_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 3)
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """Parse 'speech-update=0.01,conversation-update=0.1' into a rate per event type"""
+    rates = {}
+    for item in value.split(','):
+        if '=' not in item:
+            continue
+        event_type, rate = item.split('=', 1)
+        try:
+            rates[event_type.strip()] = float(rate)
+        except ValueError:
+            continue
+    return rates
+
+
+def setup_logging() -> logging.Logger:
+    """
+    Configure the voice_server logger (idempotent)
+
+    Environment:
+        VAPI_LOG_LEVEL         DEBUG/INFO/WARNING/ERROR (default INFO)
+        VAPI_LOG_SAMPLE_RATES  per event type rates, e.g. 'speech-update=0.01,conversation-update=0.1'
+    """
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    if _listener is not None:
+        return logger
+
+    logger.setLevel(os.getenv('VAPI_LOG_LEVEL', 'INFO').upper())
+    logger.propagate = False
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    # Request and worker threads only enqueue; formatting and I/O happen on the listener thread
+    log_queue = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(EventSampler(parse_sample_rates(os.getenv('VAPI_LOG_SAMPLE_RATES', ''))))
+    logger.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    return logger
+
+
+def _restart_listener_after_fork():
+    # The listener thread does not survive fork(), so pre-forked workers need their own
+    global _listener
+    if _listener is not None:
+        _listener = logging.handlers.QueueListener(_listener.queue, *_listener.handlers, respect_handler_level=True)
+        _listener.start()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+
+def get_logger(name: Optional[str] = None) -> logging.Logger:
+    """Get the voice_server logger, or a child of it"""
+    setup_logging()
+    return logging.getLogger(f'{LOGGER_NAME}.{name}' if name else LOGGER_NAME)
+
+
+def dumps_enabled() -> bool:
+    """Full webhook body and cache dumps are opt-in via VAPI_LOG_DUMPS=1"""
+    return os.getenv('VAPI_LOG_DUMPS', '').lower() in ('1', 'true', 'yes')
+
+
+def log_fields(**fields: Any) -> Dict[str, Any]:
+    """Build the `extra` argument for a structured log call"""
+    return {'fields': fields}
@@ -0,0 +1,259 @@
+"""
+Metrics for the Voice Server
+Per-stage latency histograms, error counters and gauges in Prometheus text format
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+import bisect
+import os
+import threading
+import time
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds in seconds - sub-millisecond parsing up to multi-second OpenAI extraction
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_HISTOGRAM = 'vapi_webhook_stage_seconds'
+
+HELP = {
+    STAGE_HISTOGRAM: ('histogram', 'Time spent in each webhook pipeline stage'),
+    'vapi_webhooks_total': ('counter', 'Webhooks processed, by type'),
+    'vapi_webhook_errors_total': ('counter', 'Failed pipeline stages, by stage and webhook type'),
+    'vapi_webhook_rejected_total': ('counter', 'Webhooks rejected with 503 because the worker queue was full'),
+    'vapi_webhook_duplicates_total': ('counter', 'Redelivered webhooks acknowledged without processing'),
+    'vapi_webhook_queue_depth': ('gauge', 'Webhooks waiting in the worker queues'),
+    'vapi_cache_entries': ('gauge', 'Entries held in each in-memory cache'),
+}
+
+# Webhook type of the event being processed on this thread / task, used as the `type` label
+_webhook_type: ContextVar[str] = ContextVar('webhook_type', default='unknown')
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, Any]) -> LabelKey:
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: str = '') -> str:
+    parts = [f'{label}="{value}"' for label, value in labels]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class MetricsRegistry:
+    """
+    Counters, gauges and fixed-bucket histograms keyed by name and labels.
+
+    Recording an observation costs one lock and a bisect, so instrumentation
+    can stay on in production. drain() and merge() move accumulated values
+    between registries. Pre-forked workers record locally and periodically
+    merge into one registry in the state process (see serve.py).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[LabelKey, float] = {}
+        self._gauges: Dict[LabelKey, float] = {}
+        self._histograms: Dict[LabelKey, List[float]] = {}  # bucket counts..., +Inf count, sum
+        self._gauge_callbacks: List[Callable[[], List[Tuple[str, Dict[str, Any], float]]]] = []
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = _key(name, labels)
+        index = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(BUCKETS) + 2)
+            histogram[index] += 1
+            histogram[-1] += seconds
+
+    def increment(self, name: str, amount: float = 1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def add_gauge_callback(self, callback: Callable[[], List[Tuple[str, Dict[str, Any], float]]]):
+        """Register a function returning [(name, labels, value)], evaluated before every render or drain"""
+        self._gauge_callbacks.append(callback)
+
+    def refresh_gauges(self):
+        for callback in self._gauge_callbacks:
+            try:
+                for name, labels, value in callback():
+                    self.set_gauge(name, value, **labels)
+            except Exception as e:
+                print(f"❌ Metrics gauge callback failed: {e}")
+
+    def drain(self) -> Dict[str, list]:
+        """Take the counters and histograms recorded since the last drain, plus the current gauges"""
+        self.refresh_gauges()
+        with self._lock:
+            snapshot = {
+                'counters': list(self._counters.items()),
+                'gauges': list(self._gauges.items()),
+                'histograms': list(self._histograms.items())
+            }
+            self._counters = {}
+            self._histograms = {}
+        return snapshot
+
+    def merge(self, snapshot: Dict[str, list]):
+        """Add a drained snapshot from another registry - counters and histograms add up, gauges are replaced"""
+        with self._lock:
+            for key, value in snapshot['counters']:
+                self._counters[key] = self._counters.get(key, 0) + value
+            for key, value in snapshot['gauges']:
+                self._gauges[key] = value
+            for key, values in snapshot['histograms']:
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    self._histograms[key] = list(values)
+                else:
+                    for index, value in enumerate(values):
+                        histogram[index] += value
+
+    def render(self) -> str:
+        """Prometheus text exposition of every metric"""
+        self.refresh_gauges()
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted((key, list(values)) for key, values in self._histograms.items())
+
+        lines = []
+        described = set()
+
+        def describe(name):
+            if name not in described:
+                described.add(name)
+                metric_type, help_text = HELP.get(name, ('untyped', name))
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {metric_type}')
+
+        for (name, labels), values in histograms:
+            describe(name)
+            cumulative = 0
+            for bound, count in zip(BUCKETS, values):
+                cumulative += count
+                bucket_labels = _format_labels(labels, f'le="{bound}"')
+                lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+            cumulative += values[len(BUCKETS)]
+            bucket_labels = _format_labels(labels, 'le="+Inf"')
+            lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {values[-1]:.6f}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+
+        for (name, labels), value in counters + gauges:
+            describe(name)
+            lines.append(f'{name}{_format_labels(labels)} {value:g}')
+
+        return '\n'.join(lines) + '\n'
+
+
+# Registry this process records into
+registry = MetricsRegistry()
+
+# Registry in the state process that /metrics renders in pre-forked mode (None when running single-process)
+_shared = None
+
+# `process` label of per-process gauges such as queue depth
+process_label = 'main'
+
+
+def share_metrics(shared, label: str, interval: Optional[float] = None):
+    """Periodically merge this process's metrics into a shared registry, and render /metrics from it"""
+    global _shared, process_label
+    _shared = shared
+    process_label = label
+    interval = interval or float(os.getenv('VAPI_METRICS_FLUSH_SECONDS', '5'))
+
+    def flush_loop():
+        while True:
+            time.sleep(interval)
+            flush()
+
+    threading.Thread(target=flush_loop, name='metrics-flush', daemon=True).start()
+
+
+def flush():
+    """Push locally recorded metrics to the shared registry"""
+    if _shared is None:
+        return
+    try:
+        _shared.merge(registry.drain())
+    except Exception as e:
+        print(f"❌ Metrics flush failed: {e}")
+
+
+def render() -> str:
+    """Body for the /metrics endpoint"""
+    if _shared is None:
+        return registry.render()
+    flush()
+    return _shared.render()
+
+
+def set_webhook_type(webhook_type: str):
+    """Label stages recorded from now on, on this thread / asyncio task, with webhook_type"""
+    _webhook_type.set(webhook_type or 'unknown')
+
+
+def observe(stage: str, seconds: float, webhook_type: Optional[str] = None):
+    registry.observe(STAGE_HISTOGRAM, seconds, stage=stage, type=webhook_type or _webhook_type.get())
+
+
+def count_error(stage: str, webhook_type: Optional[str] = None):
+    registry.increment('vapi_webhook_errors_total', stage=stage, type=webhook_type or _webhook_type.get())
+
+
+def observe_timer(webhook_type: str, timer) -> None:
+    """Record every stage of a webhook's StageTimer, plus its total"""
+    for stage, milliseconds in timer.stages.items():
+        registry.observe(STAGE_HISTOGRAM, milliseconds / 1000, stage=stage, type=webhook_type)
+    registry.observe(STAGE_HISTOGRAM, timer.total_ms() / 1000, stage='total', type=webhook_type)
+    registry.increment('vapi_webhooks_total', type=webhook_type)
+
+
+def _failed(result: Any) -> bool:
+    return isinstance(result, dict) and result.get('success') is False
+
+
+@contextmanager
+def timed(stage: str):
+    """Time a block as one pipeline stage, counting an error if it raises"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        count_error(stage)
+        raise
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+def instrumented(stage: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Call func as one pipeline stage - errors are exceptions and {"success": False} results"""
+    with timed(stage):
+        result = func(*args, **kwargs)
+    if _failed(result):
+        count_error(stage)
+    return result
+
+
+async def instrumented_async(stage: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """instrumented() for coroutine functions"""
+    with timed(stage):
+        result = await func(*args, **kwargs)
+    if _failed(result):
+        count_error(stage)
+    return result
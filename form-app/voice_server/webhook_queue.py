@@ -0,0 +1,269 @@
+"""
+Webhook Worker Pool for VAPI Integration
+Processes webhook events off the request thread, keeping each call's events in order
+"""
+
+from typing import Awaitable, Callable, Dict, Any, Optional, Set
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+import asyncio
+import os
+import queue
+import threading
+import traceback
+import zlib
+
+from sharded_cache import AtomicCounter
+
+
+class BaseWorkerPool:
+    """
+    Configuration, counters and call routing shared by the thread and asyncio worker pools.
+
+    Events are routed to a worker by hashing their call ID, so every event
+    for a given call is handled by the same worker in arrival order while
+    different calls are processed in parallel.
+    """
+
+    def __init__(self, handler: Callable[..., Any], num_workers: Optional[int] = None,
+                 max_queue_depth: Optional[int] = None, deferred_workers: Optional[int] = None):
+        self.handler = handler
+        self.num_workers = num_workers or int(os.getenv('VAPI_WEBHOOK_WORKERS', '4'))
+        self.max_queue_depth = max_queue_depth or int(os.getenv('VAPI_WEBHOOK_QUEUE_DEPTH', '1000'))
+        self.deferred_workers = deferred_workers or int(os.getenv('VAPI_DEFERRED_WORKERS', '4'))
+        self.processed_count = AtomicCounter()
+        self.rejected_count = AtomicCounter()
+        self.error_count = AtomicCounter()
+        self.deferred_count = AtomicCounter()
+        self._started = False
+        self._deferred = set()
+
+    def queue_depths(self) -> list:
+        """Current number of pending events per worker"""
+        return [work_queue.qsize() for work_queue in self.queues]
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool statistics for the /stats endpoint"""
+        return {
+            'workers': self.num_workers,
+            'max_queue_depth': self.max_queue_depth,
+            'queue_depths': self.queue_depths(),
+            'processed': self.processed_count.value,
+            'rejected': self.rejected_count.value,
+            'errors': self.error_count.value,
+            'deferred': self.deferred_count.value,
+            'deferred_pending': len(self._deferred)
+        }
+
+    def _worker_index(self, call_id: str) -> int:
+        # crc32 is stable across processes, unlike the salted built-in hash()
+        return zlib.crc32((call_id or 'unknown').encode()) % self.num_workers
+
+
+class WebhookWorkerPool(BaseWorkerPool):
+    """
+    Fixed pool of worker threads, each with its own bounded queue.
+
+    Slow work that nothing later depends on (the end-of-call extraction) is
+    handed to defer(), a separate pool, so it doesn't hold up the events of
+    the other calls sharing its worker.
+    """
+
+    def __init__(self, handler: Callable[..., Any], num_workers: Optional[int] = None,
+                 max_queue_depth: Optional[int] = None, deferred_workers: Optional[int] = None):
+        super().__init__(handler, num_workers, max_queue_depth, deferred_workers)
+        self.queues = [queue.Queue(maxsize=self.max_queue_depth) for _ in range(self.num_workers)]
+        self.threads = []
+        self._start_lock = threading.Lock()
+        self._executor = None
+        self._deferred: Set[Future] = set()
+
+    def start(self):
+        """Start the worker threads (idempotent)"""
+        with self._start_lock:
+            if self._started:
+                return
+            for index, work_queue in enumerate(self.queues):
+                thread = threading.Thread(
+                    target=self._worker_loop,
+                    args=(work_queue,),
+                    name=f"webhook-worker-{index}",
+                    daemon=True
+                )
+                thread.start()
+                self.threads.append(thread)
+            self._started = True
+
+    def submit(self, call_id: str, *args, **kwargs) -> bool:
+        """
+        Queue an event for processing
+        Returns False if the call's worker queue is full
+        """
+        if not self._started:
+            self.start()
+
+        work_queue = self.queues[self._worker_index(call_id)]
+        try:
+            work_queue.put_nowait((args, kwargs))
+            return True
+        except queue.Full:
+            self.rejected_count.increment()
+            return False
+
+    def defer(self, func: Callable[..., Any], *args, **kwargs):
+        """Run func on the deferred pool, outside the per-call ordering"""
+        with self._start_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.deferred_workers,
+                                                    thread_name_prefix='webhook-deferred')
+        self.deferred_count.increment()
+        future = self._executor.submit(self._run, func, args, kwargs)
+        self._deferred.add(future)
+        future.add_done_callback(self._deferred.discard)
+
+    def stop(self, timeout: float = 5.0) -> list:
+        """
+        Drain the queues and stop the worker threads, then wait for deferred work - each up to timeout
+        Returns the worker threads still running (their queue never drained); they stay in self.threads
+        """
+        for work_queue in self.queues:
+            try:
+                work_queue.put(None, timeout=timeout)
+            except queue.Full:
+                # Its worker never gets the stop marker - reported below; the WAL replays what it doesn't finish
+                pass
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = [thread for thread in self.threads if thread.is_alive()]
+        for thread in self.threads:
+            print(f"⚠️  {thread.name} still busy after {timeout}s, left running without draining its queue")
+        self._started = False
+
+        if self._executor is not None:
+            wait(list(self._deferred), timeout=timeout)
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        return self.threads
+
+    def _worker_loop(self, work_queue: queue.Queue):
+        while True:
+            item = work_queue.get()
+            if item is None:
+                work_queue.task_done()
+                break
+
+            args, kwargs = item
+            try:
+                if self._run(self.handler, args, kwargs):
+                    self.processed_count.increment()
+            finally:
+                work_queue.task_done()
+
+    def _run(self, func: Callable[..., Any], args: tuple, kwargs: dict) -> bool:
+        try:
+            func(*args, **kwargs)
+            return True
+        except Exception as e:
+            self.error_count.increment()
+            print(f"❌ Webhook worker error: {e}")
+            traceback.print_exc()
+            return False
+
+
+class AsyncWebhookWorkerPool(BaseWorkerPool):
+    """
+    WebhookWorkerPool for the ASGI server: each worker is an asyncio task
+    awaiting a coroutine handler, with the same per-call routing and limits.
+    Must be started and stopped from the event loop.
+    """
+
+    def __init__(self, handler: Callable[..., Awaitable[Any]], num_workers: Optional[int] = None,
+                 max_queue_depth: Optional[int] = None, deferred_workers: Optional[int] = None):
+        super().__init__(handler, num_workers, max_queue_depth, deferred_workers)
+        self.queues = [asyncio.Queue(maxsize=self.max_queue_depth) for _ in range(self.num_workers)]
+        self.tasks = []
+        self._deferred: Set[asyncio.Task] = set()
+        # Deferred coroutines run as tasks, at most deferred_workers at a time
+        self._deferred_slots = None
+
+    def start(self):
+        """Start the worker tasks (idempotent)"""
+        if self._started:
+            return
+        self.tasks = [
+            asyncio.create_task(self._worker_loop(work_queue), name=f"webhook-worker-{index}")
+            for index, work_queue in enumerate(self.queues)
+        ]
+        self._started = True
+
+    def submit(self, call_id: str, *args, **kwargs) -> bool:
+        """
+        Queue an event for processing
+        Returns False if the call's worker queue is full
+        """
+        if not self._started:
+            self.start()
+
+        try:
+            self.queues[self._worker_index(call_id)].put_nowait((args, kwargs))
+            return True
+        except asyncio.QueueFull:
+            self.rejected_count.increment()
+            return False
+
+    def defer(self, func: Callable[..., Awaitable[Any]], *args, **kwargs):
+        """Run the coroutine function func as a task, outside the per-call ordering"""
+        if self._deferred_slots is None:
+            self._deferred_slots = asyncio.Semaphore(self.deferred_workers)
+        self.deferred_count.increment()
+        task = asyncio.get_running_loop().create_task(self._run_deferred(func, args, kwargs))
+        self._deferred.add(task)
+        task.add_done_callback(self._deferred.discard)
+
+    async def stop(self, timeout: float = 5.0):
+        """Drain the queues and stop the worker tasks, then wait for deferred work - each up to timeout"""
+        for work_queue in self.queues:
+            try:
+                work_queue.put_nowait(None)
+            except asyncio.QueueFull:
+                pass  # Cancelled below if it doesn't drain in time; the WAL replays what it didn't finish
+        # The workers first: they may still defer end-of-call work while draining
+        await self._wait_or_cancel(self.tasks, timeout)
+        await self._wait_or_cancel(list(self._deferred), timeout)
+        self.tasks = []
+        self._started = False
+
+    @staticmethod
+    async def _wait_or_cancel(tasks: list, timeout: float):
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+
+    async def _run_deferred(self, func: Callable[..., Awaitable[Any]], args: tuple, kwargs: dict):
+        async with self._deferred_slots:
+            await self._run(func, args, kwargs)
+
+    async def _run(self, func: Callable[..., Awaitable[Any]], args: tuple, kwargs: dict) -> bool:
+        try:
+            await func(*args, **kwargs)
+            return True
+        except Exception as e:
+            self.error_count.increment()
+            print(f"❌ Webhook worker error: {e}")
+            traceback.print_exc()
+            return False
+
+    async def _worker_loop(self, work_queue: asyncio.Queue):
+        while True:
+            item = await work_queue.get()
+            if item is None:
+                work_queue.task_done()
+                break
+
+            args, kwargs = item
+            try:
+                if await self._run(self.handler, args, kwargs):
+                    self.processed_count.increment()
+            finally:
+                work_queue.task_done()
@@ -0,0 +1,279 @@
+"""
+Webhook Write-Ahead Log for VAPI Integration
+Append-only, segment-rotated on-disk log of raw webhook bodies with crash replay
+"""
+
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import os
+import struct
+import threading
+import zlib
+
+
+# Record kinds
+RECORD_WEBHOOK = 1  # payload is the raw webhook body
+RECORD_ACK = 2      # payload is empty, the sequence number refers to an earlier webhook record
+
+# kind, sequence number, payload length, crc32 of (kind, seq, payload)
+RECORD_HEADER = struct.Struct('>BQII')
+_CRC_PREFIX = struct.Struct('>BQ')
+
+SEGMENT_PREFIX = 'wal-'
+SEGMENT_SUFFIX = '.log'
+
+
+def _segment_name(first_seq: int) -> str:
+    return f"{SEGMENT_PREFIX}{first_seq:020d}{SEGMENT_SUFFIX}"
+
+
+def list_segments(directory: str) -> List[str]:
+    """Segment file paths in log order"""
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(
+        name for name in os.listdir(directory)
+        if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+    )
+    return [os.path.join(directory, name) for name in names]
+
+
+def read_segment(path: str) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    Yield (kind, seq, payload) for every intact record in a segment
+    Stops at the first truncated or corrupt record (a torn write from a crash)
+    """
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            kind, seq, length, crc = RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload, zlib.crc32(_CRC_PREFIX.pack(kind, seq))) != crc:
+                print(f"⚠️  WAL segment {os.path.basename(path)} has a torn record at seq {seq}, ignoring the rest")
+                return
+            yield kind, seq, payload
+
+
+def read_log(directory: str, unacked_only: bool = False) -> List[Tuple[int, bytes]]:
+    """All webhook bodies in the log as (seq, raw_body), optionally only those never acknowledged"""
+    webhooks: Dict[int, bytes] = {}
+    acked: Set[int] = set()
+    for path in list_segments(directory):
+        for kind, seq, payload in read_segment(path):
+            if kind == RECORD_WEBHOOK:
+                webhooks[seq] = payload
+            elif kind == RECORD_ACK:
+                acked.add(seq)
+
+    return [
+        (seq, webhooks[seq]) for seq in sorted(webhooks)
+        if not unacked_only or seq not in acked
+    ]
+
+
+class WebhookWAL:
+    """
+    Durable log of accepted webhooks.
+
+    append() writes the raw body and returns only after it has been fsynced,
+    so a webhook that VAPI saw acknowledged survives a crash. Concurrent
+    appenders share fsyncs: whichever thread syncs first covers every record
+    written before it (group commit). Once a webhook has been fully
+    processed, ack() records that, so it is not replayed.
+
+    The log is split into segments of roughly segment_bytes. Segments at the
+    head of the log are deleted once every webhook in them has been
+    acknowledged. On startup, recover() returns the unacknowledged
+    webhooks so the server can process them again.
+    """
+
+    def __init__(self, directory: Optional[str] = None, segment_bytes: Optional[int] = None,
+                 sync: Optional[bool] = None):
+        self.directory = directory if directory is not None else os.getenv('VAPI_WAL_DIR', 'webhook_wal')
+        self.segment_bytes = segment_bytes or int(os.getenv('VAPI_WAL_SEGMENT_BYTES', str(16 * 1024 * 1024)))
+        self.sync = sync if sync is not None else os.getenv('VAPI_WAL_SYNC', '1') != '0'
+
+        self._lock = threading.Lock()
+        self._sync_condition = threading.Condition()
+        self._syncing = False
+        self._written_seq = 0
+        self._synced_seq = 0
+        self._next_seq = 1
+
+        self._file = None
+        self._active_path = None
+        self._active_size = 0
+        self._outstanding: Dict[str, Set[int]] = {}  # segment path -> unacknowledged seqs
+        self._segment_of: Dict[int, str] = {}
+
+        self.appended_count = 0
+        self.acked_count = 0
+        self.fsync_count = 0
+        self.replayed_count = 0
+
+    def recover(self) -> List[Tuple[int, bytes]]:
+        """
+        Open the log and return the webhooks that were never acknowledged, as (seq, raw_body)
+        Their segments are kept until those webhooks are acknowledged with ack(seq)
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        pending: Dict[int, bytes] = {}
+        max_seq = 0
+
+        with self._lock:
+            for path in list_segments(self.directory):
+                webhook_seqs = set()
+                valid_bytes = 0
+                for kind, seq, payload in read_segment(path):
+                    valid_bytes += RECORD_HEADER.size + len(payload)
+                    max_seq = max(max_seq, seq)
+                    if kind == RECORD_WEBHOOK:
+                        pending[seq] = payload
+                        webhook_seqs.add(seq)
+                        self._segment_of[seq] = path
+                    elif kind == RECORD_ACK:
+                        pending.pop(seq, None)
+                self._outstanding[path] = webhook_seqs
+
+                # Cut off a torn tail so records appended to this segment later stay readable
+                if os.path.getsize(path) > valid_bytes:
+                    with open(path, 'r+b') as f:
+                        f.truncate(valid_bytes)
+
+            # Acks can live in later segments than their webhooks, so prune after reading everything
+            for path, seqs in self._outstanding.items():
+                seqs.intersection_update(pending)
+            for seq in list(self._segment_of):
+                if seq not in pending:
+                    del self._segment_of[seq]
+
+            self._next_seq = max_seq + 1
+            self._written_seq = self._synced_seq = max_seq
+            self._open_segment()
+            self._delete_finished_segments()
+
+        self.replayed_count = len(pending)
+        return sorted(pending.items())
+
+    def append(self, raw_body: bytes) -> int:
+        """Write a webhook body durably. Returns its sequence number"""
+        with self._lock:
+            if self._file is None:
+                raise RuntimeError("WebhookWAL.recover() must be called before append()")
+            seq = self._next_seq
+            self._next_seq += 1
+            # Registered under the segment it is written to, before a rotation can consider that segment finished
+            path = self._active_path
+            self._write_record(RECORD_WEBHOOK, seq, raw_body)
+            self._outstanding[path].add(seq)
+            self._segment_of[seq] = path
+            self._written_seq = seq
+            self.appended_count += 1
+            self._rotate_if_full()
+
+        if self.sync:
+            self._sync_through(seq)
+        return seq
+
+    def ack(self, seq: int):
+        """Mark a webhook as fully processed. Not fsynced - a lost ack only means one extra replay"""
+        with self._lock:
+            if self._file is None:
+                return
+            self._write_record(RECORD_ACK, seq, b'')
+            path = self._segment_of.pop(seq, None)
+            if path is not None:
+                self._outstanding.get(path, set()).discard(seq)
+            self.acked_count += 1
+            if not self._rotate_if_full():
+                self._delete_finished_segments()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'segments': len(self._outstanding),
+                'unacked': len(self._segment_of),
+                'appended': self.appended_count,
+                'acked': self.acked_count,
+                'fsyncs': self.fsync_count,
+                'replayed_on_startup': self.replayed_count
+            }
+
+    def _write_record(self, kind: int, seq: int, payload: bytes):
+        crc = zlib.crc32(payload, zlib.crc32(_CRC_PREFIX.pack(kind, seq)))
+        self._file.write(RECORD_HEADER.pack(kind, seq, len(payload), crc))
+        self._file.write(payload)
+        self._active_size += RECORD_HEADER.size + len(payload)
+
+    def _rotate_if_full(self) -> bool:
+        if self._active_size < self.segment_bytes:
+            return False
+        self._rotate()
+        return True
+
+    def _sync_through(self, seq: int):
+        """Block until every record up to seq is on disk, fsyncing for any waiters as well"""
+        with self._sync_condition:
+            while self._synced_seq < seq:
+                if self._syncing:
+                    self._sync_condition.wait()
+                    continue
+                self._syncing = True
+                break
+            else:
+                return
+
+        # Nothing is marked synced if the flush or fsync fails
+        target = 0
+        try:
+            with self._lock:
+                target = self._written_seq
+                self._file.flush()
+                # A duplicate descriptor stays valid even if the segment rotates while we sync
+                fileno = os.dup(self._file.fileno())
+            try:
+                os.fsync(fileno)
+            finally:
+                os.close(fileno)
+            self.fsync_count += 1
+        finally:
+            with self._sync_condition:
+                self._syncing = False
+                self._synced_seq = max(self._synced_seq, target)
+                self._sync_condition.notify_all()
+
+    def _open_segment(self):
+        self._active_path = os.path.join(self.directory, _segment_name(self._next_seq))
+        self._file = open(self._active_path, 'ab')
+        self._active_size = self._file.tell()
+        self._outstanding.setdefault(self._active_path, set())
+
+    def _rotate(self):
+        # Everything in the old segment must be durable before writers move on
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.fsync_count += 1
+        self._file.close()
+        self._open_segment()
+        self._delete_finished_segments()
+
+    def _delete_finished_segments(self):
+        # Only delete from the head of the log, so an ack is never removed while the
+        # webhook record it refers to still exists in an older segment
+        for path in list(self._outstanding):
+            if path == self._active_path or self._outstanding[path]:
+                break
+            del self._outstanding[path]
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"⚠️  Could not remove WAL segment {path}: {e}")